@@ -0,0 +1,21 @@
+import asyncio
+import json
+import os
+
+#----- Backend builds its Database at import time; the benchmark never connects it
+os.environ.setdefault("DATABASE", "mongodb://127.0.0.1:1,mongodb://127.0.0.1:1")
+
+from Backend.bench.harness import build_parser, print_report, run_benchmark  # noqa: E402
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from pyrogram import raw
+from pyrogram.errors import FloodWait
+from pyrogram.file_id import FileId, FileType, FileUniqueId, FileUniqueType
+
+#----- Local stand-in for Telegram: fake clients/sessions that serve upload.GetFile from
+#----- files on disk, so ByteStreamer and the /dl routes can be exercised without live bots
+
+FAKE_DC = 2
+FAKE_CHANNEL = 1000000001
+
+
+#----- Injectable upstream behaviour for every fake media session
+class FaultProfile:
+    __slots__ = ("latency_ms", "jitter_ms", "bandwidth_mbps", "flood_rate", "flood_seconds",
+                 "timeout_rate", "hang_seconds")
+
+    def __init__(
+        self,
+        latency_ms: float = 80.0,
+        jitter_ms: float = 40.0,
+        bandwidth_mbps: float = 0.0,
+        flood_rate: float = 0.0,
+        flood_seconds: int = 2,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = 20.0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bandwidth_mbps = bandwidth_mbps
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+
+    #----- Simulated server time for one GetFile of `nbytes`
+    def delay(self, nbytes: int) -> float:
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if self.bandwidth_mbps > 0:
+            delay += (nbytes / 1048576) / self.bandwidth_mbps
+        return delay
+
+
+#----- Counters shared by every fake session (what the fake upstream actually served)
+UPSTREAM_COUNTERS: Dict[str, int] = {"get_file": 0, "bytes": 0, "floods": 0, "timeouts": 0, "pings": 0}
+UPSTREAM_LATENCIES: List[float] = []
+
+
+#----- Local files published as messages of a fake channel
+class FakeLibrary:
+    def __init__(self):
+        self._by_msg: Dict[int, dict] = {}
+        self._by_media: Dict[int, dict] = {}
+        self._next_msg = 1
+
+    def add_file(self, path: str, mime_type: str = "video/x-matroska") -> int:
+        msg_id = self._next_msg
+        self._next_msg += 1
+        media_id = random.getrandbits(62)
+        file_id = FileId(
+            file_type=FileType.DOCUMENT,
+            dc_id=FAKE_DC,
+            file_reference=b"",
+            media_id=media_id,
+            access_hash=random.getrandbits(62),
+        )
+        entry = {
+            "path": path,
+            "fd": os.open(path, os.O_RDONLY),
+            "size": os.path.getsize(path),
+            "file_id": file_id.encode(),
+            "unique_id": FileUniqueId(file_unique_type=FileUniqueType.DOCUMENT, media_id=media_id).encode(),
+            "file_name": os.path.basename(path),
+            "mime_type": mime_type,
+            "date": datetime.fromtimestamp(os.path.getmtime(path), timezone.utc),
+        }
+        self._by_msg[msg_id] = entry
+        self._by_media[media_id] = entry
+        return msg_id
+
+    def message(self, msg_id: int):
+        entry = self._by_msg.get(msg_id)
+        media = None
+        if entry:
+            media = SimpleNamespace(
+                file_id=entry["file_id"],
+                file_unique_id=entry["unique_id"],
+                file_name=entry["file_name"],
+                file_size=entry["size"],
+                mime_type=entry["mime_type"],
+            )
+        return SimpleNamespace(
+            id=msg_id, empty=media is None, date=entry["date"] if entry else None,
+            document=media, photo=None, video=None, audio=None,
+            voice=None, video_note=None, sticker=None, animation=None,
+        )
+
+    def read(self, media_id: int, offset: int, limit: int) -> bytes:
+        entry = self._by_media.get(media_id)
+        if entry is None or offset >= entry["size"]:
+            return b""
+        return os.pread(entry["fd"], limit, offset)
+
+    def close(self) -> None:
+        for entry in self._by_msg.values():
+            try:
+                os.close(entry["fd"])
+            except OSError:
+                pass
+
+
+class _FakeStorage:
+    def __init__(self, dc_id: int):
+        self._dc_id = dc_id
+
+    async def dc_id(self) -> int:
+        return self._dc_id
+
+    async def test_mode(self) -> bool:
+        return False
+
+    async def auth_key(self) -> bytes:
+        return b"\0" * 256
+
+
+#----- Minimal pyrogram.Client surface used by ByteStreamer and get_file_ids
+class FakeClient:
+    def __init__(self, index: int, library: FakeLibrary, profile: FaultProfile, dc_id: int = FAKE_DC):
+        self.name = f"fake{index}"
+        self.me = SimpleNamespace(id=900000 + index, username=f"fake_bot_{index}")
+        self.storage = _FakeStorage(dc_id)
+        self.media_sessions: Dict[int, "FakeSession"] = {}
+        self.library = library
+        self.profile = profile
+
+    async def get_messages(self, chat_id: int, message_ids: int):
+        await asyncio.sleep(self.profile.delay(0))
+        return self.library.message(message_ids)
+
+    async def invoke(self, query):
+        raise NotImplementedError(f"FakeClient cannot invoke {type(query).__name__}")
+
+
+#----- Drop-in for pyrogram.session.Session (same constructor) answering GetFile and Ping locally
+class FakeSession:
+    def __init__(self, client: FakeClient, dc_id: int, auth_key: bytes, test_mode: bool, is_media: bool = False):
+        self.client = client
+        self.dc_id = dc_id
+        self.is_media = is_media
+        self.no_updates = True
+        self.timeout = 30
+        self.sleep_threshold = 60
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    async def send(self, query, *args, **kwargs):
+        if isinstance(query, raw.functions.Ping):
+            UPSTREAM_COUNTERS["pings"] += 1
+            return raw.types.Pong(msg_id=0, ping_id=query.ping_id)
+
+        if not isinstance(query, raw.functions.upload.GetFile):
+            raise NotImplementedError(f"FakeSession cannot send {type(query).__name__}")
+
+        profile = self.client.profile
+        UPSTREAM_COUNTERS["get_file"] += 1
+        if profile.flood_rate and random.random() < profile.flood_rate:
+            UPSTREAM_COUNTERS["floods"] += 1
+            raise FloodWait(value=profile.flood_seconds)
+        if profile.timeout_rate and random.random() < profile.timeout_rate:
+            UPSTREAM_COUNTERS["timeouts"] += 1
+            await asyncio.sleep(profile.hang_seconds)
+
+        started = time.perf_counter()
+        data = self.client.library.read(query.location.id, query.offset, query.limit)
+        await asyncio.sleep(profile.delay(len(data)))
+        UPSTREAM_LATENCIES.append(time.perf_counter() - started)
+        UPSTREAM_COUNTERS["bytes"] += len(data)
+        return raw.types.upload.File(type=raw.types.storage.FilePartial(), mtime=0, bytes=data)
+
+
+def reset_upstream_counters() -> None:
+    for key in UPSTREAM_COUNTERS:
+        UPSTREAM_COUNTERS[key] = 0
+    UPSTREAM_LATENCIES.clear()
+
+
+#----- Register `count` fake bot clients in the shared multi-client registries
+def install_fake_clients(count: int, library: FakeLibrary, profile: FaultProfile) -> List[FakeClient]:
+    import Backend.helper.custom_dl as custom_dl
+    from Backend.pyrofork.bot import client_avg_mbps, client_dc_map, client_failures, multi_clients, work_loads
+
+    custom_dl.Session = FakeSession
+    clients = []
+    for index in range(count):
+        client = FakeClient(index, library, profile)
+        multi_clients[index] = client
+        work_loads[index] = 0
+        client_failures[index] = 0
+        client_avg_mbps[index] = 0.0
+        client_dc_map[index] = FAKE_DC
+        clients.append(client)
+    return clients
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from Backend import db
+from Backend.bench.fake_telegram import (
+    FAKE_CHANNEL,
+    UPSTREAM_COUNTERS,
+    UPSTREAM_LATENCIES,
+    FakeLibrary,
+    FaultProfile,
+    install_fake_clients,
+    percentile,
+    reset_upstream_counters,
+)
+from Backend.fastapi.routes import stream_routes
+from Backend.fastapi.security.tokens import verify_token
+from Backend.helper.chunk_cache import CHUNK_CACHE
+from Backend.helper.encrypt import encode_string
+from Backend.helper.readahead import readahead_stats
+
+MIB = 1024 * 1024
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+#----- Cut the database out of the streaming path (no titles, no persisted locations, no usage)
+def _detach_database() -> None:
+    for name in ("get_title_by_stream_id", "get_file_location", "save_file_location",
+                 "drop_file_location", "log_stream_stats", "update_token_usage"):
+        setattr(db, name, _noop)
+    stream_routes.record_stream_start = _noop
+
+
+#----- The real streaming router with token verification stubbed to an unlimited bench token
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(stream_routes.router)
+    app.dependency_overrides[verify_token] = lambda: {"name": "bench", "limits": {}, "usage": {}}
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _make_sample_file(size_mb: int) -> str:
+    fd, path = tempfile.mkstemp(prefix="bench_", suffix=".mkv")
+    with os.fdopen(fd, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(MIB))
+    return path
+
+
+#----- One Range request: bytes, time to first byte, and the gap between every delivered MiB
+async def _range_request(http: httpx.AsyncClient, url: str, start: int, end: int) -> dict:
+    sent = time.perf_counter()
+    ttfb = None
+    received = 0
+    next_mark = MIB
+    last_mark = sent
+    gaps: List[float] = []
+    async with http.stream("GET", url, headers={"Range": f"bytes={start}-{end}"}) as resp:
+        status = resp.status_code
+        async for piece in resp.aiter_raw():
+            now = time.perf_counter()
+            if ttfb is None:
+                ttfb = now - sent
+            received += len(piece)
+            while received >= next_mark:
+                gaps.append(now - last_mark)
+                last_mark = now
+                next_mark += MIB
+    return {
+        "status": status,
+        "bytes": received,
+        "expected": end - start + 1,
+        "ttfb": ttfb,
+        "duration": time.perf_counter() - sent,
+        "gaps": gaps,
+    }
+
+
+async def _client_loop(http, url, total_size, requests, range_bytes, sequential, results) -> None:
+    position = 0
+    for _ in range(requests):
+        if sequential:
+            start = position
+        else:
+            start = random.randrange(0, max(1, total_size - range_bytes))
+        end = min(total_size - 1, start + range_bytes - 1)
+        position = 0 if end >= total_size - 1 else end + 1
+        results.append(await _range_request(http, url, start, end))
+
+
+#----- CPU is process-wide (server and clients share the loop), so compare runs, not absolutes
+def _report(results: List[dict], wall: float, cpu: float) -> dict:
+    total_bytes = sum(r["bytes"] for r in results)
+    gbits = total_bytes * 8 / 1e9
+    ttfbs = [r["ttfb"] for r in results if r["ttfb"] is not None]
+    gaps = [g for r in results for g in r["gaps"]]
+
+    def _ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for r in results if r["status"] >= 400 or r["bytes"] != r["expected"]),
+        "bytes": total_bytes,
+        "wall_seconds": round(wall, 3),
+        "throughput_mbps": round(total_bytes / MIB / wall, 2) if wall > 0 else 0.0,
+        "cpu_seconds": round(cpu, 3),
+        "cpu_seconds_per_gbit": round(cpu / gbits, 4) if gbits > 0 else None,
+        "ttfb_ms": {"p50": _ms(percentile(ttfbs, 50)), "p99": _ms(percentile(ttfbs, 99))},
+        "chunk_latency_ms": {"p50": _ms(percentile(gaps, 50)), "p99": _ms(percentile(gaps, 99))},
+        "upstream": {
+            **UPSTREAM_COUNTERS,
+            "latency_ms": {
+                "p50": _ms(percentile(UPSTREAM_LATENCIES, 50)),
+                "p99": _ms(percentile(UPSTREAM_LATENCIES, 99)),
+            },
+        },
+        "chunk_cache": CHUNK_CACHE.stats(),
+        "readahead": readahead_stats(),
+    }
+
+
+#----- Serve the app on localhost, drive N concurrent Range clients through /dl/, return the report
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    _detach_database()
+    if not args.cache:
+        CHUNK_CACHE.memory_budget = 0
+        CHUNK_CACHE.disk_budget = 0
+    reset_upstream_counters()
+
+    profile = FaultProfile(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        bandwidth_mbps=args.bandwidth_mbps,
+        flood_rate=args.flood_rate,
+        flood_seconds=args.flood_seconds,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+    )
+    library = FakeLibrary()
+    created = []
+    paths = args.file or []
+    if not paths:
+        created.append(_make_sample_file(args.size_mb))
+        paths = created
+    msg_ids = [library.add_file(p) for p in paths]
+    install_fake_clients(args.bots, library, profile)
+
+    if len(msg_ids) == 1 and not args.zip:
+        payload = {"chat_id": FAKE_CHANNEL, "msg_id": msg_ids[0]}
+    else:
+        payload = {"parts": [{"chat_id": FAKE_CHANNEL, "msg_id": m} for m in msg_ids]}
+        if args.zip:
+            payload["zip"] = True
+    url_path = f"/dl/bench/{await encode_string(payload)}/bench.mkv"
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(build_app(), host="127.0.0.1", port=port, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    try:
+        limits = httpx.Limits(max_connections=args.clients * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120.0, limits=limits) as http:
+            head = await http.head(url_path)
+            head.raise_for_status()
+            total_size = int(head.headers["content-length"])
+            range_bytes = args.range_mb * MIB
+
+            results: List[dict] = []
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+            await asyncio.gather(*[
+                _client_loop(http, url_path, total_size, args.requests, range_bytes, args.sequential, results)
+                for _ in range(args.clients)
+            ])
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+    finally:
+        server.should_exit = True
+        await serve_task
+        library.close()
+        for path in created:
+            os.remove(path)
+
+    return _report(results, wall, cpu)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m Backend.bench",
+        description="Offline /dl/ streaming benchmark against a local Telegram stand-in.",
+    )
+    parser.add_argument("--file", action="append", help="local file to serve (repeat for split parts)")
+    parser.add_argument("--zip", action="store_true", help="treat the files as parts of a stored ZIP archive")
+    parser.add_argument("--size-mb", type=int, default=256, help="size of the generated file when --file is not given")
+    parser.add_argument("--bots", type=int, default=4, help="fake bot clients")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent HTTP Range clients")
+    parser.add_argument("--requests", type=int, default=4, help="Range requests per client")
+    parser.add_argument("--range-mb", type=int, default=32, help="bytes per Range request (MiB)")
+    parser.add_argument("--sequential", action="store_true", help="read consecutive ranges instead of random seeks")
+    parser.add_argument("--cache", action="store_true", help="keep the chunk cache enabled")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="per-request upstream bandwidth (0 = unlimited)")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="probability a GetFile raises FloodWait")
+    parser.add_argument("--flood-seconds", type=int, default=2)
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="probability a GetFile hangs")
+    parser.add_argument("--hang-seconds", type=float, default=20.0)
+    parser.add_argument("--json", action="store_true", help="print the raw JSON report")
+    return parser
+
+
+def print_report(report: Dict) -> None:
+    up = report["upstream"]
+    print(f"requests        {report['requests']} ({report['errors']} errors)")
+    print(f"throughput      {report['throughput_mbps']} MB/s over {report['wall_seconds']} s")
+    print(f"cpu             {report['cpu_seconds']} s ({report['cpu_seconds_per_gbit']} s per Gbit served)")
+    print(f"ttfb            p50 {report['ttfb_ms']['p50']} ms  p99 {report['ttfb_ms']['p99']} ms")
+    print(f"chunk latency   p50 {report['chunk_latency_ms']['p50']} ms  p99 {report['chunk_latency_ms']['p99']} ms")
+    print(f"upstream        {up['get_file']} GetFile, {up['floods']} floods, {up['timeouts']} timeouts, "
+          f"p99 {up['latency_ms']['p99']} ms")
+    print(f"chunk cache     hit rate {report['chunk_cache']['hit_rate']}, coalesced {report['chunk_cache']['coalesced']}")
@@ -42,3 +42,11 @@ class Telegram:
     APPROVER_IDS                  = [int(x.strip()) for x in (getenv("APPROVER_IDS") or "").split(",") if x.strip().isdigit()]
     HTTP_PROXY_URL                = getenv("HTTP_Proxy_URL", "")
     SHOW_PROXY_AND_NON_PROXY_BOTH = getenv("SHOW_ProxyAndNonProxyBoth", "false").lower() == "true"
+
+    #----- Optional: Stream chunk cache (0 disables a tier)
+    STREAM_CACHE_MEMORY_MB = _int_env("STREAM_CACHE_MEMORY_MB", 256)
+    STREAM_CACHE_DISK_MB   = _int_env("STREAM_CACHE_DISK_MB", 2048)
+    STREAM_CACHE_DIR       = getenv("STREAM_CACHE_DIR", "stream_cache")
+
+    #----- Optional: Parallel MTProto media connections per client and DC
+    STREAM_MEDIA_SESSIONS  = _int_env("STREAM_MEDIA_SESSIONS", 2)
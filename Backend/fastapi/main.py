@@ -1,4 +1,5 @@
 import asyncio
+from typing import Optional
 
 from fastapi import Depends, FastAPI, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -41,6 +42,12 @@ from Backend.fastapi.routes.api_routes import (
     download_logs_api,
     get_admin_stats_api,
     get_db_stats_api,
+    get_index_report_api,
+    get_ingest_stats_api,
+    get_stream_index_api,
+    rebuild_stream_index_api,
+    get_search_index_api,
+    rebuild_search_index_api,
     get_all_subscribers_api,
     get_all_tokens_api,
     get_auto_catalog_settings_api,
@@ -246,9 +253,10 @@ async def list_media(
     page_size: int = Query(24, ge=1, le=100),
     search: str = Query("", max_length=100),
     custom: bool = Query(False),
+    cursor: Optional[str] = Query(None, max_length=2048),
     _: bool = Depends(require_auth)
 ):
-    return await list_media_api(media_type, page, page_size, search, custom)
+    return await list_media_api(media_type, page, page_size, search, custom, cursor)
 
 @app.delete("/api/media/delete")
 async def delete_media(tmdb_id: int, db_index: int, media_type: str, _: bool = Depends(require_auth)):
@@ -658,6 +666,30 @@ async def session_remove(_: bool = Depends(require_auth)):
 async def admin_db_stats(_: bool = Depends(require_auth)):
     return await get_db_stats_api()
 
+@app.get("/api/admin/db-indexes")
+async def admin_db_indexes(_: bool = Depends(require_auth)):
+    return await get_index_report_api()
+
+@app.get("/api/admin/stream-index")
+async def admin_stream_index(_: bool = Depends(require_auth)):
+    return await get_stream_index_api()
+
+@app.post("/api/admin/stream-index/rebuild")
+async def admin_stream_index_rebuild(_: bool = Depends(require_auth)):
+    return await rebuild_stream_index_api()
+
+@app.get("/api/admin/search-index")
+async def admin_search_index(_: bool = Depends(require_auth)):
+    return await get_search_index_api()
+
+@app.post("/api/admin/search-index/rebuild")
+async def admin_search_index_rebuild(_: bool = Depends(require_auth)):
+    return await rebuild_search_index_api()
+
+@app.get("/api/admin/ingest")
+async def admin_ingest_stats(_: bool = Depends(require_auth)):
+    return await get_ingest_stats_api()
+
 @app.get("/api/admin/health")
 async def admin_health(_: bool = Depends(require_auth)):
     return await health_api()
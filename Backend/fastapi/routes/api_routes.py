@@ -7,6 +7,7 @@ import secrets
 import shutil
 from datetime import datetime
 from time import time
+from typing import Optional
 
 from fastapi import HTTPException, Query, Request
 from fastapi.responses import FileResponse, StreamingResponse
@@ -49,6 +50,7 @@ from Backend.helper.metadata import (
     search_movie_candidates,
     search_tv_candidates,
 )
+from Backend.helper.ingest_pipeline import INGEST_PIPELINE
 from Backend.helper.passwords import hash_password, verify_password
 from Backend.helper.pyro import get_readable_file_size, get_readable_time
 from Backend.helper.scan_manager import dbcheck_manager, duplicate_manager, scan_manager
@@ -124,30 +126,29 @@ async def list_media_api(
     page: int = Query(1, ge=1),
     page_size: int = Query(24, ge=1, le=100),
     search: str = Query("", max_length=100),
-    custom: bool = Query(False)
+    custom: bool = Query(False),
+    cursor: Optional[str] = Query(None, max_length=2048),
 ):
     try:
         key = "movies" if media_type == "movie" else "tv_shows"
         #----- Custom (manually added) titles carry a negative synthetic tmdb_id
         extra_filter = {"tmdb_id": {"$lt": 0}} if custom else None
         if search:
-            result = await db.search_documents(search, page, page_size)
-            filtered_results = [
-                item for item in result['results']
-                if item.get('media_type') == media_type and (not custom or int(item.get('tmdb_id') or 0) < 0)
-            ]
-            total_filtered = len(filtered_results)
-            start_index = (page - 1) * page_size
+            result = await db.search_documents(
+                search, page, page_size, media_type=media_type, cursor=cursor, custom=custom
+            )
+            total_count = result["total_count"]
             resp = {
-                "total_count": total_filtered,
+                "total_count": total_count,
                 "current_page": page,
-                "total_pages": (total_filtered + page_size - 1) // page_size,
-                key: filtered_results[start_index:start_index + page_size],
+                "total_pages": (total_count + page_size - 1) // page_size,
+                "next_cursor": result.get("next_cursor"),
+                key: result["results"],
             }
         elif media_type == "movie":
-            resp = await db.sort_movies([], page, page_size, extra_filter=extra_filter)
+            resp = await db.sort_movies([], page, page_size, extra_filter=extra_filter, cursor=cursor)
         else:
-            resp = await db.sort_tv_shows([], page, page_size, extra_filter=extra_filter)
+            resp = await db.sort_tv_shows([], page, page_size, extra_filter=extra_filter, cursor=cursor)
         _resolve_covers(resp.get(key))
         return resp
     except Exception as e:
@@ -386,6 +387,9 @@ async def update_token_limits_api(token: str, payload: dict):
 #----- Speed test
 #----- Decode a quality_id into (chat_id, msg_id); split files use the first part
 async def _resolve_speed_test_target(quality_id: str):
+    entry = await db.lookup_stream(quality_id)
+    if entry and entry.get("chat_id") and entry.get("msg_id"):
+        return int(f"-100{entry['chat_id']}"), int(entry["msg_id"]), entry
     decoded = await decode_string(quality_id)
     target = decoded["parts"][0] if decoded.get("parts") else decoded
     msg_id = target.get("msg_id")
@@ -448,8 +452,8 @@ async def speed_test_stream_api(
         #----- Resolve the FileId to report the target DC
         target_dc = "?"
         try:
-            primary_client = multi_clients.get(0) or next(iter(multi_clients.values()))
-            streamer = ByteStreamer(primary_client)
+            primary_index = 0 if 0 in multi_clients else next(iter(multi_clients))
+            streamer = ByteStreamer.shared(multi_clients[primary_index], primary_index)
             file_id = await streamer.get_file_properties(chat_id, int(msg_id))
             target_dc = file_id.dc_id
         except Exception:
@@ -539,12 +543,20 @@ async def get_admin_stats_api() -> dict:
     }
 
 
-#----- Clear the FileId cache across all active streamers
+#----- Clear the FileId cache across all active streamers (and its persisted copy)
 async def clear_cache_api() -> dict:
     total_cleared = sum(len(s._file_id_cache) for s in _streamer_by_client.values())
     for streamer in _streamer_by_client.values():
         streamer._file_id_cache.clear()
-    LOGGER.info(f"Admin cleared the FileId cache ({total_cleared} items purged across {len(_streamer_by_client)} clients).")
+    try:
+        persisted = await db.clear_file_locations()
+    except Exception as e:
+        LOGGER.error(f"Failed clearing persisted FileId cache: {e}")
+        persisted = 0
+    LOGGER.info(
+        f"Admin cleared the FileId cache ({total_cleared} items purged across {len(_streamer_by_client)} clients, "
+        f"{persisted} persisted records)."
+    )
 
     return {"status": "success", "message": f"{total_cleared} cached items cleared."}
 
@@ -571,12 +583,12 @@ async def get_stream_analytics_api() -> dict:
 #----- Purge all stream analytics records
 async def clear_stream_analytics_api() -> dict:
     try:
-        result = await db.dbs["tracking"]["stream_analytics"].delete_many({})
-        LOGGER.info(f"Admin cleared stream analytics ({result.deleted_count} records deleted).")
+        deleted = await db.clear_stream_analytics()
+        LOGGER.info(f"Admin cleared stream analytics ({deleted} records deleted).")
 
         return {
             "status": "success",
-            "message": f"{result.deleted_count} analytics records cleared."
+            "message": f"{deleted} analytics records cleared."
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -1348,14 +1360,9 @@ async def list_custom_catalogs_api(
     try:
         catalogs = await db.get_custom_catalogs()
         if tmdb_id is not None and db_index is not None and media_type:
-            normalized_type = _normalize_media_type(media_type)
+            containing = await db.catalogs_containing_item(tmdb_id, db_index, _normalize_media_type(media_type))
             for catalog in catalogs:
-                catalog["contains_current"] = any(
-                    int(item.get("tmdb_id", -1)) == int(tmdb_id)
-                    and int(item.get("db_index", -1)) == int(db_index)
-                    and item.get("media_type") == normalized_type
-                    for item in catalog.get("items", []) or []
-                )
+                catalog["contains_current"] = str(catalog.get("_id")) in containing
         return {"catalogs": catalogs}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1483,10 +1490,8 @@ async def search_catalog_media_api(
         return {"results": [], "total_count": 0}
 
     try:
-        result = await db.search_documents(query, page, page_size)
-        normalized_type = _normalize_media_type(media_type)
-        filtered = [item for item in result.get("results", []) if item.get("media_type") == normalized_type]
-        return {"results": filtered, "total_count": len(filtered)}
+        result = await db.search_documents(query, page, page_size, media_type=_normalize_media_type(media_type))
+        return {"results": result.get("results", []), "total_count": result.get("total_count", 0)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1591,13 +1596,13 @@ async def get_catalog_order_api():
         catalogs = await db.get_custom_catalogs()
         entries = [dict(e) for e in _DEFAULT_CATALOG_ENTRIES]
         for c in catalogs:
-            items = c.get("items") or []
+            counts = c.get("counts") or {}
             cid = f"custom_{c['_id']}"
             name = c.get("name") or "Catalog"
             group = "Auto" if c.get("auto") else "Custom"
-            has_movie = any(i.get("media_type") == "movie" for i in items)
-            has_series = any(i.get("media_type") == "tv" for i in items)
-            if has_movie or not items:
+            has_movie = bool(counts.get("movie"))
+            has_series = bool(counts.get("tv"))
+            if has_movie or not c.get("item_count"):
                 entries.append({"id": cid, "name": name, "group": group, "type": "movie"})
             if has_series:
                 entries.append({"id": cid, "name": name, "group": group, "type": "series"})
@@ -2244,26 +2249,79 @@ async def purge_dead_links_api(payload: dict | None = None) -> dict:
 LOG_FILE = "log.txt"
 
 
+#----- Index usage and COLLSCAN check for the storage DBs' hot query shapes
+async def get_index_report_api() -> dict:
+    try:
+        report = await db.index_report()
+        return {
+            "status": "success",
+            "collscan_hits": sum(entry.get("collscan_hits", 0) for entry in report.values()),
+            "data": report,
+        }
+    except Exception as e:
+        LOGGER.error(f"[IndexReport] Error: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+async def get_stream_index_api() -> dict:
+    try:
+        return {"status": "success", "data": await db.stream_index_stats()}
+    except Exception as e:
+        LOGGER.error(f"[StreamIndex] Error: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+#----- Lookups fall back to scanning the storage DBs until the rebuild finishes
+async def rebuild_stream_index_api() -> dict:
+    if (await db.stream_index_stats()).get("building"):
+        return {"status": "error", "message": "Stream index rebuild already running."}
+    asyncio.create_task(db.rebuild_stream_index())
+    return {"status": "success", "message": "Stream index rebuild started."}
+
+
+async def get_search_index_api() -> dict:
+    return {"status": "success", "data": db.search_index_stats()}
+
+
+#----- Searches scan the storage DBs with a regex until the rebuild finishes
+async def rebuild_search_index_api() -> dict:
+    if db.search_index_stats().get("building"):
+        return {"status": "error", "message": "Search index rebuild already running."}
+    asyncio.create_task(db.rebuild_search_index())
+    return {"status": "success", "message": "Search index rebuild started."}
+
+
+#----- Per-stage queue depth and throughput of the channel ingestion pipeline
+async def get_ingest_stats_api() -> dict:
+    return {"status": "success", "data": INGEST_PIPELINE.stats()}
+
+
 #----- Aggregate content + system metrics across all storage DBs (was /stats)
 async def get_db_stats_api() -> dict:
     try:
         total_movies = total_tv = total_episodes = total_streams = total_db_size = 0
+        #----- Library counts come from the content rollups; walk every doc only while they build
+        content = await db.get_content_totals()
+        if content is not None:
+            total_movies, total_tv = content["movies"], content["tv_shows"]
+            total_episodes, total_streams = content["episodes"], content["streams"]
 
         for i in range(1, db.current_db_index + 1):
             storage = db.dbs.get(f"storage_{i}")
             if storage is None:
                 continue
 
-            total_movies += await storage["movie"].count_documents({})
-            async for movie in storage["movie"].find({}, {"telegram": 1}):
-                total_streams += len(movie.get("telegram", []))
+            if content is None:
+                total_movies += await storage["movie"].count_documents({})
+                async for movie in storage["movie"].find({}, {"telegram": 1}):
+                    total_streams += len(movie.get("telegram", []))
 
-            total_tv += await storage["tv"].count_documents({})
-            async for show in storage["tv"].find({}, {"seasons": 1}):
-                for season in show.get("seasons", []):
-                    for episode in season.get("episodes", []):
-                        total_episodes += 1
-                        total_streams += len(episode.get("telegram", []))
+                total_tv += await storage["tv"].count_documents({})
+                async for show in storage["tv"].find({}, {"seasons": 1}):
+                    for season in show.get("seasons", []):
+                        for episode in season.get("episodes", []):
+                            total_episodes += 1
+                            total_streams += len(episode.get("telegram", []))
 
             try:
                 total_db_size += (await storage.command("dbStats")).get("dataSize", 0)
@@ -2282,6 +2340,7 @@ async def get_db_stats_api() -> dict:
                 "db_size": get_readable_file_size(total_db_size),
                 "storage_dbs": db.current_db_index,
                 "auth_channels": len(SettingsManager.current().auth_channels),
+                "write_conflicts": db.write_conflicts,
             },
         }
     except Exception as e:
@@ -1,10 +1,12 @@
 import asyncio
+import hashlib
 import math
 import mimetypes
 import secrets
 import time
 from collections import deque
-from typing import Dict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote, unquote
 
 from fastapi import APIRouter, Depends, HTTPException, Request
@@ -15,8 +17,10 @@ from fastapi.responses import StreamingResponse
 from Backend import db
 from Backend.fastapi.security.tokens import verify_token
 from Backend.helper.analytics import client_ip_from, record_stream_start
+from Backend.helper.chunk_cache import CHUNK_CACHE
 from Backend.helper.custom_dl import ACTIVE_STREAMS, RECENT_STREAMS, ByteStreamer
 from Backend.helper.encrypt import decode_string
+from Backend.helper.readahead import readahead_stats
 from Backend.helper.utils import track_usage
 from Backend.helper.virtual_dl import resolve_virtual_parts, virtual_stream_generator
 from Backend.helper.zip_stream import resolve_zip_entry
@@ -54,32 +58,112 @@ def make_json_safe(obj):
     return obj
 
 
-#----- Parse an HTTP Range header into (start, end) bounds
-def parse_range_header(range_header: str, file_size: int):
+MAX_RANGES = 16
+
+
+#----- Parse an HTTP Range header into sorted, coalesced (start, end) bounds; [] means the whole file
+def parse_range_header(range_header: str, file_size: int) -> List[Tuple[int, int]]:
     if not range_header:
-        return 0, file_size - 1
-    try:
-        value = range_header.replace("bytes=", "").strip()
-        start_str, end_str = value.split("-")
-        if start_str == "":
-            length = int(end_str)
-            start = file_size - length
-            end = file_size - 1
-        elif end_str == "":
-            start = int(start_str)
+        return []
+    unsatisfiable = HTTPException(status_code=416, detail="Requested Range Not Satisfiable", headers={"Content-Range": f"bytes */{file_size}"})
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        raise HTTPException(status_code=416, detail="Invalid Range header", headers={"Content-Range": f"bytes */{file_size}"})
+
+    ranges = []
+    for value in spec.split(","):
+        value = value.strip()
+        if not value:
+            continue
+        try:
+            start_str, end_str = value.split("-")
+            if start_str == "":
+                length = int(end_str)
+                if length <= 0:
+                    continue
+                start = max(file_size - length, 0)
+                end = file_size - 1
+            elif end_str == "":
+                start = int(start_str)
+                end = file_size - 1
+            else:
+                start = int(start_str)
+                end = int(end_str)
+        except ValueError:
+            raise HTTPException(status_code=416, detail="Invalid Range header", headers={"Content-Range": f"bytes */{file_size}"})
+        if start < 0:
+            start = 0
+        if end >= file_size:
             end = file_size - 1
+        if start <= end:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise unsatisfiable
+
+    #----- Merge overlapping/adjacent ranges so a part is never fetched twice
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
         else:
-            start = int(start_str)
-            end = int(end_str)
-    except Exception:
-        raise HTTPException(status_code=416, detail="Invalid Range header", headers={"Content-Range": f"bytes */{file_size}"})
-    if start < 0:
-        start = 0
-    if end >= file_size:
-        end = file_size - 1
-    if end < start:
-        raise HTTPException(status_code=416, detail="Requested Range Not Satisfiable", headers={"Content-Range": f"bytes */{file_size}"})
-    return start, end
+            merged.append((start, end))
+    #----- Too many disjoint ranges: serve the whole entity instead (like nginx max_ranges)
+    if len(merged) > MAX_RANGES:
+        return []
+    return merged
+
+
+#----- Strong validators for a (possibly split) file: ETag from the Telegram unique ids,
+#----- Last-Modified from the newest message date
+def _validators(file_ids: list, variant: str = "") -> Tuple[str, Optional[str]]:
+    ids = [str(getattr(f, "unique_id", "") or getattr(f, "media_id", "")) for f in file_ids]
+    tag = ids[0] if len(ids) == 1 and not variant else hashlib.sha1(("|".join(ids) + variant).encode()).hexdigest()[:24]
+    dates = [getattr(f, "date", 0) or 0 for f in file_ids]
+    last_modified = formatdate(max(dates), usegmt=True) if all(dates) else None
+    return f'"{tag}"', last_modified
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def _not_modified_since(header: str, last_modified: Optional[str]) -> bool:
+    if not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+
+#----- Evaluate conditional headers: a 304 response, or the byte ranges to serve ([] = full body)
+def _evaluate_conditionals(request: Request, file_size: int, etag: str, last_modified: Optional[str]):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        fresh = _not_modified_since(request.headers.get("If-Modified-Since", ""), last_modified)
+    if fresh:
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        return PlainResponse(status_code=304, headers=headers), []
+
+    range_header = request.headers.get("Range", "")
+    if_range = request.headers.get("If-Range")
+    if range_header and if_range:
+        if_range = if_range.strip()
+        if if_range.startswith(("\"", "W/")):
+            valid = if_range == etag
+        else:
+            valid = bool(last_modified) and if_range == last_modified
+        if not valid:
+            range_header = ""
+    return None, parse_range_header(range_header, file_size)
 
 
 #----- Pick the least-loaded client, preferring the target DC, round-robin on ties
@@ -113,7 +197,7 @@ async def decay_client_failures() -> None:
                 client_failures[k] = max(0, client_failures[k] - 1)
 
 
-#----- Parallelism/prefetch factor scaled by the number of clients
+#----- Initial parallelism/prefetch (scaled by client count); PrefetchController adapts it live
 def get_parallel_prefetch(client_count: int) -> tuple[int, int]:
     value = min(max(math.ceil(client_count / 5), 1), 5)
     return value, value
@@ -122,7 +206,7 @@ def get_parallel_prefetch(client_count: int) -> tuple[int, int]:
 #----- Reuse (or lazily create) the cached ByteStreamer for a client index
 def _get_streamer(tg_client, index: int) -> ByteStreamer:
     if tg_client not in _streamer_by_client:
-        _streamer_by_client[tg_client] = ByteStreamer(tg_client, index)
+        _streamer_by_client[tg_client] = ByteStreamer.shared(tg_client, index)
     return _streamer_by_client[tg_client]
 
 
@@ -153,22 +237,54 @@ def _content_disposition(file_name, disposition="inline"):
     return f"{disposition}; filename=\"{ascii_fallback}\"; filename*=UTF-8''{quote(file_name, safe='')}"
 
 
-#----- Build the shared streaming response headers and status code
-def _build_stream_headers(mime_type, file_name, req_length, range_header, start, end, file_size):
+#----- Build the 200/206 response, or multipart/byteranges for several ranges. open_body(start, end, part)
+#----- returns the body generator for one range and is only called for GET.
+async def _stream_response(request, ranges, file_size, file_name, mime_type, etag, last_modified, open_body):
     headers = {
-        "Content-Type": mime_type,
         "Content-Disposition": _content_disposition(file_name),
         "Accept-Ranges": "bytes",
-        "Content-Length": str(req_length),
         "Cache-Control": "public, max-age=3600",
+        "ETag": etag,
         "Access-Control-Allow-Origin": "*",
-        "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges",
+        "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges, ETag, Last-Modified",
     }
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    if len(ranges) > 1:
+        boundary = secrets.token_hex(16)
+        crlf = "\r\n"
+        part_heads = [
+            (f"{crlf if i else ''}--{boundary}{crlf}Content-Type: {mime_type}{crlf}"
+             f"Content-Range: bytes {start}-{end}/{file_size}{crlf}{crlf}").encode()
+            for i, (start, end) in enumerate(ranges)
+        ]
+        tail = f"{crlf}--{boundary}--{crlf}".encode()
+        body_length = sum(len(h) for h in part_heads) + sum(end - start + 1 for start, end in ranges) + len(tail)
+        headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+        headers["Content-Length"] = str(body_length)
+        if request.method == "HEAD":
+            return PlainResponse(status_code=206, headers=headers)
+
+        async def multipart_body():
+            for part, ((start, end), head) in enumerate(zip(ranges, part_heads)):
+                yield head
+                async for chunk in await open_body(start, end, part):
+                    yield chunk
+            yield tail
+
+        return StreamingResponse(multipart_body(), headers=headers, status_code=206)
+
+    start, end = ranges[0] if ranges else (0, file_size - 1)
+    headers["Content-Type"] = mime_type
+    headers["Content-Length"] = str(end - start + 1)
     status = 200
-    if range_header:
+    if ranges:
         headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
         status = 206
-    return headers, status
+    if request.method == "HEAD":
+        return PlainResponse(status_code=status, headers=headers)
+    return StreamingResponse(await open_body(start, end, None), headers=headers, status_code=status, media_type=mime_type)
 
 
 _thumb_cache: Dict[str, tuple] = {}
@@ -310,14 +426,11 @@ async def media_streamer(request: Request, chat_id: int, msg_id: int, token: str
     streamer: ByteStreamer = _get_streamer(tg_client, index)
     file_id = await streamer.get_file_properties(chat_id=chat_id, message_id=msg_id)
     file_size = file_id.file_size
-    range_header = request.headers.get("Range", "")
-    start, end = parse_range_header(range_header, file_size)
-    req_length = end - start + 1
+    etag, last_modified = _validators([file_id])
+    not_modified, ranges = _evaluate_conditionals(request, file_size, etag, last_modified)
+    if not_modified:
+        return not_modified
     chunk_size = 1024 * 1024
-    offset = start - (start % chunk_size)
-    first_part_cut = start - offset
-    last_part_cut = (end % chunk_size) + 1
-    part_count = math.ceil(end / chunk_size) - math.floor(offset / chunk_size)
     stream_id = secrets.token_hex(8)
     decoded_name = unquote(request.path_params.get("name", ""))
     final_title = await _lookup_title(stream_id_hash, decoded_name)
@@ -332,7 +445,7 @@ async def media_streamer(request: Request, chat_id: int, msg_id: int, token: str
     token_count = len(multi_clients) - 1
     parallelism, prefetch_count = get_parallel_prefetch(token_count)
     extra_clients_for_stream = []
-    if parallelism > 1 and len(multi_clients) > 1:
+    if parallelism > 1 and len(multi_clients) > 1 and request.method != "HEAD":
         other_indices = sorted((i for i in multi_clients if i != index), key=lambda i: work_loads.get(i, 0))
 
         async def _get_extra_file_id(ec_idx: int):
@@ -348,32 +461,31 @@ async def media_streamer(request: Request, chat_id: int, msg_id: int, token: str
         results = await asyncio.gather(*[_get_extra_file_id(i) for i in other_indices[:parallelism - 1]])
         extra_clients_for_stream = [r for r in results if r is not None]
 
-    body_gen = await streamer.prefetch_stream(
-        file_id=file_id,
-        client_index=index,
-        offset=offset,
-        first_part_cut=first_part_cut,
-        last_part_cut=last_part_cut,
-        part_count=part_count,
-        chunk_size=chunk_size,
-        prefetch=prefetch_count,
-        stream_id=stream_id,
-        meta=meta,
-        parallelism=parallelism,
-        request=request,
-        chat_id=chat_id,
-        message_id=msg_id,
-        extra_clients=extra_clients_for_stream,
-    )
+    async def _open(start: int, end: int, part):
+        offset = start - (start % chunk_size)
+        return await streamer.prefetch_stream(
+            file_id=file_id,
+            client_index=index,
+            offset=offset,
+            first_part_cut=start - offset,
+            last_part_cut=(end % chunk_size) + 1,
+            part_count=math.ceil(end / chunk_size) - math.floor(offset / chunk_size),
+            chunk_size=chunk_size,
+            prefetch=prefetch_count,
+            stream_id=stream_id if part is None else f"{stream_id}-p{part}",
+            meta=meta,
+            parallelism=parallelism,
+            request=request,
+            chat_id=chat_id,
+            message_id=msg_id,
+            extra_clients=extra_clients_for_stream,
+        )
 
-    asyncio.create_task(track_usage(stream_id, token, token_data))
+    if request.method != "HEAD":
+        asyncio.create_task(track_usage(stream_id, token, token_data))
 
     file_name, mime_type = _resolve_filename_mime(file_id)
-    headers, status = _build_stream_headers(mime_type, file_name, req_length, range_header, start, end, file_size)
-
-    if request.method == "HEAD":
-        return PlainResponse(status_code=status, headers=headers)
-    return StreamingResponse(body_gen, headers=headers, status_code=status, media_type=mime_type)
+    return await _stream_response(request, ranges, file_size, file_name, mime_type, etag, last_modified, _open)
 
 
 #----- Stream media reconstructed from multiple split parts
@@ -386,9 +498,10 @@ async def virtual_media_streamer(request: Request, parts_payload: list, token: s
     if not parts or file_size <= 0:
         raise HTTPException(status_code=404, detail="Split media parts not found")
 
-    range_header = request.headers.get("Range", "")
-    start, end = parse_range_header(range_header, file_size)
-    req_length = end - start + 1
+    etag, last_modified = _validators([p["file_id"] for p in parts])
+    not_modified, ranges = _evaluate_conditionals(request, file_size, etag, last_modified)
+    if not_modified:
+        return not_modified
     chunk_size = 1024 * 1024
     stream_id = secrets.token_hex(8)
     decoded_name = unquote(request.path_params.get("name", ""))
@@ -406,20 +519,19 @@ async def virtual_media_streamer(request: Request, parts_payload: list, token: s
     token_count = len(multi_clients) - 1
     parallelism, prefetch_count = get_parallel_prefetch(token_count)
 
-    asyncio.create_task(track_usage(stream_id, token, token_data))
-
-    file_name, mime_type = _resolve_filename_mime(parts[0]["file_id"])
-    common_headers, status = _build_stream_headers(mime_type, file_name, req_length, range_header, start, end, file_size)
+    async def _open(start: int, end: int, part):
+        return virtual_stream_generator(
+            parts=parts, start=start, end=end, chunk_size=chunk_size,
+            streamer=streamer, client_index=index, request=request, meta=meta,
+            stream_id=stream_id if part is None else f"{stream_id}-p{part}",
+            parallelism=parallelism, prefetch_count=prefetch_count,
+        )
 
-    if request.method == "HEAD":
-        return PlainResponse(status_code=status, headers=common_headers)
+    if request.method != "HEAD":
+        asyncio.create_task(track_usage(stream_id, token, token_data))
 
-    body_gen = virtual_stream_generator(
-        parts=parts, start=start, end=end, chunk_size=chunk_size,
-        streamer=streamer, client_index=index, request=request, meta=meta,
-        stream_id=stream_id, parallelism=parallelism, prefetch_count=prefetch_count,
-    )
-    return StreamingResponse(body_gen, headers=common_headers, status_code=status, media_type=mime_type)
+    file_name, mime_type = _resolve_filename_mime(parts[0]["file_id"])
+    return await _stream_response(request, ranges, file_size, file_name, mime_type, etag, last_modified, _open)
 
 
 _userbot_streamer: ByteStreamer = None
@@ -431,7 +543,7 @@ def _get_userbot_streamer() -> ByteStreamer:
     if botmod.Userbot is None:
         return None
     if _userbot_streamer is None or _userbot_streamer.client is not botmod.Userbot:
-        _userbot_streamer = ByteStreamer(botmod.Userbot, USERBOT_CLIENT_INDEX)
+        _userbot_streamer = ByteStreamer.shared(botmod.Userbot, USERBOT_CLIENT_INDEX)
     return _userbot_streamer
 
 
@@ -449,14 +561,11 @@ async def global_media_streamer(request: Request, chat_id: int, msg_id: int, tok
         raise HTTPException(status_code=404, detail="File not accessible via Global Search")
 
     file_size = file_id.file_size
-    range_header = request.headers.get("Range", "")
-    start, end = parse_range_header(range_header, file_size)
-    req_length = end - start + 1
+    etag, last_modified = _validators([file_id])
+    not_modified, ranges = _evaluate_conditionals(request, file_size, etag, last_modified)
+    if not_modified:
+        return not_modified
     chunk_size = 1024 * 1024
-    offset = start - (start % chunk_size)
-    first_part_cut = start - offset
-    last_part_cut = (end % chunk_size) + 1
-    part_count = math.ceil(end / chunk_size) - math.floor(offset / chunk_size)
     stream_id = secrets.token_hex(8)
 
     meta = {
@@ -468,31 +577,30 @@ async def global_media_streamer(request: Request, chat_id: int, msg_id: int, tok
         "global_search": True,
     }
 
-    asyncio.create_task(track_usage(stream_id, token, token_data))
-
-    file_name, mime_type = _resolve_filename_mime(file_id)
-    headers, status = _build_stream_headers(mime_type, file_name, req_length, range_header, start, end, file_size)
+    async def _open(start: int, end: int, part):
+        offset = start - (start % chunk_size)
+        return await streamer.prefetch_stream(
+            file_id=file_id,
+            client_index=USERBOT_CLIENT_INDEX,
+            offset=offset,
+            first_part_cut=start - offset,
+            last_part_cut=(end % chunk_size) + 1,
+            part_count=math.ceil(end / chunk_size) - math.floor(offset / chunk_size),
+            chunk_size=chunk_size,
+            prefetch=1,
+            stream_id=stream_id if part is None else f"{stream_id}-p{part}",
+            meta=meta,
+            parallelism=1,
+            request=request,
+            chat_id=chat_id,
+            message_id=msg_id,
+        )
 
-    if request.method == "HEAD":
-        return PlainResponse(status_code=status, headers=headers)
+    if request.method != "HEAD":
+        asyncio.create_task(track_usage(stream_id, token, token_data))
 
-    body_gen = await streamer.prefetch_stream(
-        file_id=file_id,
-        client_index=USERBOT_CLIENT_INDEX,
-        offset=offset,
-        first_part_cut=first_part_cut,
-        last_part_cut=last_part_cut,
-        part_count=part_count,
-        chunk_size=chunk_size,
-        prefetch=1,
-        stream_id=stream_id,
-        meta=meta,
-        parallelism=1,
-        request=request,
-        chat_id=chat_id,
-        message_id=msg_id,
-    )
-    return StreamingResponse(body_gen, headers=headers, status_code=status, media_type=mime_type)
+    file_name, mime_type = _resolve_filename_mime(file_id)
+    return await _stream_response(request, ranges, file_size, file_name, mime_type, etag, last_modified, _open)
 
 
 #----- Stream a split Global Search file (multiple parts) through the Userbot session
@@ -505,9 +613,10 @@ async def global_virtual_media_streamer(request: Request, parts_payload: list, t
     if not parts or file_size <= 0:
         raise HTTPException(status_code=404, detail="Split media parts not accessible via Global Search")
 
-    range_header = request.headers.get("Range", "")
-    start, end = parse_range_header(range_header, file_size)
-    req_length = end - start + 1
+    etag, last_modified = _validators([p["file_id"] for p in parts])
+    not_modified, ranges = _evaluate_conditionals(request, file_size, etag, last_modified)
+    if not_modified:
+        return not_modified
     chunk_size = 1024 * 1024
     stream_id = secrets.token_hex(8)
     decoded_name = unquote(request.path_params.get("name", ""))
@@ -523,20 +632,19 @@ async def global_virtual_media_streamer(request: Request, parts_payload: list, t
         "split_parts": len(parts),
     }
 
-    asyncio.create_task(track_usage(stream_id, token, token_data))
-
-    file_name, mime_type = _resolve_filename_mime(parts[0]["file_id"])
-    headers, status = _build_stream_headers(mime_type, file_name, req_length, range_header, start, end, file_size)
+    async def _open(start: int, end: int, part):
+        return virtual_stream_generator(
+            parts=parts, start=start, end=end, chunk_size=chunk_size,
+            streamer=streamer, client_index=USERBOT_CLIENT_INDEX, request=request, meta=meta,
+            stream_id=stream_id if part is None else f"{stream_id}-p{part}",
+            parallelism=1, prefetch_count=1,
+        )
 
-    if request.method == "HEAD":
-        return PlainResponse(status_code=status, headers=headers)
+    if request.method != "HEAD":
+        asyncio.create_task(track_usage(stream_id, token, token_data))
 
-    body_gen = virtual_stream_generator(
-        parts=parts, start=start, end=end, chunk_size=chunk_size,
-        streamer=streamer, client_index=USERBOT_CLIENT_INDEX, request=request, meta=meta,
-        stream_id=stream_id, parallelism=1, prefetch_count=1,
-    )
-    return StreamingResponse(body_gen, headers=headers, status_code=status, media_type=mime_type)
+    file_name, mime_type = _resolve_filename_mime(parts[0]["file_id"])
+    return await _stream_response(request, ranges, file_size, file_name, mime_type, etag, last_modified, _open)
 
 
 #----- Read a byte range from the concatenated virtual parts into memory
@@ -586,9 +694,10 @@ async def _zip_media_streamer(request, parts_payload, token, token_data, stream_
     if inner_size <= 0 or data_offset + inner_size > zip_size:
         raise HTTPException(status_code=415, detail="Split archive has an unexpected layout")
 
-    range_header = request.headers.get("Range", "")
-    start, end = parse_range_header(range_header, inner_size)
-    req_length = end - start + 1
+    etag, last_modified = _validators([p["file_id"] for p in parts], variant=f"zip:{data_offset}")
+    not_modified, ranges = _evaluate_conditionals(request, inner_size, etag, last_modified)
+    if not_modified:
+        return not_modified
     stream_id = secrets.token_hex(8)
     inner_name = (entry.get("name") or "").split("/")[-1] or unquote(request.path_params.get("name", "")) or "video.mkv"
     mime_type = mimetypes.guess_type(inner_name)[0] or "video/x-matroska"
@@ -601,18 +710,19 @@ async def _zip_media_streamer(request, parts_payload, token, token_data, stream_
         "token": token,
         "zip_parts": len(parts),
     }
-    asyncio.create_task(track_usage(stream_id, token, token_data))
 
-    headers, status = _build_stream_headers(mime_type, inner_name, req_length, range_header, start, end, inner_size)
-    if request.method == "HEAD":
-        return PlainResponse(status_code=status, headers=headers)
+    async def _open(start: int, end: int, part):
+        return virtual_stream_generator(
+            parts=parts, start=data_offset + start, end=data_offset + end, chunk_size=1024 * 1024,
+            streamer=streamer, client_index=client_index, request=request, meta=meta,
+            stream_id=stream_id if part is None else f"{stream_id}-p{part}",
+            parallelism=parallelism, prefetch_count=prefetch_count,
+        )
 
-    body_gen = virtual_stream_generator(
-        parts=parts, start=data_offset + start, end=data_offset + end, chunk_size=1024 * 1024,
-        streamer=streamer, client_index=client_index, request=request, meta=meta,
-        stream_id=stream_id, parallelism=parallelism, prefetch_count=prefetch_count,
-    )
-    return StreamingResponse(body_gen, headers=headers, status_code=status, media_type=mime_type)
+    if request.method != "HEAD":
+        asyncio.create_task(track_usage(stream_id, token, token_data))
+
+    return await _stream_response(request, ranges, inner_size, inner_name, mime_type, etag, last_modified, _open)
 
 
 #----- ZIP split from Global Search (streamed via the Userbot session)
@@ -677,6 +787,11 @@ async def get_stream_stats():
             "instant_mbps": round(info.get("instant_mbps", 0.0), 3),
             "avg_mbps": round(info.get("avg_mbps", 0.0), 3),
             "peak_mbps": round(info.get("peak_mbps", 0.0), 3),
+            "parallelism": info.get("parallelism"),
+            "prefetch": info.get("prefetch"),
+            "chunk_latency_ms": info.get("chunk_latency_ms"),
+            "timeouts": info.get("timeouts", 0),
+            "flood_waits": info.get("flood_waits", 0),
             "start_ts": info.get("start_ts"),
         }
         for sid, info in ACTIVE_STREAMS.items()
@@ -703,6 +818,16 @@ async def get_stream_stats():
         "recent_streams": recent,
         "client_dc_map": client_dc_map,
         "work_loads": work_loads,
+        "chunk_cache": CHUNK_CACHE.stats(),
+        "readahead": readahead_stats(),
+        "media_sessions": {
+            streamer.client_index: streamer.pool_stats()
+            for streamer in [*_streamer_by_client.values(), _userbot_streamer]
+            if streamer is not None
+        },
+        "token_usage": db.usage_buffer.stats(),
+        "auth_cache": db.auth_cache.stats(),
+        "catalog_pages": db.catalog_pages.stats(),
     })
 
 
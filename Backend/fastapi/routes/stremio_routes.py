@@ -1,4 +1,6 @@
 import asyncio
+import hashlib
+import json
 import re
 import time
 from datetime import datetime, timedelta, timezone
@@ -7,6 +9,7 @@ from urllib.parse import quote, unquote
 
 import PTN
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.templating import Jinja2Templates
 from pyrogram.enums import ChatMemberStatus
 from pyrogram.errors import UserNotParticipant
@@ -62,13 +65,6 @@ def invalidate_membership_cache(user_id: int | None = None) -> None:
         _membership_cache.pop(key, None)
 
 
-#----- Effective (mode, allowed_tokens) for a title, honouring per-item overrides
-def _effective_visibility(catalog: dict, item: dict) -> tuple:
-    if item.get("visibility") in ("public", "tokens", "owner"):
-        return item["visibility"], (item.get("allowed_tokens") or [])
-    return (catalog.get("visibility") or "public"), (catalog.get("allowed_tokens") or [])
-
-
 #----- Whether a token may see content with the given visibility
 def _token_can_view(mode: str, allowed_tokens: list, token_data: dict) -> bool:
     user_id = token_data.get("user_id")
@@ -101,6 +97,20 @@ def _visibility_query(token_data: dict) -> dict:
     ]}
 
 
+#----- _token_can_view as a filter on catalog item rows (each row holds its effective visibility)
+def _catalog_item_query(token_data: dict) -> dict:
+    user_id = token_data.get("user_id")
+    try:
+        if user_id is not None and int(user_id) == int(Telegram.OWNER_ID):
+            return {}
+    except (TypeError, ValueError):
+        pass
+    modes = [{"visibility": "tokens", "allowed_tokens": token_data.get("token")}]
+    if not (SettingsManager.current().subscription and token_data.get("subscription_expired")):
+        modes.append({"visibility": "public"})
+    return {"$or": modes}
+
+
 #----- Hide titles locked to a single catalog from default listings / search
 def _not_exclusive_clause(allow_searchable: bool = False) -> dict:
     ors = [{"exclusive_catalog_id": {"$exists": False}}, {"exclusive_catalog_id": None}]
@@ -117,6 +127,26 @@ def _merge_filters(*filters) -> dict:
     return parts[0] if len(parts) == 1 else {"$and": parts}
 
 
+#----- Tokens in the same class are served the same catalog pages: the owner, each token named
+#----- in some allowed_tokens list, and everyone else (split by subscription state when it
+#----- gates custom catalogs). None when the class can't be worked out, so nothing is shared.
+async def _visibility_class(token_data: dict) -> Optional[str]:
+    user_id = token_data.get("user_id")
+    try:
+        if user_id is not None and int(user_id) == int(Telegram.OWNER_ID):
+            return "owner"
+    except (TypeError, ValueError):
+        pass
+    restricted = await db.restricted_tokens()
+    if restricted is None:
+        return None
+    token = token_data.get("token")
+    visibility_class = f"token:{token}" if token in restricted else "public"
+    if SettingsManager.current().subscription and token_data.get("subscription_expired"):
+        visibility_class += ":expired"
+    return visibility_class
+
+
 #----- Whether a title (by imdb id) may be seen by this token, honouring its own visibility
 async def _title_allowed(imdb_id: str, token_data: dict) -> bool:
     doc = await db.get_media_details(imdb_id=imdb_id)
@@ -280,9 +310,9 @@ def stream_res_label(stream_name: str) -> str:
     )
 
 
-#----- Manifest describing the addon's catalogs/resources for this token
-@router.get("/{token}/manifest.json")
-async def get_manifest(token: str, token_data: dict = Depends(verify_token)):
+#----- Resources and catalog list of the manifest; depends only on the token's visibility
+#----- class and addon config, so it is cached per (class, config hash) under "manifest"
+async def _manifest_catalogs(token_data: dict) -> tuple:
     if SettingsManager.current().hide_catalog:
         resources = ["stream", "subtitles"]
         catalogs = []
@@ -335,16 +365,13 @@ async def get_manifest(token: str, token_data: dict = Depends(verify_token)):
 
         try:
             custom_catalogs = await db.get_custom_catalogs()
+            visible_types = await db.catalog_item_types(custom_catalogs, _catalog_item_query(token_data))
             for catalog in custom_catalogs:
-                visible_items = [
-                    i for i in (catalog.get("items") or [])
-                    if _token_can_view(*_effective_visibility(catalog, i), token_data)
-                ]
-                has_movie = any(i.get("media_type") == "movie" for i in visible_items)
-                has_series = any(i.get("media_type") == "tv" for i in visible_items)
+                catalog_id = str(catalog.get("_id"))
+                has_movie = "movie" in visible_types.get(catalog_id, ())
+                has_series = "tv" in visible_types.get(catalog_id, ())
                 if not has_movie and not has_series:
                     continue
-                catalog_id = str(catalog.get("_id"))
                 catalog_name = catalog.get("name") or "Custom Catalog"
                 if has_movie:
                     catalogs.append({
@@ -386,6 +413,28 @@ async def get_manifest(token: str, token_data: dict = Depends(verify_token)):
         except Exception:
             pass
 
+    return resources, catalogs
+
+
+def _config_hash(config: dict) -> str:
+    return hashlib.sha1(json.dumps(config or {}, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+#----- Manifest describing the addon's catalogs/resources for this token. Served with an ETag
+#----- versioned by the manifest generation, so Stremio's refetches get a 304 until catalogs,
+#----- catalog order, settings or this token's config/expiry change.
+@router.get("/{token}/manifest.json")
+async def get_manifest(request: Request, token: str, token_data: dict = Depends(verify_token)):
+    config_hash = _config_hash(token_data.get("config"))
+    visibility_class = await _visibility_class(token_data)
+    epoch, version = db.catalog_pages.generation("manifest")
+    cache_key = ("manifest", visibility_class, config_hash)
+    cached = db.catalog_pages.get(cache_key) if visibility_class is not None else None
+    if cached is None:
+        cached = await _manifest_catalogs(token_data)
+        if visibility_class is not None:
+            db.catalog_pages.put(cache_key, (epoch, version), cached)
+    resources, catalogs = cached
 
     addon_name = ADDON_NAME
     addon_desc = "Streams movies and series from your Telegram."
@@ -397,7 +446,7 @@ async def get_manifest(token: str, token_data: dict = Depends(verify_token)):
         if expiry_obj is None and SettingsManager.current().subscription:
             user_id = token_data.get("user_id")
             if user_id:
-                user = await db.get_user(int(user_id))
+                user = await db.get_user_cached(int(user_id))
                 if user and user.get("subscription_status") == "active":
                     expiry_obj = user.get("subscription_expiry")
 
@@ -412,7 +461,16 @@ async def get_manifest(token: str, token_data: dict = Depends(verify_token)):
     except Exception:
         pass
 
-    return {
+    settings = SettingsManager.current()
+    digest = hashlib.sha1("|".join(
+        (token, str(visibility_class), config_hash, addon_version, addon_desc, settings.base_url or "")
+    ).encode()).hexdigest()[:16]
+    etag = f'"m{epoch}.{version}-{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse({
         "id": f"telegram.media.{token[:8]}",
         "version": addon_version,
         "name": addon_name,
@@ -431,10 +489,10 @@ async def get_manifest(token: str, token_data: dict = Depends(verify_token)):
                 "key": "manifest_url",
                 "title": "Your Addon URL (copy to reinstall)",
                 "type": "text",
-                "default": f"{SettingsManager.current().base_url}/stremio/{token}/manifest.json"
+                "default": f"{settings.base_url}/stremio/{token}/manifest.json"
             }
         ]
-    }
+    }, headers=headers)
 
 
 #----- Catalog listing (latest/popular/custom, with genre/search/skip)
@@ -466,6 +524,18 @@ async def get_catalog(token: str, media_type: str, id: str, extra: Optional[str]
 
     page = (stremio_skip // PAGE_SIZE) + 1
 
+    #----- Browse pages are materialised per visibility class; searches are always computed
+    page_key = generation = None
+    if not search_query:
+        visibility_class = await _visibility_class(token_data)
+        if visibility_class is not None:
+            scope = "custom" if id.startswith("custom_") else ("tv" if media_type == "series" else "movie")
+            page_key = (scope, id, media_type, genre_filter or "", page, visibility_class)
+            cached = db.catalog_pages.get(page_key)
+            if cached is not None:
+                return cached
+            generation = db.catalog_pages.generation(scope)
+
     try:
         if id.startswith("custom_"):
             catalog_id = id.removeprefix("custom_")
@@ -474,23 +544,19 @@ async def get_catalog(token: str, media_type: str, id: str, extra: Optional[str]
                 return {"metas": []}
 
             db_media_type = "tv" if media_type == "series" else "movie"
-            visible_items = [
-                it for it in (catalog.get("items") or [])
-                if it.get("media_type") == db_media_type
-                and _token_can_view(*_effective_visibility(catalog, it), token_data)
-            ]
-            visible_items.sort(key=lambda it: it.get("updated_on") or it.get("added_at") or datetime.min, reverse=True)
-            start = (page - 1) * PAGE_SIZE
-            items = await db.get_documents(visible_items[start:start + PAGE_SIZE])
+            rows = await db.catalog_item_page(
+                catalog_id, db_media_type, page, PAGE_SIZE, _catalog_item_query(token_data)
+            )
+            items = await db.get_documents(rows)
             items = [it for it in items if _token_can_view(it.get("visibility") or "public", it.get("allowed_tokens") or [], token_data)]
         elif search_query:
+            db_media_type = "tv" if media_type == "series" else "movie"
             search_results = await db.search_documents(
                 query=search_query, page=page, page_size=PAGE_SIZE,
                 extra_filter=_merge_filters(_visibility_query(token_data), _not_exclusive_clause(allow_searchable=True)),
+                media_type=db_media_type,
             )
-            all_items = search_results.get("results", [])
-            db_media_type = "tv" if media_type == "series" else "movie"
-            items = [item for item in all_items if item.get("media_type") == db_media_type]
+            items = search_results.get("results", [])
         else:
             if "latest" in id:
                 sort_params = [("updated_on", "desc")]
@@ -512,7 +578,10 @@ async def get_catalog(token: str, media_type: str, id: str, extra: Optional[str]
     metas = [convert_to_stremio_meta(item) for item in items]
     if SettingsManager.current().fanart_enabled:
         await asyncio.gather(*(_apply_fanart(m, it) for m, it in zip(metas, items)))
-    return {"metas": metas}
+    result = {"metas": metas}
+    if page_key is not None:
+        db.catalog_pages.put(page_key, generation, result)
+    return result
 
 
 #----- Detailed metadata for a title, including series episode list
@@ -915,14 +984,16 @@ async def _addon_catalogs_for_token(token_data: dict) -> list:
         {"id": "top_series", "name": "Popular Series", "type": "series"},
     ]
     try:
-        for c in await db.get_custom_catalogs():
-            items = [i for i in (c.get("items") or []) if _token_can_view(*_effective_visibility(c, i), token_data)]
-            if not items:
+        custom_catalogs = await db.get_custom_catalogs()
+        visible_types = await db.catalog_item_types(custom_catalogs, _catalog_item_query(token_data))
+        for c in custom_catalogs:
+            types = visible_types.get(str(c["_id"]))
+            if not types:
                 continue
             cid, name = f"custom_{c['_id']}", (c.get("name") or "Catalog")
-            if any(i.get("media_type") == "movie" for i in items):
+            if "movie" in types:
                 entries.append({"id": cid, "name": name, "type": "movie"})
-            if any(i.get("media_type") == "tv" for i in items):
+            if "tv" in types:
                 entries.append({"id": cid, "name": name, "type": "series"})
     except Exception:
         pass
@@ -13,7 +13,7 @@ SUBSCRIPTION_EXPIRED_VIDEO = "https://bit.ly/4rfjtgd"
 
 #----- Validate an API token and annotate it with subscription/limit status
 async def verify_token(token: str):
-    token_data = await db.get_api_token(token)
+    token_data = await db.get_api_token_cached(token)
     if not token_data:
         raise HTTPException(status_code=401, detail="Invalid or expired API token")
 
@@ -56,7 +56,7 @@ async def verify_token(token: str):
                 return token_data
         elif SettingsManager.current().subscription:
             user_id = token_data.get("user_id")
-            user = await db.get_user(int(user_id)) if user_id else None
+            user = await db.get_user_cached(int(user_id)) if user_id else None
             expiry = user.get("subscription_expiry") if user else None
             if (not user_id or not user
                     or user.get("subscription_status") != "active"
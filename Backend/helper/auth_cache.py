@@ -0,0 +1,124 @@
+import copy
+import time
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+#----- Sentinel for "looked up, not found" so unknown tokens don't hit Mongo on every request
+_MISSING = object()
+
+
+#----- Small TTL map with hit/miss counters; values are deep-copied out so callers can
+#----- annotate what they get back (verify_token does) without touching the cached doc
+class _TTLMap:
+    __slots__ = ("ttl", "max_entries", "_items", "hits", "misses")
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._items: Dict[Hashable, Tuple[float, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        item = self._items.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._items[key]
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        return item[1]
+
+    def peek(self, key: Hashable) -> Any:
+        item = self._items.get(key)
+        return item[1] if item is not None else None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if key not in self._items and len(self._items) >= self.max_entries:
+            now = time.monotonic()
+            for k in [k for k, (expires, _) in self._items.items() if expires < now]:
+                del self._items[k]
+            if len(self._items) >= self.max_entries:
+                self._items.pop(next(iter(self._items)))
+        self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key: Hashable) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+#----- Token and user documents read by verify_token. Every write path in Database pushes an
+#----- invalidation, so the TTL only bounds staleness from writes made by other processes.
+class AuthCache:
+    TTL = 60
+    MAX_ENTRIES = 20000
+
+    def __init__(self, ttl: float = TTL, max_entries: int = MAX_ENTRIES):
+        self._tokens = _TTLMap(ttl, max_entries)
+        self._users = _TTLMap(ttl, max_entries)
+        self._tokens_by_user: Dict[Any, Set[str]] = {}
+        self.invalidations = 0
+
+    def get_token(self, token: str) -> Tuple[bool, Optional[dict]]:
+        value = self._tokens.get(token)
+        if value is _MISSING:
+            return False, None
+        return True, copy.deepcopy(value)
+
+    def put_token(self, token: str, doc: Optional[dict]) -> None:
+        self._tokens.put(token, copy.deepcopy(doc))
+        if doc and doc.get("user_id") is not None:
+            self._tokens_by_user.setdefault(doc["user_id"], set()).add(token)
+
+    #----- The cached doc itself (no copy), for in-place usage bumps after a flush
+    def cached_token(self, token: str) -> Optional[dict]:
+        return self._tokens.peek(token)
+
+    def get_user(self, user_id) -> Tuple[bool, Optional[dict]]:
+        value = self._users.get(user_id)
+        if value is _MISSING:
+            return False, None
+        return True, copy.deepcopy(value)
+
+    def put_user(self, user_id, doc: Optional[dict]) -> None:
+        self._users.put(user_id, copy.deepcopy(doc))
+
+    def invalidate_token(self, token: Optional[str]) -> None:
+        if token:
+            self._tokens.pop(token)
+            self.invalidations += 1
+
+    #----- A user change also drops that user's tokens (their access derives from the user)
+    def invalidate_user(self, user_id) -> None:
+        if user_id is None:
+            return
+        self._users.pop(user_id)
+        for token in self._tokens_by_user.pop(user_id, ()):
+            self._tokens.pop(token)
+        self.invalidations += 1
+
+    def clear_tokens(self) -> None:
+        self._tokens.clear()
+        self._tokens_by_user.clear()
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self.clear_tokens()
+        self._users.clear()
+
+    def stats(self) -> dict:
+        return {
+            "tokens": self._tokens.stats(),
+            "users": self._users.stats(),
+            "invalidations": self.invalidations,
+        }
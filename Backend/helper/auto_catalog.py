@@ -3,6 +3,7 @@ from datetime import datetime
 from typing import Dict, List, Optional, Set, Tuple
 
 import httpx
+from pymongo import ReturnDocument
 
 from Backend.helper.metadata import tmdb_api_key
 from Backend.logger import LOGGER
@@ -473,7 +474,7 @@ async def _flush_quick_items(db, catalog_items: Dict[str, List[dict]]) -> None:
 
     for name, items in catalog_items.items():
         auto_key = _catalog_key(name)
-        await collection.update_one(
+        catalog = await collection.find_one_and_update(
             {"auto_key": auto_key},
             {
                 "$setOnInsert": {
@@ -483,8 +484,8 @@ async def _flush_quick_items(db, catalog_items: Dict[str, List[dict]]) -> None:
                     "allowed_tokens": [],
                     "auto": True,
                     "auto_key": auto_key,
-                    "items": [],
                     "item_count": 0,
+                    "counts": {"movie": 0, "tv": 0},
                     "created_at": now,
                 },
                 "$set": {
@@ -492,29 +493,12 @@ async def _flush_quick_items(db, catalog_items: Dict[str, List[dict]]) -> None:
                     "last_auto_sync": now,
                 },
             },
+            projection={"_id": 1},
             upsert=True,
+            return_document=ReturnDocument.AFTER,
         )
-
-        for item in items:
-            await collection.update_one(
-                {
-                    "auto_key": auto_key,
-                    "items": {
-                        "$not": {
-                            "$elemMatch": {
-                                "tmdb_id": item["tmdb_id"],
-                                "db_index": item["db_index"],
-                                "media_type": item["media_type"],
-                            }
-                        }
-                    },
-                },
-                {
-                    "$push": {"items": {"$each": [item], "$position": 0}},
-                    "$set": {"updated_at": now},
-                    "$inc": {"item_count": 1},
-                },
-            )
+        await db.add_catalog_items(str(catalog["_id"]), items)
+    db.catalog_pages.invalidate("custom", "manifest")
 
 
 async def _rebuild_auto_catalogs(db, catalog_items: Dict[str, List[dict]], enabled_names: Set[str]) -> None:
@@ -531,9 +515,7 @@ async def _rebuild_auto_catalogs(db, catalog_items: Dict[str, List[dict]], enabl
             seen.add(key)
             unique_items.append(item)
 
-        unique_items.sort(key=lambda it: it.get("updated_on") or it.get("added_at") or datetime.min, reverse=True)
-
-        await collection.update_one(
+        catalog = await collection.find_one_and_update(
             {"auto_key": _catalog_key(name)},
             {
                 "$set": {
@@ -541,22 +523,24 @@ async def _rebuild_auto_catalogs(db, catalog_items: Dict[str, List[dict]], enabl
                     "visible": True,
                     "auto": True,
                     "auto_key": _catalog_key(name),
-                    "items": unique_items,
-                    "item_count": len(unique_items),
                     "updated_at": now,
                     "last_auto_sync": now,
                 },
                 "$setOnInsert": {"created_at": now, "visibility": "public", "allowed_tokens": []},
             },
+            projection={"_id": 1},
             upsert=True,
+            return_document=ReturnDocument.AFTER,
         )
+        await db.replace_catalog_items(str(catalog["_id"]), unique_items)
 
 
     active_keys = {_catalog_key(name) for name in enabled_names}
-    await collection.update_many(
-        {"auto": True, "auto_key": {"$nin": list(active_keys)}},
-        {"$set": {"visible": False, "items": [], "item_count": 0, "updated_at": now}},
-    )
+    stale = await collection.distinct("_id", {"auto": True, "auto_key": {"$nin": list(active_keys)}})
+    if stale:
+        await collection.update_many({"_id": {"$in": stale}}, {"$set": {"visible": False, "updated_at": now}})
+        await db.clear_catalog_items([str(cid) for cid in stale])
+    db.catalog_pages.invalidate("custom", "manifest")
 
 
 async def _write_status(db, data: dict) -> None:
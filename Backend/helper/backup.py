@@ -14,6 +14,7 @@ _SETTINGS_EXCLUDE = {"admin_password", "session_secret"}
 #----- backup section -> tracking collection
 _COLLECTIONS = {
     "custom_catalogs": "custom_catalogs",
+    "catalog_items": "catalog_items",
     "subscription_plans": "sub_plans",
     "tokens": "api_tokens",
 }
@@ -96,6 +97,14 @@ async def import_config(payload: dict) -> dict:
         if docs:
             await collection.insert_many(docs)
         result[label] = f"{len(docs)} restored"
+    #----- Older backups embed catalog items in the catalogs: drop rows for the replaced
+    #----- catalogs and split the embedded arrays out again
+    if isinstance(payload.get("custom_catalogs"), list) and not isinstance(payload.get("catalog_items"), list):
+        await db.dbs["tracking"]["catalog_items"].delete_many({})
+    await db.migrate_catalog_items()
+    db.invalidate_catalog_items()
+    db.auth_cache.clear()
+    db.catalog_pages.clear()
 
     LOGGER.info(f"[BACKUP] Config restored: {result}")
     return result
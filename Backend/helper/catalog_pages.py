@@ -0,0 +1,72 @@
+import time
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+
+#----- Ready-to-serve Stremio catalog responses, keyed by (scope, catalog id, type, genre, page,
+#----- visibility class), plus the manifest catalog lists. The scope ("movie", "tv", "custom" or
+#----- "manifest") leads every key; Database bumps a scope's generation on each write that can
+#----- change its pages, and a page built under an older generation is never served. The TTL
+#----- only bounds staleness from writes made by other processes.
+class CatalogPageCache:
+    TTL = 600
+    MAX_ENTRIES = 5000
+
+    def __init__(self, ttl: float = TTL, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pages: Dict[Tuple[Hashable, ...], Tuple[float, Tuple[int, int], Any]] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        #----- Tokens named in any allowed_tokens list (they get a visibility class of their own)
+        self.restricted_tokens: Optional[Set[str]] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    #----- Capture before building a page; pass to put() so a build raced by a write is dropped
+    def generation(self, scope: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(scope, 0)
+
+    def get(self, key: Tuple[Hashable, ...]) -> Any:
+        item = self._pages.get(key)
+        if item is None or item[0] < time.monotonic() or item[1] != self.generation(key[0]):
+            if item is not None:
+                del self._pages[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item[2]
+
+    def put(self, key: Tuple[Hashable, ...], generation: Tuple[int, int], payload: Any) -> None:
+        if generation != self.generation(key[0]):
+            return
+        if key not in self._pages and len(self._pages) >= self.max_entries:
+            now = time.monotonic()
+            for k in [k for k, item in self._pages.items() if item[0] < now or item[1] != self.generation(k[0])]:
+                del self._pages[k]
+            if len(self._pages) >= self.max_entries:
+                self._pages.pop(next(iter(self._pages)))
+        self._pages[key] = (time.monotonic() + self.ttl, generation, payload)
+
+    def invalidate(self, *scopes: str) -> None:
+        for scope in scopes:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+        self.invalidations += 1
+
+    #----- Visibility, exclusivity or settings changed: every page and visibility class is suspect
+    def clear(self) -> None:
+        self._epoch += 1
+        self._pages.clear()
+        self.restricted_tokens = None
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "pages": len(self._pages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "restricted_tokens": len(self.restricted_tokens) if self.restricted_tokens is not None else None,
+        }
@@ -0,0 +1,246 @@
+import asyncio
+import os
+import secrets
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from aiofiles import open as aiopen
+
+from Backend.config import Telegram
+from Backend.logger import LOGGER
+
+ChunkKey = Tuple[int, int, int]
+
+
+#----- One shared upstream fetch plus the number of readers waiting on it
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+#----- Content-addressed Telegram chunk cache: in-memory LRU that spills to local disk.
+#----- Keys are (media_id, offset, chunk_size), so every bot client shares the same entries.
+class ChunkCache:
+    def __init__(self, memory_budget: int, disk_budget: int, disk_dir: str):
+        self.memory_budget = max(0, memory_budget)
+        self.disk_budget = max(0, disk_budget)
+        self.disk_dir = disk_dir
+        self._mem: "OrderedDict[ChunkKey, bytes]" = OrderedDict()
+        self._disk: "OrderedDict[ChunkKey, int]" = OrderedDict()
+        self._mem_bytes = 0
+        self._disk_bytes = 0
+        #----- Keys being spilled right now (reserved before the await so a spill runs once)
+        self._disk_writing: Set[ChunkKey] = set()
+        self._inflight: Dict[ChunkKey, _Flight] = {}
+        self.counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "upstream_fetches": 0,
+            "coalesced": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "disk_errors": 0,
+        }
+        if self.disk_budget:
+            self._load_disk_index()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.memory_budget or self.disk_budget)
+
+    def _path(self, key: ChunkKey) -> str:
+        media_id, offset, chunk_size = key
+        return os.path.join(self.disk_dir, f"{media_id}_{offset}_{chunk_size}.bin")
+
+    #----- Rebuild the disk index from a previous run (oldest files evict first)
+    def _load_disk_index(self) -> None:
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.disk_dir):
+                name = entry.name
+                if not name.endswith(".bin"):
+                    if name.endswith(".tmp"):
+                        os.remove(entry.path)
+                    continue
+                try:
+                    media_id, offset, chunk_size = (int(x) for x in name[:-4].split("_"))
+                    st = entry.stat()
+                except (ValueError, OSError):
+                    continue
+                entries.append((st.st_mtime, (media_id, offset, chunk_size), st.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+            self._trim_disk()
+            if self._disk:
+                LOGGER.info(f"Chunk cache: restored {len(self._disk)} chunk(s) from {self.disk_dir}")
+        except OSError as e:
+            LOGGER.warning(f"Chunk cache: disk tier disabled ({e})")
+            self.disk_budget = 0
+
+    def _trim_disk(self) -> None:
+        while self._disk_bytes > self.disk_budget and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.counters["disk_evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _drop_disk(self, key: ChunkKey) -> None:
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _put_memory(self, key: ChunkKey, data: bytes) -> list:
+        if key in self._mem:
+            self._mem.move_to_end(key)
+            return []
+        if len(data) > self.memory_budget:
+            return [(key, data)]
+        self._mem[key] = data
+        self._mem_bytes += len(data)
+        spilled = []
+        while self._mem_bytes > self.memory_budget and self._mem:
+            old_key, old_data = self._mem.popitem(last=False)
+            self._mem_bytes -= len(old_data)
+            self.counters["memory_evictions"] += 1
+            spilled.append((old_key, old_data))
+        return spilled
+
+    async def _write_disk(self, key: ChunkKey, data: bytes) -> None:
+        if (not self.disk_budget or key in self._disk or key in self._disk_writing
+                or len(data) > self.disk_budget):
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{secrets.token_hex(4)}.tmp"
+        self._disk_writing.add(key)
+        try:
+            async with aiopen(tmp_path, "wb") as f:
+                await f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.counters["disk_errors"] += 1
+            LOGGER.debug(f"Chunk cache: disk write failed for {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        finally:
+            self._disk_writing.discard(key)
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._trim_disk()
+
+    #----- Cached bytes for a chunk, or None on miss
+    async def get(self, key: ChunkKey) -> Optional[bytes]:
+        data = self._mem.get(key)
+        if data is not None:
+            self._mem.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return data
+
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            try:
+                async with aiopen(self._path(key), "rb") as f:
+                    data = await f.read()
+            except OSError:
+                self._drop_disk(key)
+                self.counters["disk_errors"] += 1
+                data = None
+            if data:
+                self.counters["disk_hits"] += 1
+                if self.memory_budget:
+                    for old_key, old_data in self._put_memory(key, data):
+                        await self._write_disk(old_key, old_data)
+                return data
+
+        self.counters["misses"] += 1
+        return None
+
+    #----- Store a freshly fetched chunk; memory overflow spills to the disk tier
+    async def put(self, key: ChunkKey, data: bytes) -> None:
+        if not data or not self.enabled:
+            return
+        if not self.memory_budget:
+            await self._write_disk(key, data)
+            return
+        for old_key, old_data in self._put_memory(key, data):
+            await self._write_disk(old_key, old_data)
+
+    #----- Cached bytes, else join (or start) the single in-flight upstream fetch for this key.
+    #----- The shared fetch is cancelled only once every waiting reader has gone away.
+    async def get_or_fetch(self, key: ChunkKey, producer: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            async def _run() -> Optional[bytes]:
+                data = await producer()
+                if data:
+                    await self.put(key, data)
+                return data
+
+            flight = _Flight(asyncio.create_task(_run()))
+            self._inflight[key] = flight
+            self.counters["upstream_fetches"] += 1
+
+            def _done(_task, _key=key, _flight=flight):
+                if self._inflight.get(_key) is _flight:
+                    del self._inflight[_key]
+
+            flight.task.add_done_callback(_done)
+        else:
+            self.counters["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters <= 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def clear(self) -> None:
+        self._mem.clear()
+        self._mem_bytes = 0
+        for key in list(self._disk):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        self._disk.clear()
+        self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        c = self.counters
+        hits = c["memory_hits"] + c["disk_hits"]
+        lookups = hits + c["misses"]
+        return {
+            **c,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_chunks": len(self._mem),
+            "memory_bytes": self._mem_bytes,
+            "memory_budget": self.memory_budget,
+            "disk_chunks": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "disk_budget": self.disk_budget,
+            "inflight": len(self._inflight),
+        }
+
+
+CHUNK_CACHE = ChunkCache(
+    memory_budget=Telegram.STREAM_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_budget=Telegram.STREAM_CACHE_DISK_MB * 1024 * 1024,
+    disk_dir=Telegram.STREAM_CACHE_DIR,
+)
@@ -4,7 +4,7 @@ import re
 import secrets
 import time
 import traceback
-from collections import deque
+from collections import OrderedDict, deque
 from typing import Dict, List, Optional, Tuple, Union
 
 from fastapi import Request
@@ -14,8 +14,11 @@ from pyrogram.file_id import FileId
 from pyrogram.session import Auth, Session
 
 from Backend import db
+from Backend.config import Telegram
+from Backend.helper.chunk_cache import CHUNK_CACHE
 from Backend.helper.exceptions import FileNotFound
-from Backend.helper.pyro import get_file_ids
+from Backend.helper.pyro import file_id_from_record, file_id_to_record, get_file_ids
+from Backend.helper.readahead import READAHEAD_BYTES, get_readahead_session
 from Backend.logger import LOGGER
 from Backend.pyrofork.bot import client_avg_mbps, client_dc_map, client_failures, multi_clients, work_loads
 
@@ -23,65 +26,277 @@ ACTIVE_STREAMS: Dict[str, Dict] = {}
 RECENT_STREAMS = deque(maxlen=20)
 
 
+#----- Per-stream AIMD controller for the in-flight chunk window and readahead depth.
+#----- Grows by one chunk per clean window while throughput keeps improving, halves on
+#----- timeouts / FloodWait, and backs off by one when chunk latency balloons. Each
+#----- decrease opens a new generation; failures of fetches issued before it are ignored.
+class PrefetchController:
+    MAX_PARALLELISM = 8
+    LATENCY_TARGET = 3.0
+    EWMA_ALPHA = 0.3
+
+    __slots__ = (
+        "parallelism", "prefetch", "min_prefetch", "max_parallelism",
+        "latency_ewma", "latency_floor", "timeouts", "flood_waits",
+        "generation", "_window_ok", "_last_increase_mbps", "_entry", "_unthrottled",
+    )
+
+    def __init__(self, parallelism: int, prefetch: int, entry: dict):
+        self.parallelism = max(1, parallelism)
+        self.min_prefetch = max(1, prefetch)
+        self.prefetch = max(self.min_prefetch, self.parallelism)
+        self.max_parallelism = max(self.parallelism, min(self.MAX_PARALLELISM, self.parallelism * 4))
+        self.latency_ewma = 0.0
+        self.latency_floor = 0.0
+        self.timeouts = 0
+        self.flood_waits = 0
+        self.generation = 0
+        self._window_ok = 0
+        self._last_increase_mbps = 0.0
+        self._entry = entry
+        self._unthrottled: Optional[Tuple[int, int]] = None
+        self._publish()
+
+    def _publish(self) -> None:
+        self._entry["parallelism"] = self.parallelism
+        self._entry["prefetch"] = self.prefetch
+        self._entry["max_parallelism"] = self.max_parallelism
+        self._entry["chunk_latency_ms"] = round(self.latency_ewma * 1000, 1)
+        self._entry["timeouts"] = self.timeouts
+        self._entry["flood_waits"] = self.flood_waits
+
+    def _resize(self, parallelism: int) -> None:
+        self.parallelism = max(1, min(self.max_parallelism, parallelism))
+        self.prefetch = max(self.min_prefetch, self.parallelism)
+        self._window_ok = 0
+        self._publish()
+
+    #----- One upstream chunk arrived after `latency` seconds
+    def on_success(self, latency: float) -> None:
+        if self.latency_ewma == 0.0:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.EWMA_ALPHA * (latency - self.latency_ewma)
+        if self.latency_floor == 0.0 or latency < self.latency_floor:
+            self.latency_floor = latency
+
+        self._window_ok += 1
+        if self._window_ok < self.parallelism:
+            self._entry["chunk_latency_ms"] = round(self.latency_ewma * 1000, 1)
+            return
+
+        #----- A full window completed without congestion: probe or back off on delay
+        if self.latency_ewma > max(self.LATENCY_TARGET, 2.5 * self.latency_floor):
+            self.generation += 1
+            self._last_increase_mbps = 0.0
+            self._resize(self.parallelism - 1)
+            return
+        mbps = self._entry.get("instant_mbps", 0.0)
+        if self.parallelism < self.max_parallelism and mbps >= self._last_increase_mbps * 1.05:
+            self._last_increase_mbps = mbps
+            self._resize(self.parallelism + 1)
+        else:
+            self._window_ok = 0
+            self._publish()
+
+    #----- Halve once per generation: the rest of a window failing together is one signal
+    def _halve(self, issued: int) -> None:
+        if issued != self.generation:
+            self._publish()
+            return
+        self.generation += 1
+        self._last_increase_mbps = 0.0
+        self._resize(self.parallelism // 2)
+
+    #----- `issued` is the generation the failed fetch was sent under
+    def on_timeout(self, issued: int) -> None:
+        self.timeouts += 1
+        self._halve(issued)
+
+    def on_flood(self, issued: int) -> None:
+        self.flood_waits += 1
+        self._halve(issued)
+
+    @property
+    def throttled(self) -> bool:
+        return self._unthrottled is not None
+
+    #----- Superseded by a seek elsewhere in the file: fetch on demand only
+    def throttle(self) -> None:
+        if self._unthrottled is None:
+            self._unthrottled = (self.max_parallelism, self.min_prefetch)
+        self.max_parallelism = 1
+        self.min_prefetch = 1
+        self._resize(1)
+
+    #----- The player is still reading this stream: lift the cap, AIMD grows it back
+    def recover(self) -> None:
+        if self._unthrottled is None:
+            return
+        self.max_parallelism, self.min_prefetch = self._unthrottled
+        self._unthrottled = None
+        self._last_increase_mbps = 0.0
+        self._resize(self.parallelism)
+
+
+#----- Per-stream throughput counters kept off the shared registry in the hot loop;
+#----- flush() publishes them to the ACTIVE_STREAMS entry every FLUSH_INTERVAL seconds
+class _StreamStats:
+    __slots__ = ("start_ts", "last_ts", "total_bytes", "peak_mbps", "instant_mbps",
+                 "window", "window_bytes", "window_time", "flushed_at")
+
+    FLUSH_INTERVAL = 0.5
+    WINDOW = 3
+
+    def __init__(self, start_ts: float):
+        self.start_ts = start_ts
+        self.last_ts = start_ts
+        self.total_bytes = 0
+        self.peak_mbps = 0.0
+        self.instant_mbps = 0.0
+        self.window: deque = deque()
+        self.window_bytes = 0
+        self.window_time = 0.0
+        self.flushed_at = start_ts
+
+    #----- Account one delivered chunk; the instant rate is a running sum over the last WINDOW chunks
+    def record(self, nbytes: int, now_ts: float) -> None:
+        elapsed = now_ts - self.last_ts
+        if elapsed <= 0:
+            elapsed = 1e-6
+        self.last_ts = now_ts
+        self.total_bytes += nbytes
+
+        window = self.window
+        window.append((nbytes, elapsed))
+        self.window_bytes += nbytes
+        self.window_time += elapsed
+        if len(window) > self.WINDOW:
+            old_bytes, old_time = window.popleft()
+            self.window_bytes -= old_bytes
+            self.window_time -= old_time
+
+        if len(window) >= 2:
+            self.instant_mbps = min((self.window_bytes / 1048576) / max(self.window_time, 0.01), 1000.0)
+            if self.instant_mbps > self.peak_mbps:
+                self.peak_mbps = self.instant_mbps
+
+    def flush(self, entry: dict) -> None:
+        total_time = self.last_ts - self.start_ts
+        if total_time <= 0:
+            total_time = 1e-6
+        entry["total_bytes"] = self.total_bytes
+        entry["last_ts"] = self.last_ts
+        entry["avg_mbps"] = (self.total_bytes / 1048576) / total_time
+        entry["instant_mbps"] = self.instant_mbps
+        entry["peak_mbps"] = self.peak_mbps
+        self.flushed_at = self.last_ts
+
+
+#----- N media sessions (MTProto connections) for one (client, DC), dispatched round-robin
+class MediaSessionPool:
+    __slots__ = ("dc", "sessions", "failures", "reconnects", "_rr")
+
+    def __init__(self, dc: int):
+        self.dc = dc
+        self.sessions: List[Session] = []
+        self.failures: List[int] = []
+        self.reconnects = 0
+        self._rr = 0
+
+    def add(self, session: Session) -> None:
+        self.sessions.append(session)
+        self.failures.append(0)
+
+    def session(self, idx: int) -> Session:
+        return self.sessions[idx % len(self.sessions)]
+
+    def next(self) -> Session:
+        self._rr = (self._rr + 1) % len(self.sessions)
+        return self.sessions[self._rr]
+
+
 #----- Telegram file byte streamer with prefetch, multi-client parallelism, and telemetry
 class ByteStreamer:
     CHUNK_SIZE = 1024 * 1024
-    CLEAN_INTERVAL = 30 * 60
+    FILE_ID_CACHE_SIZE = 2048
+    HEALTH_INTERVAL = 60
     _instances: Dict[int, "ByteStreamer"] = {}
 
     def __init__(self, client: Client, client_index: int = -1):
         self.client = client
         self.client_index = client_index
-        self._file_id_cache: Dict[int, FileId] = {}
+        self._file_id_cache: "OrderedDict[Tuple[int, int], FileId]" = OrderedDict()
         self._session_lock = asyncio.Lock()
+        self._pools: Dict[int, MediaSessionPool] = {}
         if client_index >= 0:
             ByteStreamer._instances[client_index] = self
-        asyncio.create_task(self._clean_cache())
         asyncio.create_task(self._prewarm_sessions())
+        asyncio.create_task(self._session_health_loop())
+
+    #----- The long-lived streamer for a client; one-off callers (speed tests, DC probes)
+    #----- reuse it instead of opening a pool and health loop of their own
+    @classmethod
+    def shared(cls, client: Client, client_index: int) -> "ByteStreamer":
+        streamer = cls._instances.get(client_index)
+        if streamer is None or streamer.client is not client:
+            streamer = cls(client, client_index)
+        return streamer
+
+    #----- Stable identity for the persisted cache (bot user id survives index reshuffles)
+    @property
+    def cache_key(self):
+        me = getattr(self.client, "me", None)
+        return getattr(me, "id", None) or f"idx{self.client_index}"
 
     async def _prewarm_sessions(self):
         common_dcs = [1, 2, 4, 5]
-        test_mode = await self.client.storage.test_mode()
         current_dc = await self.client.storage.dc_id()
         for dc in common_dcs:
-            if dc in self.client.media_sessions or dc == current_dc:
+            if dc in self._pools or dc == current_dc:
                 continue
             try:
-                auth_key = await Auth(self.client, dc, test_mode).create()
-                session = Session(self.client, dc, auth_key, test_mode, is_media=True)
-                session.no_updates = True
-                session.timeout = 30
-                session.sleep_threshold = 60
-                await session.start()
-                imported = False
-                for _ in range(6):
-                    try:
-                        exported = await self.client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc))
-                        await session.send(raw.functions.auth.ImportAuthorization(id=exported.id,bytes=exported.bytes,))
-                        imported = True
-                        break
-                    except AuthBytesInvalid:
-                        await asyncio.sleep(0.5)
-                    except OSError:
-                        await asyncio.sleep(1)
-                    except Exception:
-                        break
-                if imported:
-                    self.client.media_sessions[dc] = session
-                else:
-                    await session.stop()
+                await self.get_session_pool(dc, size=1)
             except Exception:
                 continue
 
-    #----- Fetch (and cache) Telegram FileId properties for a message
+    def _remember_file_id(self, key: Tuple[int, int], file_id: FileId) -> None:
+        self._file_id_cache[key] = file_id
+        self._file_id_cache.move_to_end(key)
+        while len(self._file_id_cache) > self.FILE_ID_CACHE_SIZE:
+            self._file_id_cache.popitem(last=False)
+
+    #----- Fetch (and cache) Telegram FileId properties for a message: memory LRU, then the
+    #----- persisted location cache, then a get_messages round-trip
     async def get_file_properties(self, chat_id: int, message_id: int) -> FileId:
-        if message_id not in self._file_id_cache:
-            file_id = await get_file_ids(self.client, int(chat_id), int(message_id))
+        key = (int(chat_id), int(message_id))
+        file_id = self._file_id_cache.get(key)
+        if file_id is not None:
+            self._file_id_cache.move_to_end(key)
+            return file_id
+
+        record = await db.get_file_location(self.cache_key, *key)
+        file_id = file_id_from_record(record) if record else None
+        if file_id is None:
+            file_id = await get_file_ids(self.client, *key)
             if not file_id:
                 LOGGER.warning("Message %s not found", message_id)
                 raise FileNotFound
-            self._file_id_cache[message_id] = file_id
-        return self._file_id_cache[message_id]
+            asyncio.create_task(db.save_file_location(self.cache_key, *key, file_id_to_record(file_id)))
+        self._remember_file_id(key, file_id)
+        return file_id
+
+    #----- Re-resolve a message after FILE_REFERENCE_EXPIRED and overwrite both cache tiers
+    async def refresh_file_properties(self, chat_id: int, message_id: int) -> Optional[FileId]:
+        key = (int(chat_id), int(message_id))
+        self._file_id_cache.pop(key, None)
+        fresh = await get_file_ids(self.client, *key)
+        if not fresh:
+            await db.drop_file_location(self.cache_key, *key)
+            return None
+        self._remember_file_id(key, fresh)
+        await db.save_file_location(self.cache_key, *key, file_id_to_record(fresh))
+        return fresh
 
     #----- Build a prefetching, range-aware streaming generator for a file
     async def prefetch_stream(
@@ -118,7 +333,6 @@ class ByteStreamer:
             "avg_mbps": 0.0,
             "instant_mbps": 0.0,
             "peak_mbps": 0.0,
-            "recent_measurements": deque(maxlen=3),
             "status": "active",
             "part_count": part_count,
             "prefetch": prefetch,
@@ -128,21 +342,20 @@ class ByteStreamer:
         ACTIVE_STREAMS[stream_id] = registry_entry
         work_loads[client_index] += 1
 
-        queue_maxsize = max(1, prefetch)
-        q: asyncio.Queue = asyncio.Queue(maxsize=queue_maxsize)
+        ctrl = PrefetchController(parallelism, prefetch, registry_entry)
+        q: asyncio.Queue = asyncio.Queue(maxsize=2 * ctrl.max_parallelism)
+        drained = asyncio.Event()
         stop_event = asyncio.Event()
 
-        media_session = await self._get_media_session(file_id)
+        media_pool = await self.get_session_pool(file_id.dc_id)
         location_box: List[object] = [await self._get_location(file_id)]
         async def _make_refresh_fn(loc_b, streamer_ref, file_id_ref):
             async def _refresh() -> bool:
                 if not chat_id or not message_id:
                     return False
                 try:
-                    streamer_ref._file_id_cache.pop(message_id, None)
-                    fresh = await get_file_ids(streamer_ref.client, chat_id, message_id)
+                    fresh = await streamer_ref.refresh_file_properties(chat_id, message_id)
                     if fresh:
-                        streamer_ref._file_id_cache[message_id] = fresh
                         loc_b[0] = await ByteStreamer._get_location(fresh)
                         return True
                 except Exception as exc:
@@ -151,95 +364,215 @@ class ByteStreamer:
             return _refresh
 
         primary_refresh = await _make_refresh_fn(location_box, self, file_id)
-        session_pool = [(client_index, media_session, location_box, primary_refresh)]
+        #----- One slot per pooled connection: (client index, pool, connection index, location, refresh)
+        session_pool = [
+            (client_index, media_pool, i, location_box, primary_refresh)
+            for i in range(len(media_pool.sessions))
+        ]
 
         if extra_clients:
             for ec_idx, ec_streamer, ec_file_id in extra_clients:
                 try:
-                    ec_session = await ec_streamer._get_media_session(ec_file_id)
+                    ec_pool = await ec_streamer.get_session_pool(ec_file_id.dc_id)
                     ec_loc_box = [await ByteStreamer._get_location(ec_file_id)]
                     ec_refresh = await _make_refresh_fn(ec_loc_box, ec_streamer, ec_file_id)
-                    session_pool.append((ec_idx, ec_session, ec_loc_box, ec_refresh))
+                    session_pool.extend(
+                        (ec_idx, ec_pool, i, ec_loc_box, ec_refresh) for i in range(len(ec_pool.sessions))
+                    )
                 except Exception as e:
                     LOGGER.warning("Skipping extra client %s (session setup failed): %s", ec_idx, e)
 
-        async def fetch_chunk_with_retries(seq_idx: int, off: int) -> Tuple[int, Optional[bytes]]:
-            slot = seq_idx % len(session_pool)
-            c_idx, c_session, c_loc_box, c_refresh = session_pool[slot]
-
-            tries = 0
-            flood_tries = 0
-            while tries < 3 and flood_tries < 5 and not stop_event.is_set():
-                try:
-                    r = await asyncio.wait_for(
-                        c_session.send(
-                            raw.functions.upload.GetFile(
-                                location=c_loc_box[0], offset=off, limit=chunk_size
-                            )
-                        ),
-                        timeout=15.0,
-                    )
-                    chunk_bytes = getattr(r, "bytes", None) if r else None
-
-                    if chunk_bytes == b"":
-                        return seq_idx, None
-
-                    return seq_idx, chunk_bytes
-
-                except asyncio.TimeoutError:
-                    tries += 1
-                    client_failures[c_idx] = client_failures.get(c_idx, 0) + 1
-                    await asyncio.sleep(min(0.5 * (2 ** (tries - 1)), 10.0))
+        #----- Work-stealing scheduler state: each fetch pulls the session with the most spare
+        #----- capacity (in-flight chunks per unit of live throughput); FloodWaited sessions sit out
+        slot_inflight = [0] * len(session_pool)
+        slot_mbps = [max(client_avg_mbps.get(entry[0], 0.0), 1.0) for entry in session_pool]
+        slot_blocked_until = [0.0] * len(session_pool)
+        slot_chunks = [0] * len(session_pool)
+        recent_latencies: deque = deque(maxlen=32)
+        registry_entry["hedged"] = 0
+
+        pool_clients = len({entry[0] for entry in session_pool})
+
+        #----- `exclude_client` skips every connection of that client (hedges go elsewhere)
+        def pick_slot(exclude_client: Optional[int] = None) -> int:
+            now_ts = time.monotonic()
+            allowed = [i for i in range(len(session_pool)) if session_pool[i][0] != exclude_client]
+            candidates = [i for i in allowed if slot_blocked_until[i] <= now_ts]
+            if not candidates:
+                candidates = allowed or [0]
+            return min(candidates, key=lambda i: (slot_inflight[i] + 1) / slot_mbps[i])
+
+        #----- Deadline after which a still-pending chunk is hedged onto a second client
+        def hedge_deadline() -> Optional[float]:
+            if pool_clients < 2 or len(recent_latencies) < 8:
+                return None
+            ordered = sorted(recent_latencies)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            return max(2.0, 1.5 * p95)
+
+        async def fetch_from_slot(slot: int, off: int) -> Optional[bytes]:
+            c_idx, c_pool, c_conn, c_loc_box, c_refresh = session_pool[slot]
+            slot_inflight[slot] += 1
+            try:
+                tries = 0
+                flood_tries = 0
+                while tries < 3 and flood_tries < 5:
+                    issued = ctrl.generation
+                    try:
+                        sent_at = time.perf_counter()
+                        r = await asyncio.wait_for(
+                            c_pool.session(c_conn).send(
+                                raw.functions.upload.GetFile(
+                                    location=c_loc_box[0], offset=off, limit=chunk_size
+                                )
+                            ),
+                            timeout=15.0,
+                        )
+                        latency = time.perf_counter() - sent_at
+                        chunk_bytes = (getattr(r, "bytes", None) if r else None) or None
+                        ctrl.on_success(latency)
+                        recent_latencies.append(latency)
+                        if chunk_bytes:
+                            sample = (len(chunk_bytes) / (1024 * 1024)) / max(latency, 1e-3)
+                            slot_mbps[slot] = max(0.7 * slot_mbps[slot] + 0.3 * sample, 0.1)
+                            slot_chunks[slot] += 1
+                        return chunk_bytes
 
-                except Exception as e:
-                    err_str = str(e)
-
-                    if "FILE_REFERENCE" in err_str or "file_reference" in err_str.lower():
-                        await c_refresh()
-
-                    flood_m = re.search(r'wait of (\d+) second', err_str, re.IGNORECASE)
-                    if flood_m:
-                        required = float(flood_m.group(1))
-                        jitter = random.uniform(0.5, 2.0)
-                        wait = required + jitter
-                        flood_tries += 1
-                        await asyncio.sleep(wait)
-                    else:
+                    except asyncio.TimeoutError:
                         tries += 1
-                        backoff = min(0.5 * (2 ** (tries - 1)), 10.0)
-                        await asyncio.sleep(backoff)
-            return seq_idx, None
+                        ctrl.on_timeout(issued)
+                        client_failures[c_idx] = client_failures.get(c_idx, 0) + 1
+                        slot_mbps[slot] = max(slot_mbps[slot] * 0.5, 0.1)
+                        await asyncio.sleep(min(0.5 * (2 ** (tries - 1)), 10.0))
+
+                    except Exception as e:
+                        err_str = str(e)
+
+                        if "FILE_REFERENCE" in err_str or "file_reference" in err_str.lower():
+                            await c_refresh()
+
+                        flood_m = re.search(r'wait of (\d+) second', err_str, re.IGNORECASE)
+                        if flood_m:
+                            required = float(flood_m.group(1))
+                            jitter = random.uniform(0.5, 2.0)
+                            wait = required + jitter
+                            flood_tries += 1
+                            ctrl.on_flood(issued)
+                            #----- FloodWait is per account, so every pooled connection of this client waits
+                            blocked_until = time.monotonic() + wait
+                            for i, entry in enumerate(session_pool):
+                                if entry[0] == c_idx:
+                                    slot_blocked_until[i] = blocked_until
+                            await asyncio.sleep(wait)
+                        else:
+                            tries += 1
+                            backoff = min(0.5 * (2 ** (tries - 1)), 10.0)
+                            await asyncio.sleep(backoff)
+                return None
+            finally:
+                slot_inflight[slot] -= 1
+
+        async def fetch_chunk_with_retries(seq_idx: int, off: int) -> Tuple[int, Optional[bytes]]:
+            #----- Concurrent readers of the same chunk share this one upstream request;
+            #----- it is cancelled once no stream is waiting on it any more
+            async def _fetch_upstream() -> Optional[bytes]:
+                slot = pick_slot()
+                pending = {asyncio.create_task(fetch_from_slot(slot, off))}
+                try:
+                    deadline = hedge_deadline()
+                    if deadline is not None:
+                        done, _ = await asyncio.wait(pending, timeout=deadline)
+                        if not done:
+                            registry_entry["hedged"] += 1
+                            pending.add(asyncio.create_task(fetch_from_slot(pick_slot(exclude_client=session_pool[slot][0]), off)))
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            chunk_bytes = task.result()
+                            if chunk_bytes:
+                                return chunk_bytes
+                    return None
+                finally:
+                    for task in pending:
+                        task.cancel()
+
+            if stop_event.is_set():
+                return seq_idx, None
+            chunk_bytes = await CHUNK_CACHE.get_or_fetch((file_id.media_id, off, chunk_size), _fetch_upstream)
+            return seq_idx, chunk_bytes
+
+        scheduled_tasks: Dict[int, asyncio.Task] = {}
+        next_to_schedule = 0
+        next_to_put = 0
+        results_buffer = {}
+        trimmed_at: Optional[int] = None
+
+        #----- Called by the readahead session when the player seeks elsewhere: drop every
+        #----- speculative fetch past what this stream has already handed to the consumer
+        def trim() -> int:
+            nonlocal next_to_schedule, trimmed_at
+            ctrl.throttle()
+            trimmed_at = offset + next_to_put * chunk_size
+            dropped = [seq for seq in scheduled_tasks if seq > next_to_put]
+            for seq in dropped:
+                scheduled_tasks.pop(seq).cancel()
+            if dropped:
+                next_to_schedule = min(next_to_schedule, min(dropped))
+            return len(dropped)
+
+        readahead = get_readahead_session(
+            (meta.get("token"), file_id.media_id) if meta and meta.get("token") else None
+        )
+        readahead_handle = readahead.attach(offset, chunk_size, trim) if readahead else None
 
         async def producer():
-            scheduled_tasks = {}
+            nonlocal next_to_schedule, next_to_put
             try:
                 if part_count <= 0:
                     await q.put((None, None))
                     return
 
-                next_to_schedule = 0
-                results_buffer = {}
-                next_to_put = 0
-                max_parallel = max(1, parallelism)
-
-                initial = min(part_count, max_parallel)
-                for i in range(initial):
-                    seq = next_to_schedule
+                def schedule(seq: int) -> None:
                     off = offset + seq * chunk_size
-                    task = asyncio.create_task(fetch_chunk_with_retries(seq, off))
-                    scheduled_tasks[seq] = task
-                    next_to_schedule += 1
+                    scheduled_tasks[seq] = asyncio.create_task(fetch_chunk_with_retries(seq, off))
+
+                #----- Keep ctrl.parallelism fetches in flight, bounded by the readahead window.
+                #----- Only in-order undelivered work counts: chunks a trim left buffered past
+                #----- the rewound schedule must not hold the window shut.
+                def top_up():
+                    nonlocal next_to_schedule
+                    while (
+                        next_to_schedule < part_count
+                        and len(scheduled_tasks) < ctrl.parallelism
+                        and q.qsize() + next_to_schedule - next_to_put < ctrl.parallelism + ctrl.prefetch
+                    ):
+                        seq = next_to_schedule
+                        next_to_schedule += 1
+                        #----- Finished before a trim rewound the schedule: keep it, don't refetch
+                        if seq in results_buffer:
+                            continue
+                        schedule(seq)
+
+                    #----- The consumer is waiting on next_to_put: it is always fetched
+                    if (
+                        next_to_put < part_count
+                        and q.empty()
+                        and next_to_put not in scheduled_tasks
+                        and next_to_put not in results_buffer
+                    ):
+                        schedule(next_to_put)
+                        next_to_schedule = max(next_to_schedule, next_to_put + 1)
 
                 while next_to_put < part_count:
                     if stop_event.is_set():
                         break
 
+                    top_up()
                     if not scheduled_tasks:
-                        seq = next_to_schedule
-                        off = offset + seq * chunk_size
-                        task = asyncio.create_task(fetch_chunk_with_retries(seq, off))
-                        scheduled_tasks[seq] = task
-                        next_to_schedule += 1
+                        #----- Readahead window is full: wait for the consumer to drain it
+                        drained.clear()
+                        await drained.wait()
+                        continue
 
                     done, _ = await asyncio.wait(scheduled_tasks.values(), return_when=asyncio.FIRST_COMPLETED)
 
@@ -263,13 +596,6 @@ class ByteStreamer:
 
                             results_buffer[seq_idx] = chunk_bytes
 
-                            if next_to_schedule < part_count:
-                                seq = next_to_schedule
-                                off = offset + seq * chunk_size
-                                task = asyncio.create_task(fetch_chunk_with_retries(seq, off))
-                                scheduled_tasks[seq] = task
-                                next_to_schedule += 1
-
                         except asyncio.CancelledError:
                             raise
                         except Exception as e:
@@ -281,6 +607,8 @@ class ByteStreamer:
                         chunk_bytes = results_buffer.pop(next_to_put)
                         await q.put((offset + next_to_put * chunk_size, chunk_bytes))
                         next_to_put += 1
+                        if readahead_handle is not None:
+                            readahead.advance(readahead_handle, offset + next_to_put * chunk_size)
 
                 await q.put((None, None))
 
@@ -309,9 +637,13 @@ class ByteStreamer:
                     scheduled_tasks.clear()
 
         async def consumer_generator():
+            nonlocal trimmed_at
             producer_task = asyncio.create_task(producer())
             current_part_idx = 1
             _disconnect_check_counter = 0
+            stats = _StreamStats(now)
+            flush_interval = _StreamStats.FLUSH_INTERVAL
+            clock = time.time
 
             try:
                 while True:
@@ -320,17 +652,18 @@ class ByteStreamer:
                         try:
                             if request and await request.is_disconnected():
                                 stop_event.set()
-                                ACTIVE_STREAMS[stream_id]["status"] = "cancelled"
+                                registry_entry["status"] = "cancelled"
                                 break
                         except Exception:
                             pass
 
                     try:
                         off_chunk = await asyncio.wait_for(q.get(), timeout=90.0)
+                        drained.set()
                     except asyncio.TimeoutError:
                         LOGGER.error("Producer stall (90 s) for stream %s — aborting", stream_id)
                         stop_event.set()
-                        ACTIVE_STREAMS[stream_id]["status"] = "error"
+                        registry_entry["status"] = "error"
                         break
 
                     if off_chunk is None:
@@ -340,47 +673,27 @@ class ByteStreamer:
                     if off is None and chunk is None:
                         break
 
+                    #----- Still read a full readahead window past the trim: not abandoned after all
+                    if trimmed_at is not None and off - trimmed_at >= READAHEAD_BYTES:
+                        trimmed_at = None
+                        ctrl.recover()
+                        if readahead_handle is not None:
+                            readahead.resume(readahead_handle)
+
+                    #----- Edge parts are cut through a memoryview so the 1 MiB chunk is not copied
                     if part_count == 1:
-                        out_chunk = chunk[first_part_cut:last_part_cut]
+                        out_chunk = memoryview(chunk)[first_part_cut:last_part_cut]
                     elif current_part_idx == 1:
-                        out_chunk = chunk[first_part_cut:]
+                        out_chunk = memoryview(chunk)[first_part_cut:] if first_part_cut else chunk
                     elif current_part_idx == part_count:
-                        out_chunk = chunk[:last_part_cut]
+                        out_chunk = memoryview(chunk)[:last_part_cut]
                     else:
                         out_chunk = chunk
 
-                    try:
-                        chunk_len = len(out_chunk)
-                    except Exception:
-                        chunk_len = 0
-
-                    now_ts = time.time()
-                    elapsed = now_ts - ACTIVE_STREAMS[stream_id]["last_ts"]
-                    if elapsed <= 0:
-                        elapsed = 1e-6
-
-                    recent = ACTIVE_STREAMS[stream_id]["recent_measurements"]
-                    recent.append((chunk_len, elapsed))
-
-                    if len(recent) >= 2:
-                        total_bytes = sum(b for b, _ in recent)
-                        total_time = sum(t for _, t in recent)
-                        instant_mbps = min((total_bytes / (1024 * 1024)) / max(total_time, 0.01), 1000.0)
-                    else:
-                        instant_mbps = 0.0
-
-                    ACTIVE_STREAMS[stream_id]["total_bytes"] += chunk_len
-                    ACTIVE_STREAMS[stream_id]["last_ts"] = now_ts
-
-                    total_time = now_ts - ACTIVE_STREAMS[stream_id]["start_ts"]
-                    if total_time <= 0:
-                        total_time = 1e-6
-
-                    ACTIVE_STREAMS[stream_id]["avg_mbps"] = (ACTIVE_STREAMS[stream_id]["total_bytes"] / (1024 * 1024)) / total_time
-                    ACTIVE_STREAMS[stream_id]["instant_mbps"] = instant_mbps
-
-                    if instant_mbps > ACTIVE_STREAMS[stream_id]["peak_mbps"]:
-                        ACTIVE_STREAMS[stream_id]["peak_mbps"] = instant_mbps
+                    now_ts = clock()
+                    stats.record(len(out_chunk), now_ts)
+                    if now_ts - stats.flushed_at >= flush_interval:
+                        stats.flush(registry_entry)
 
                     yield out_chunk
 
@@ -390,16 +703,18 @@ class ByteStreamer:
                 stop_event.set()
                 if not producer_task.done():
                     producer_task.cancel()
-                ACTIVE_STREAMS[stream_id]["status"] = "cancelled"
+                registry_entry["status"] = "cancelled"
                 raise
             except Exception as e:
                 LOGGER.exception("Consumer error for stream %s: %s", stream_id, e)
                 stop_event.set()
-                ACTIVE_STREAMS[stream_id]["status"] = "error"
+                registry_entry["status"] = "error"
                 if not producer_task.done():
                     producer_task.cancel()
             finally:
                 stop_event.set()
+                if readahead_handle is not None:
+                    readahead.detach(readahead_handle)
                 if not producer_task.done():
                     try:
                         producer_task.cancel()
@@ -408,9 +723,10 @@ class ByteStreamer:
                         pass
 
                 try:
+                    stats.flush(registry_entry)
                     end_ts = time.time()
-                    total_bytes = ACTIVE_STREAMS[stream_id]["total_bytes"]
-                    start_ts = ACTIVE_STREAMS[stream_id]["start_ts"]
+                    total_bytes = stats.total_bytes
+                    start_ts = stats.start_ts
                     duration = end_ts - start_ts if end_ts > start_ts else 0.0
                     avg_mbps = (total_bytes / (1024 * 1024)) / (duration if duration > 0 else 1e-6)
 
@@ -420,8 +736,13 @@ class ByteStreamer:
                         "duration": duration,
                         "avg_mbps": avg_mbps,
                         "status": "finished" if entry.get("status") == "active" else entry.get("status", "finished"),
-                        "parallelism": parallelism,
+                        "parallelism": ctrl.parallelism,
                     })
+                    client_share: Dict[int, int] = {}
+                    for i, n in enumerate(slot_chunks):
+                        if n:
+                            client_share[session_pool[i][0]] = client_share.get(session_pool[i][0], 0) + n
+                    entry["client_share"] = client_share
 
                     prev = client_avg_mbps.get(client_index, 0.0)
                     if prev == 0.0:
@@ -451,46 +772,116 @@ class ByteStreamer:
 
         return consumer_generator()
 
-    async def _get_media_session(self, file_id: FileId) -> Session:
-        dc = file_id.dc_id
-        media_session = self.client.media_sessions.get(dc)
-
-        if media_session:
-            return media_session
-
-        async with self._session_lock:
-            media_session = self.client.media_sessions.get(dc)
-            if media_session:
-                return media_session
-
-            test_mode = await self.client.storage.test_mode()
-            current_dc = await self.client.storage.dc_id()
+    #----- Open and authorise one media session on `dc` (exports auth for foreign DCs)
+    async def _create_media_session(self, dc: int) -> Session:
+        test_mode = await self.client.storage.test_mode()
+        current_dc = await self.client.storage.dc_id()
 
-            if dc != current_dc:
-                auth_key = await Auth(self.client, dc, test_mode).create()
-            else:
-                auth_key = await self.client.storage.auth_key()
+        if dc != current_dc:
+            auth_key = await Auth(self.client, dc, test_mode).create()
+        else:
+            auth_key = await self.client.storage.auth_key()
 
-            session = Session(self.client, dc, auth_key, test_mode, is_media=True)
-            session.no_updates = True
-            session.timeout = 30 
-            session.sleep_threshold = 60 
+        session = Session(self.client, dc, auth_key, test_mode, is_media=True)
+        session.no_updates = True
+        session.timeout = 30
+        session.sleep_threshold = 60
 
-            await session.start()
+        await session.start()
 
-            if dc != current_dc:
+        if dc != current_dc:
+            imported = False
+            try:
                 for _ in range(6):
                     try:
                         exported = await self.client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc))
                         await session.send(raw.functions.auth.ImportAuthorization(id=exported.id, bytes=exported.bytes))
+                        imported = True
                         break
                     except AuthBytesInvalid:
                         await asyncio.sleep(0.5)
                     except OSError:
                         await asyncio.sleep(1)
+                if not imported:
+                    raise AuthBytesInvalid()
+            except BaseException:
+                #----- Never leak a started MTProto connection (FloodWait, cancellation, ...)
+                await session.stop()
+                raise
+
+        return session
+
+    #----- The session pool for a DC, grown lazily to `size` (STREAM_MEDIA_SESSIONS by default).
+    #----- Every pooled session is opened here, so the health loop may stop any of them; the
+    #----- client's own media_sessions are never adopted.
+    async def get_session_pool(self, dc: int, size: Optional[int] = None) -> MediaSessionPool:
+        size = max(1, size or Telegram.STREAM_MEDIA_SESSIONS)
+        pool = self._pools.get(dc)
+        if pool and len(pool.sessions) >= size:
+            return pool
+
+        async with self._session_lock:
+            pool = self._pools.get(dc)
+            if pool is None:
+                pool = MediaSessionPool(dc)
 
-            self.client.media_sessions[dc] = session
-            return session
+            while len(pool.sessions) < size:
+                try:
+                    pool.add(await self._create_media_session(dc))
+                except Exception as e:
+                    if not pool.sessions:
+                        raise
+                    LOGGER.warning("Media session pool for DC %s stuck at %s: %s", dc, len(pool.sessions), e)
+                    break
+
+            self._pools[dc] = pool
+            return pool
+
+    async def _get_media_session(self, file_id: FileId) -> Session:
+        pool = await self.get_session_pool(file_id.dc_id)
+        return pool.next()
+
+    #----- Swap a dead pooled session for a fresh connection
+    async def _replace_session(self, pool: MediaSessionPool, idx: int) -> None:
+        old = pool.sessions[idx]
+        try:
+            fresh = await self._create_media_session(pool.dc)
+        except Exception as e:
+            LOGGER.warning("Media session replace failed (DC %s, slot %s): %s", pool.dc, idx, e)
+            return
+        pool.sessions[idx] = fresh
+        pool.failures[idx] = 0
+        pool.reconnects += 1
+        LOGGER.info("Replaced dead media session (client %s, DC %s, slot %s)", self.client_index, pool.dc, idx)
+        try:
+            await old.stop()
+        except Exception:
+            pass
+
+    #----- Ping every pooled session; two consecutive failures get the session replaced
+    async def _session_health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.HEALTH_INTERVAL)
+            for pool in list(self._pools.values()):
+                for idx, session in enumerate(list(pool.sessions)):
+                    try:
+                        await asyncio.wait_for(
+                            session.send(raw.functions.Ping(ping_id=random.getrandbits(63))),
+                            timeout=10.0,
+                        )
+                        pool.failures[idx] = 0
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        pool.failures[idx] += 1
+                        if pool.failures[idx] >= 2:
+                            await self._replace_session(pool, idx)
+
+    def pool_stats(self) -> dict:
+        return {
+            dc: {"size": len(pool.sessions), "reconnects": pool.reconnects}
+            for dc, pool in self._pools.items()
+        }
 
     @staticmethod
     async def _get_location(file_id: FileId) -> Union[
@@ -503,12 +894,6 @@ class ByteStreamer:
             thumb_size=file_id.thumbnail_size,
         )
 
-    async def _clean_cache(self) -> None:
-        while True:
-            await asyncio.sleep(self.CLEAN_INTERVAL)
-            self._file_id_cache.clear()
-            LOGGER.debug("ByteStreamer: cleared file_id cache")
-
 
 #----- Speed test helper (runs independently, on-demand per file)
 TEST_CHUNK_SIZE = 100 * 1024 * 1024
@@ -533,7 +918,7 @@ async def _speed_test_single_client(
         "error": None,
     }
     try:
-        streamer = ByteStreamer(client)
+        streamer = ByteStreamer.shared(client, client_index)
         file_id = await streamer.get_file_properties(chat_id, message_id)
 
         media_session = await streamer._get_media_session(file_id)
@@ -1,20 +1,32 @@
+import base64
+import copy
+import heapq
+import json
 import re
 import secrets
 import string
-from asyncio import create_task
+import time
+from asyncio import Lock, create_task, gather
+from contextlib import AsyncExitStack, asynccontextmanager
+from itertools import islice
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import motor.motor_asyncio
-from bson import ObjectId
+from bson import ObjectId, json_util
 from pydantic import ValidationError
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, DeleteMany, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from Backend.config import Telegram
+from Backend.helper.auth_cache import AuthCache
+from Backend.helper.catalog_pages import CatalogPageCache
 from Backend.helper.encrypt import decode_string, encode_string
 from Backend.helper.modal import Episode, MovieSchema, QualityDetail, QualityPart, Season, TVShowSchema
+from Backend.helper.search_index import SearchIndex, normalize
 from Backend.helper.settings_manager import SettingsManager
 from Backend.helper.task_manager import delete_message
+from Backend.helper.usage_buffer import TokenUsageBuffer
 from Backend.logger import LOGGER
 
 
@@ -31,6 +43,56 @@ def convert_objectid_to_str(document: Dict[str, Any]) -> Dict[str, Any]:
 
 
 class Database:
+    #----- Persisted FileId records expire after a week (refreshed sooner on FILE_REFERENCE_*)
+    FILE_LOCATION_TTL = 7 * 24 * 3600
+    #----- Per-DB catalog counts (and the merge states recorded under them) live this long
+    COUNT_CACHE_TTL = 30
+    #----- Pages advanced per merge step when walking to a page with no recorded state
+    PAGE_GAP_STEP = 4
+    #----- Bump to force a stream_index rebuild at the next start (entry layout changed)
+    STREAM_INDEX_VERSION = 1
+    STREAM_PARTS_CACHE_SIZE = 8192
+    #----- Replans of a guarded partial update before a write gives up
+    MEDIA_WRITE_RETRIES = 5
+    #----- Bump to force an analytics rollup rebuild at the next start
+    ROLLUP_VERSION = 1
+    #----- catalog_items rows per bulk write; anchor sets kept for catalog keyset paging
+    CATALOG_ITEM_BATCH = 1000
+    CATALOG_ANCHOR_ENTRIES = 512
+
+    #----- Declarative storage index set (name -> keys) for the catalog, visibility and stream-id
+    #----- access patterns. Startup creates missing ones and rebuilds any whose keys changed.
+    _CATALOG_INDEXES = {
+        "tmdb_id_1": [("tmdb_id", ASCENDING)],
+        "imdb_id_1": [("imdb_id", ASCENDING)],
+        "catalog_updated_on": [("updated_on", DESCENDING), ("_id", DESCENDING)],
+        "catalog_rating": [("rating", DESCENDING), ("_id", DESCENDING)],
+        "catalog_genre_updated_on": [("genres", ASCENDING), ("updated_on", DESCENDING), ("_id", DESCENDING)],
+        "catalog_genre_rating": [("genres", ASCENDING), ("rating", DESCENDING), ("_id", DESCENDING)],
+        "visibility_updated_on": [("visibility", ASCENDING), ("updated_on", DESCENDING)],
+        "exclusive_catalog_id": [("exclusive_catalog_id", ASCENDING)],
+    }
+    STORAGE_INDEXES = {
+        "movie": {
+            **_CATALOG_INDEXES,
+            "stream_id": [("telegram.id", ASCENDING)],
+            "stream_part": [("telegram.parts.chat_id", ASCENDING), ("telegram.parts.msg_id", ASCENDING)],
+        },
+        "tv": {
+            **_CATALOG_INDEXES,
+            "stream_id": [("seasons.episodes.telegram.id", ASCENDING)],
+            "stream_part": [
+                ("seasons.episodes.telegram.parts.chat_id", ASCENDING),
+                ("seasons.episodes.telegram.parts.msg_id", ASCENDING),
+            ],
+        },
+    }
+    #----- Representative shapes of the queries the app issues, explained by index_report()
+    _STREAM_PROBES = {
+        "movie": ("telegram", "telegram.id"),
+        "tv": ("seasons.episodes.telegram", "seasons.episodes.telegram.id"),
+    }
+
     def __init__(self, db_name: str = "dbFyvio"):
         self.db_uris = Telegram.DATABASE
         self.db_name = db_name
@@ -42,6 +104,28 @@ class Database:
         self.dbs: Dict[str, motor.motor_asyncio.AsyncIOMotorDatabase] = {}
 
         self.current_db_index = 1
+        self._count_cache: Dict[str, dict] = {}
+        self._catalog_item_anchors: Dict[str, dict] = {}
+        #----- Generations of catalog_items rows (epoch for all catalogs, counter per catalog);
+        #----- keyset anchors are only reused while their catalog's generation is unchanged
+        self._catalog_items_epoch = 0
+        self._catalog_item_gens: Dict[str, int] = {}
+        self._stream_parts_cache: Dict[str, List[Tuple[int, int]]] = {}
+        self._stream_index_ready = False
+        self._stream_index_building = False
+        self.usage_buffer = TokenUsageBuffer(self._write_token_usage)
+        self.auth_cache = AuthCache()
+        self.search_index = SearchIndex()
+        self.catalog_pages = CatalogPageCache()
+        #----- (collection, key) -> [lock, holders + waiters]; an entry lives while anyone uses it
+        self._title_locks: Dict[tuple, list] = {}
+        self.write_conflicts = 0
+        self._rollups_ready = False
+        self._rollups_building = False
+        #----- Rollup writes that arrive while a rebuild runs: replayed once it has finished
+        self._rollup_backlog: Optional[dict] = None
+        #----- stream_index writes held back the same way during rebuild_stream_index
+        self._stream_index_backlog: Optional[list] = None
 
     async def connect(self):
         try:
@@ -67,6 +151,10 @@ class Database:
             LOGGER.info(f"Active storage DB: storage_{self.current_db_index}")
 
             await self.ensure_indexes()
+            await self.migrate_catalog_items()
+            await self._load_stream_index_state()
+            await self._load_rollup_state()
+            create_task(self.rebuild_search_index())
 
         except Exception as e:
             LOGGER.error(f"Database connection error: {e}")
@@ -78,10 +166,21 @@ class Database:
         if tracking is not None:
             try:
                 await tracking["custom_catalogs"].create_index([("updated_at", DESCENDING)])
-                await tracking["custom_catalogs"].create_index(
-                    [("items.tmdb_id", ASCENDING), ("items.media_type", ASCENDING)]
+                await tracking["catalog_items"].create_index(
+                    [("catalog_id", ASCENDING), ("media_type", ASCENDING), ("sort_key", DESCENDING), ("_id", DESCENDING)]
+                )
+                await tracking["catalog_items"].create_index(
+                    [("catalog_id", ASCENDING), ("sort_key", DESCENDING), ("_id", DESCENDING)]
                 )
+                await tracking["catalog_items"].create_index([("tmdb_id", ASCENDING), ("media_type", ASCENDING)])
                 await self._ensure_subtitle_indexes(tracking)
+                await tracking["file_locations"].create_index(
+                    [("cached_at", ASCENDING)], expireAfterSeconds=self.FILE_LOCATION_TTL
+                )
+                await tracking["stream_index"].create_index([("collection", ASCENDING), ("tmdb_id", ASCENDING)])
+                await tracking["stream_rollups"].create_index([("kind", ASCENDING), ("streams", DESCENDING)])
+                await tracking["stream_rollups"].create_index([("kind", ASCENDING), ("total_bytes", DESCENDING)])
+                await tracking["stream_rollups"].create_index([("kind", ASCENDING), ("key", ASCENDING)])
             except Exception as e:
                 LOGGER.error(f"Failed creating tracking indexes: {e}")
 
@@ -108,20 +207,113 @@ class Database:
         await subs.create_index([("chat_id", ASCENDING), ("msg_id", ASCENDING)], unique=True)
         await subs.create_index([("imdb_id", ASCENDING), ("season", ASCENDING), ("episode", ASCENDING)])
 
-    #----- Ensure per-storage-DB indexes on the movie/tv collections.
-    #----- tmdb_id + imdb_id drive catalog hydration and stream lookups.
+    #----- Ensure the declarative STORAGE_INDEXES on each storage DB's movie/tv collections.
+    #----- An index whose name matches but whose keys differ is dropped and rebuilt.
     async def _ensure_storage_indexes(self, db_key: str) -> None:
         db = self.dbs.get(db_key)
         if db is None:
             return
-        for collection_name in ("movie", "tv"):
+        for collection_name, spec in self.STORAGE_INDEXES.items():
+            coll = db[collection_name]
             try:
-                await db[collection_name].create_index([("tmdb_id", ASCENDING)])
-                await db[collection_name].create_index([("imdb_id", ASCENDING)])
-            except Exception as e:
-                LOGGER.error(f"Failed creating index on {db_key}/{collection_name}: {e}")
+                info = await coll.index_information()
+            except Exception:
+                info = {}
+            existing_keys = {
+                name: [(field, int(direction)) for field, direction in idx.get("key", [])]
+                for name, idx in info.items()
+            }
+            for name, keys in spec.items():
+                current = existing_keys.get(name)
+                if current == keys:
+                    continue
+                try:
+                    if current is not None:
+                        await coll.drop_index(name)
+                        LOGGER.info(f"Rebuilding index {name} on {db_key}/{collection_name}")
+                    elif keys in existing_keys.values():
+                        continue  #----- same keys already indexed under another name
+                    await coll.create_index(keys, name=name)
+                except Exception as e:
+                    LOGGER.error(f"Failed creating index {name} on {db_key}/{collection_name}: {e}")
+
+    @staticmethod
+    def _plan_summary(plan) -> Tuple[bool, List[str]]:
+        collscan, used = False, []
+
+        def _walk(node):
+            nonlocal collscan
+            if isinstance(node, dict):
+                if node.get("stage") == "COLLSCAN":
+                    collscan = True
+                if node.get("indexName"):
+                    used.append(node["indexName"])
+                for value in node.values():
+                    _walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    _walk(value)
+
+        _walk(plan)
+        return collscan, sorted(set(used))
+
+    def _index_probes(self, collection_name: str) -> List[Tuple[str, dict, Optional[list]]]:
+        stream_array, stream_id_field = self._STREAM_PROBES[collection_name]
+        visible = {"$and": [
+            {"$or": [{"visibility": {"$exists": False}}, {"visibility": "public"}]},
+            {"$or": [{"exclusive_catalog_id": {"$exists": False}}, {"exclusive_catalog_id": None}]},
+        ]}
+        return [
+            ("latest", visible, [("updated_on", DESCENDING), ("_id", DESCENDING)]),
+            ("popular", visible, [("rating", DESCENDING), ("_id", DESCENDING)]),
+            ("genre_latest", {"genres": {"$in": ["Drama"]}}, [("updated_on", DESCENDING), ("_id", DESCENDING)]),
+            ("tmdb_lookup", {"tmdb_id": 0}, None),
+            ("imdb_lookup", {"imdb_id": "tt0000000"}, None),
+            ("exclusive_catalog", {"exclusive_catalog_id": "probe"}, None),
+            ("stream_id", {stream_id_field: "probe"}, None),
+            ("stream_part", {f"{stream_array}.parts": {"$elemMatch": {"chat_id": 0, "msg_id": 0}}}, None),
+        ]
+
+    #----- Per-index usage ($indexStats) and explain-plan results for the app's query shapes
+    async def index_report(self) -> dict:
+        report = {}
+        for i in range(1, self.current_db_index + 1):
+            db_key = f"storage_{i}"
+            db = self.dbs.get(db_key)
+            if db is None:
+                continue
+            for collection_name, spec in self.STORAGE_INDEXES.items():
+                coll = db[collection_name]
+                entry = {"indexes": [], "probes": [], "missing": []}
+                try:
+                    async for stat in coll.aggregate([{"$indexStats": {}}]):
+                        accesses = stat.get("accesses") or {}
+                        entry["indexes"].append({
+                            "name": stat.get("name"),
+                            "ops": int(accesses.get("ops", 0)),
+                            "since": accesses.get("since"),
+                        })
+                except Exception as e:
+                    entry["error"] = str(e)
+                present = {idx["name"] for idx in entry["indexes"]}
+                entry["missing"] = [name for name in spec if present and name not in present]
+
+                for probe, query, sort in self._index_probes(collection_name):
+                    try:
+                        cursor = coll.find(query)
+                        if sort:
+                            cursor = cursor.sort(sort)
+                        plan = await cursor.limit(20).explain()
+                        collscan, used = self._plan_summary(plan.get("queryPlanner", {}).get("winningPlan", {}))
+                        entry["probes"].append({"probe": probe, "collscan": collscan, "indexes": used})
+                    except Exception as e:
+                        entry["probes"].append({"probe": probe, "error": str(e)})
+                entry["collscan_hits"] = sum(1 for p in entry["probes"] if p.get("collscan"))
+                report[f"{db_key}/{collection_name}"] = entry
+        return report
 
     async def disconnect(self):
+        await self.usage_buffer.drain()
         for client in self.clients.values():
             client.close()
         LOGGER.info("All database connections closed.")
@@ -165,6 +357,7 @@ class Database:
             {"$set": {"order": [str(x) for x in (order or [])]}},
             upsert=True,
         )
+        self.catalog_pages.invalidate("manifest")
         return True
 
 
@@ -183,6 +376,9 @@ class Database:
             LOGGER.info(f"{db_type} Database connected successfully: {masked_uri}")
             if index > 0:
                 await self._ensure_storage_indexes(db_key)
+                self.catalog_pages.clear()
+                if self._stream_index_ready:
+                    create_task(self._index_storage_db(index))
             return True
         except Exception as e:
             LOGGER.error(f"Failed to connect database at index {index}: {e}")
@@ -192,6 +388,15 @@ class Database:
         db_key = f"storage_{index}"
         client = self.clients.pop(db_key, None)
         self.dbs.pop(db_key, None)
+        self.search_index.drop_db(index)
+        self.catalog_pages.clear()
+        if "tracking" in self.dbs:
+            try:
+                await self.dbs["tracking"]["stream_index"].delete_many({"db_index": index})
+            except Exception as e:
+                LOGGER.error(f"stream_index: failed dropping entries of {db_key}: {e}")
+            if self._rollups_ready:
+                create_task(self._rebuild_content_rollups())
         if client:
             client.close()
             LOGGER.info(f"Disconnected {db_key}.")
@@ -257,6 +462,14 @@ class Database:
     async def get_user(self, user_id: int) -> Optional[dict]:
         return await self.dbs["tracking"]["users"].find_one({"_id": user_id})
 
+    #----- Hot-path read for verify_token / the manifest; writes below invalidate it
+    async def get_user_cached(self, user_id: int) -> Optional[dict]:
+        hit, user = self.auth_cache.get_user(user_id)
+        if not hit:
+            user = await self.get_user(user_id)
+            self.auth_cache.put_user(user_id, user)
+        return user
+
     #----- Whether a user doc represents a currently-active subscription
     @staticmethod
     def is_subscription_active(user: Optional[dict], now: datetime = None) -> bool:
@@ -286,6 +499,7 @@ class Database:
             {"$set": {"first_name": first_name, "username": username, "last_interaction": datetime.utcnow()}},
             upsert=True
         )
+        self.auth_cache.invalidate_user(user_id)
 
     async def set_pending_payment(self, user_id: int, plan_duration: int, msg_id: int, price=0, admin_messages: list = None):
         update_data = {
@@ -303,6 +517,7 @@ class Database:
             {"$set": update_data},
             upsert=True
         )
+        self.auth_cache.invalidate_user(user_id)
 
     async def approve_payment(self, user_id: int) -> Optional[dict]:
         user = await self.get_user(user_id)
@@ -326,6 +541,7 @@ class Database:
                 "$unset": {"pending_payment": ""}
             }
         )
+        self.auth_cache.invalidate_user(user_id)
         return await self.get_user(user_id)
 
     async def reject_payment(self, user_id: int) -> bool:
@@ -333,6 +549,7 @@ class Database:
             {"_id": user_id},
             {"$unset": {"pending_payment": ""}}
         )
+        self.auth_cache.invalidate_user(user_id)
         return result.modified_count > 0
 
     async def get_expired_users(self) -> List[dict]:
@@ -347,6 +564,7 @@ class Database:
             {"_id": user_id},
             {"$set": {"subscription_status": "expired"}}
         )
+        self.auth_cache.invalidate_user(user_id)
 
     async def get_expiring_users(self, hours: int = 24) -> List[dict]:
         now = datetime.utcnow()
@@ -359,10 +577,11 @@ class Database:
         return await cursor.to_list(None)
         
     async def mark_reminder_sent(self, user_id: int):
-         await self.dbs["tracking"]["users"].update_one(
+        await self.dbs["tracking"]["users"].update_one(
             {"_id": user_id},
             {"$set": {"reminder_sent": True}}
         )
+        self.auth_cache.invalidate_user(user_id)
 
     #-----
     #----- Admin Subscription Management
@@ -436,6 +655,7 @@ class Database:
                 },
                 upsert=True
             )
+            self.auth_cache.invalidate_user(user_id)
             if status == "active":
                 await self.ensure_api_token_for_user(user_id, (user or {}).get("first_name"))
             await self.align_token_with_subscription(user_id)
@@ -446,12 +666,14 @@ class Database:
                 {"_id": user_id},
                 {"$set": {"subscription_status": "expired", "subscription_expiry": now}}
             )
+            self.auth_cache.invalidate_user(user_id)
             await self.align_token_with_subscription(user_id)
             return True
 
         elif action == "remove":
             await self.align_token_with_subscription(user_id)
             await self.dbs["tracking"]["users"].delete_one({"_id": user_id})
+            self.auth_cache.invalidate_user(user_id)
             return True
 
         return False
@@ -460,6 +682,7 @@ class Database:
     async def update_subscriber_name(self, user_id: int, name: str) -> None:
         await self.dbs["tracking"]["users"].update_one({"_id": user_id}, {"$set": {"first_name": name}})
         await self.dbs["tracking"]["api_tokens"].update_one({"user_id": user_id}, {"$set": {"name": name}})
+        self.auth_cache.invalidate_user(user_id)
 
     async def assign_subscription(self, user_id: int, days: int, name: str = None) -> dict:
         #----- Upsert a subscription for any user_id, creating a record if it doesn't exist
@@ -487,6 +710,7 @@ class Database:
             {"$set": set_fields, "$setOnInsert": insert_fields},
             upsert=True
         )
+        self.auth_cache.invalidate_user(user_id)
         token_doc = await self.ensure_api_token_for_user(user_id, (user or {}).get("first_name"))
         token = token_doc.get("token") if token_doc else None
         await self.align_token_with_subscription(user_id)
@@ -516,6 +740,7 @@ class Database:
             {"$set": set_fields, "$unset": {"subscription_expiry": ""}, "$setOnInsert": insert_fields},
             upsert=True,
         )
+        self.auth_cache.invalidate_user(user_id)
         token_doc = await self.ensure_api_token_for_user(user_id, (user or {}).get("first_name"))
         token = token_doc.get("token") if token_doc else None
         if token:
@@ -542,8 +767,150 @@ class Database:
         catalog.setdefault("allowed_tokens", [])
         catalog.setdefault("exclusive", False)
         catalog.setdefault("searchable", False)
+        counts = catalog.get("counts") or {}
+        catalog["counts"] = {"movie": int(counts.get("movie") or 0), "tv": int(counts.get("tv") or 0)}
+        catalog["item_count"] = catalog["counts"]["movie"] + catalog["counts"]["tv"]
         return catalog
 
+    #----- Catalog items live in tracking.catalog_items, one row per (catalog, title), so a catalog's
+    #----- size never touches its own document. Each row carries its effective visibility (the
+    #----- per-item override, else the catalog's) and a sort_key (updated_on, else added_at).
+    @staticmethod
+    def _catalog_item_id(catalog_id: str, media_type: str, tmdb_id: int, db_index: int) -> str:
+        return f"{catalog_id}:{media_type}:{int(tmdb_id)}:{int(db_index)}"
+
+    def _catalog_item_row(self, catalog_id: str, item: dict, catalog: Optional[dict] = None) -> Optional[dict]:
+        try:
+            tmdb_id = int(item.get("tmdb_id"))
+            db_index = int(item.get("db_index", 1))
+        except (TypeError, ValueError):
+            return None
+        media_type = self._collection_for(item.get("media_type", "movie"))
+        visibility, allowed_tokens = item.get("visibility"), item.get("allowed_tokens")
+        if visibility not in ("public", "tokens", "owner"):
+            catalog = catalog or {}
+            visibility, allowed_tokens = catalog.get("visibility") or "public", catalog.get("allowed_tokens")
+        added_at = item.get("added_at") or datetime.utcnow()
+        return {
+            "_id": self._catalog_item_id(catalog_id, media_type, tmdb_id, db_index),
+            "catalog_id": str(catalog_id),
+            "media_type": media_type,
+            "tmdb_id": tmdb_id,
+            "db_index": db_index,
+            "added_at": added_at,
+            "updated_on": item.get("updated_on"),
+            "sort_key": item.get("updated_on") or added_at,
+            "visibility": visibility,
+            "allowed_tokens": list(allowed_tokens or []),
+        }
+
+    #----- Recount rows per type for the given catalogs (after bulk removals/replacements)
+    async def _refresh_catalog_counts(self, catalog_ids: List[str]) -> None:
+        counts = {str(cid): {"movie": 0, "tv": 0} for cid in catalog_ids}
+        if not counts:
+            return
+        pipeline = [
+            {"$match": {"catalog_id": {"$in": list(counts)}}},
+            {"$group": {"_id": {"c": "$catalog_id", "t": "$media_type"}, "n": {"$sum": 1}}},
+        ]
+        try:
+            async for row in self.dbs["tracking"]["catalog_items"].aggregate(pipeline):
+                counts[row["_id"]["c"]][row["_id"]["t"]] = row["n"]
+            now = datetime.utcnow()
+            ops = [
+                UpdateOne({"_id": ObjectId(cid)},
+                          {"$set": {"counts": c, "item_count": c["movie"] + c["tv"], "updated_at": now}})
+                for cid, c in counts.items() if ObjectId.is_valid(cid)
+            ]
+            if ops:
+                await self.dbs["tracking"]["custom_catalogs"].bulk_write(ops, ordered=False)
+        except Exception as e:
+            LOGGER.error(f"Failed to refresh catalog counts: {e}")
+
+    #----- (tmdb_id, db_index, media_type) of every title in a catalog
+    async def _catalog_item_refs(self, catalog_id: str) -> List[dict]:
+        cursor = self.dbs["tracking"]["catalog_items"].find(
+            {"catalog_id": str(catalog_id)}, {"_id": 0, "tmdb_id": 1, "db_index": 1, "media_type": 1}
+        )
+        return await cursor.to_list(None)
+
+    #----- Insert the items a catalog doesn't hold yet; returns how many were new
+    async def add_catalog_items(self, catalog_id: str, items: List[dict]) -> int:
+        rows = [row for row in (self._catalog_item_row(catalog_id, it) for it in items or []) if row]
+        if not rows:
+            return 0
+        ops = [
+            UpdateOne({"_id": row["_id"]}, {"$setOnInsert": {k: v for k, v in row.items() if k != "_id"}}, upsert=True)
+            for row in rows
+        ]
+        result = await self.dbs["tracking"]["catalog_items"].bulk_write(ops, ordered=False)
+        added = [rows[i]["media_type"] for i in result.upserted_ids]
+        if added:
+            inc = {"item_count": len(added)}
+            for media_type in added:
+                inc[f"counts.{media_type}"] = inc.get(f"counts.{media_type}", 0) + 1
+            await self.dbs["tracking"]["custom_catalogs"].update_one(
+                {"_id": ObjectId(catalog_id)}, {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}}
+            )
+            self.invalidate_catalog_items([catalog_id])
+            self.catalog_pages.invalidate("custom", "manifest")
+        return len(added)
+
+    #----- Make a catalog hold exactly `items`: rows are rewritten under a fresh batch id and
+    #----- whatever the batch didn't touch is dropped, so readers never see an empty catalog
+    async def replace_catalog_items(self, catalog_id: str, items: List[dict]) -> int:
+        batch = ObjectId()
+        coll = self.dbs["tracking"]["catalog_items"]
+        rows = [row for row in (self._catalog_item_row(catalog_id, it) for it in items or []) if row]
+        for start in range(0, len(rows), self.CATALOG_ITEM_BATCH):
+            await coll.bulk_write(
+                [ReplaceOne({"_id": row["_id"]}, {**row, "batch": batch}, upsert=True)
+                 for row in rows[start:start + self.CATALOG_ITEM_BATCH]],
+                ordered=False,
+            )
+        await coll.delete_many({"catalog_id": str(catalog_id), "batch": {"$ne": batch}})
+        self.invalidate_catalog_items([catalog_id])
+        await self._refresh_catalog_counts([catalog_id])
+        self.catalog_pages.invalidate("custom", "manifest")
+        return len(rows)
+
+    async def clear_catalog_items(self, catalog_ids: List[str]) -> None:
+        ids = [str(cid) for cid in catalog_ids]
+        if not ids:
+            return
+        await self.dbs["tracking"]["catalog_items"].delete_many({"catalog_id": {"$in": ids}})
+        self.invalidate_catalog_items(ids)
+        await self._refresh_catalog_counts(ids)
+        self.catalog_pages.invalidate("custom", "manifest")
+
+    #----- One-off move of catalogs that still embed an `items` array into catalog_items. Rows are
+    #----- upserted before the array is unset, so an interrupted run just repeats on next start.
+    async def migrate_catalog_items(self) -> int:
+        catalogs = self.dbs["tracking"]["custom_catalogs"]
+        moved = 0
+        try:
+            async for catalog in catalogs.find({"items": {"$exists": True}}):
+                catalog = self._normalize_catalog(catalog)
+                catalog_id = str(catalog["_id"])
+                rows = [row for row in (self._catalog_item_row(catalog_id, it, catalog)
+                                        for it in catalog.get("items") or []) if row]
+                for start in range(0, len(rows), self.CATALOG_ITEM_BATCH):
+                    await self.dbs["tracking"]["catalog_items"].bulk_write(
+                        [ReplaceOne({"_id": row["_id"]}, row, upsert=True)
+                         for row in rows[start:start + self.CATALOG_ITEM_BATCH]],
+                        ordered=False,
+                    )
+                await self._refresh_catalog_counts([catalog_id])
+                await catalogs.update_one({"_id": catalog["_id"]}, {"$unset": {"items": ""}})
+                moved += len(rows)
+                LOGGER.info(f"Moved {len(rows)} item(s) of catalog '{catalog.get('name')}' to catalog_items")
+        except Exception as e:
+            LOGGER.error(f"Catalog item migration failed: {e}")
+        if moved:
+            self.invalidate_catalog_items()
+            self.catalog_pages.clear()
+        return moved
+
     async def create_custom_catalog(self, name: str, visibility: str = "public", allowed_tokens: Optional[List[str]] = None) -> Optional[str]:
         name = (name or "").strip()
         if not name:
@@ -559,10 +926,12 @@ class Database:
             "visible": visibility != "owner",
             "exclusive": False,
             "searchable": False,
-            "items": [],
+            "item_count": 0,
+            "counts": {"movie": 0, "tv": 0},
             "created_at": now,
             "updated_at": now,
         })
+        self.catalog_pages.clear()
         return str(result.inserted_id)
 
     async def get_custom_catalogs(self, visible_only: bool = False) -> List[dict]:
@@ -608,8 +977,6 @@ class Database:
             update_data["visibility"] = visibility
             update_data["visible"] = visibility != "owner"
             update_data["allowed_tokens"] = tokens
-            update_data["items.$[].visibility"] = visibility
-            update_data["items.$[].allowed_tokens"] = tokens
 
         #----- Exclusive locks every title to this catalog only (never on auto catalogs,
         #----- and only meaningful for restricted visibility)
@@ -628,8 +995,15 @@ class Database:
         except Exception:
             return False
 
-        catalog = await self.dbs["tracking"]["custom_catalogs"].find_one({"_id": ObjectId(catalog_id)})
-        items = catalog.get("items", []) if catalog else []
+        items: List[dict] = []
+        if cascade:
+            await self.dbs["tracking"]["catalog_items"].update_many(
+                {"catalog_id": str(catalog_id)},
+                {"$set": {"visibility": visibility, "allowed_tokens": tokens}},
+            )
+            self.invalidate_catalog_items([catalog_id])
+        if cascade or want_exclusive is not None:
+            items = await self._catalog_item_refs(catalog_id)
 
         #----- Stamp visibility onto the underlying media documents so the default
         #----- Latest/Popular catalogs and search honour it too
@@ -643,6 +1017,10 @@ class Database:
         elif want_exclusive is False:
             await self._clear_exclusivity_from_docs(items)
 
+        if cascade or want_exclusive is not None:
+            self.catalog_pages.clear()
+        else:
+            self.catalog_pages.invalidate("custom", "manifest")
         return result.modified_count > 0
 
     #----- Stamp visibility onto media documents referenced by the given catalog items
@@ -667,6 +1045,7 @@ class Database:
                 )
             except Exception as e:
                 LOGGER.error(f"_apply_visibility_to_docs failed for {db_key}.{collection}: {e}")
+        self.catalog_pages.clear()
 
     #----- Group catalog items into {(db_index, collection): [tmdb_id, ...]}
     def _group_items_by_storage(self, items: List[dict]) -> Dict[Tuple[int, str], List[int]]:
@@ -694,6 +1073,7 @@ class Database:
                 )
             except Exception as e:
                 LOGGER.error(f"_apply_exclusivity_to_docs failed for {db_key}.{collection}: {e}")
+        self.catalog_pages.clear()
 
     #----- Unlock the given titles so they return to default/auto/other catalogs
     async def _clear_exclusivity_from_docs(self, items: List[dict]) -> None:
@@ -711,6 +1091,7 @@ class Database:
                 )
             except Exception as e:
                 LOGGER.error(f"_clear_exclusivity_from_docs failed for {db_key}.{collection}: {e}")
+        self.catalog_pages.clear()
 
     #----- Remove the given titles from every catalog except the one that owns them
     async def purge_items_from_other_catalogs(self, catalog_id: str, items: List[dict]) -> None:
@@ -722,19 +1103,20 @@ class Database:
                 continue
         if not ids_by_type:
             return
-        coll = self.dbs["tracking"]["custom_catalogs"]
-        now = datetime.utcnow()
-        for media_type, ids in ids_by_type.items():
-            id_list = list(ids)
-            try:
-                await coll.update_many(
-                    {"_id": {"$ne": ObjectId(catalog_id)},
-                     "items": {"$elemMatch": {"tmdb_id": {"$in": id_list}, "media_type": media_type}}},
-                    {"$pull": {"items": {"tmdb_id": {"$in": id_list}, "media_type": media_type}},
-                     "$set": {"updated_at": now}},
-                )
-            except Exception as e:
-                LOGGER.error(f"purge_items_from_other_catalogs failed: {e}")
+        coll = self.dbs["tracking"]["catalog_items"]
+        query = {
+            "catalog_id": {"$ne": str(catalog_id)},
+            "$or": [{"media_type": media_type, "tmdb_id": {"$in": list(ids)}} for media_type, ids in ids_by_type.items()],
+        }
+        try:
+            affected = await coll.distinct("catalog_id", query)
+            if affected:
+                await coll.delete_many(query)
+                self.invalidate_catalog_items(affected)
+                await self._refresh_catalog_counts(affected)
+        except Exception as e:
+            LOGGER.error(f"purge_items_from_other_catalogs failed: {e}")
+        self.catalog_pages.invalidate("custom", "manifest")
 
     #----- Mark a single freshly-added title exclusive to its catalog
     async def mark_item_exclusive(self, catalog_id: str, tmdb_id: int, db_index: int, media_type: str, searchable: bool) -> None:
@@ -756,15 +1138,16 @@ class Database:
             return False
         media_type = self._collection_for(media_type)
         try:
-            result = await self.dbs["tracking"]["custom_catalogs"].update_one(
-                {"_id": ObjectId(catalog_id),
-                 "items": {"$elemMatch": {"tmdb_id": int(tmdb_id), "db_index": int(db_index), "media_type": media_type}}},
-                {"$set": {
-                    "items.$.visibility": visibility,
-                    "items.$.allowed_tokens": list(allowed_tokens or []),
-                    "updated_at": datetime.utcnow(),
-                }},
+            result = await self.dbs["tracking"]["catalog_items"].update_one(
+                {"_id": self._catalog_item_id(catalog_id, media_type, tmdb_id, db_index)},
+                {"$set": {"visibility": visibility, "allowed_tokens": list(allowed_tokens or [])}},
             )
+            self.invalidate_catalog_items([catalog_id])
+            if result.matched_count:
+                await self.dbs["tracking"]["custom_catalogs"].update_one(
+                    {"_id": ObjectId(catalog_id)}, {"$set": {"updated_at": datetime.utcnow()}}
+                )
+            self.catalog_pages.clear()
             return result.modified_count > 0
         except Exception:
             return False
@@ -791,15 +1174,18 @@ class Database:
             except Exception as e:
                 LOGGER.error(f"set_media_visibility doc update failed: {e}")
 
+        self.catalog_pages.clear()
         #----- Keep any catalog items in sync so custom-catalog filtering matches
+        query = {"tmdb_id": int(tmdb_id), "db_index": int(db_index), "media_type": collection}
         try:
-            result = await self.dbs["tracking"]["custom_catalogs"].update_many(
-                {"items": {"$elemMatch": {"tmdb_id": int(tmdb_id), "db_index": int(db_index), "media_type": collection}}},
-                {"$set": {
-                    "items.$.visibility": visibility,
-                    "items.$.allowed_tokens": tokens,
-                    "updated_at": now,
-                }},
+            affected = await self.dbs["tracking"]["catalog_items"].distinct("catalog_id", query)
+            result = await self.dbs["tracking"]["catalog_items"].update_many(
+                query, {"$set": {"visibility": visibility, "allowed_tokens": tokens}}
+            )
+            self.invalidate_catalog_items(affected)
+            await self.dbs["tracking"]["custom_catalogs"].update_many(
+                {"_id": {"$in": [ObjectId(cid) for cid in affected if ObjectId.is_valid(cid)]}},
+                {"$set": {"updated_at": now}},
             )
             return result.modified_count
         except Exception:
@@ -815,9 +1201,37 @@ class Database:
             "allowed_tokens": doc.get("allowed_tokens") or [],
         }
 
+    #----- Every token named in an allowed_tokens list (titles, catalogs, catalog items); cached
+    #----- with the catalog pages and recomputed after the next visibility change. None when
+    #----- the lookup failed (callers must not share pages across tokens then).
+    async def restricted_tokens(self) -> Optional[Set[str]]:
+        cached = self.catalog_pages.restricted_tokens
+        if cached is not None:
+            return cached
+        tokens: Set[str] = set()
+        try:
+            for db_key in [k for k in self.dbs if k.startswith("storage_")]:
+                for collection_name in ("movie", "tv"):
+                    tokens.update(await self.dbs[db_key][collection_name].distinct(
+                        "allowed_tokens", {"visibility": "tokens"}
+                    ))
+            catalogs = self.dbs["tracking"]["custom_catalogs"]
+            tokens.update(await catalogs.distinct("allowed_tokens", {"visibility": "tokens"}))
+            tokens.update(await self.dbs["tracking"]["catalog_items"].distinct(
+                "allowed_tokens", {"visibility": "tokens"}
+            ))
+        except Exception as e:
+            LOGGER.error(f"restricted_tokens lookup failed: {e}")
+            return None
+        self.catalog_pages.restricted_tokens = tokens
+        return tokens
+
     async def delete_custom_catalog(self, catalog_id: str) -> bool:
         try:
             result = await self.dbs["tracking"]["custom_catalogs"].delete_one({"_id": ObjectId(catalog_id)})
+            await self.dbs["tracking"]["catalog_items"].delete_many({"catalog_id": str(catalog_id)})
+            self.invalidate_catalog_items([catalog_id])
+            self.catalog_pages.invalidate("custom", "manifest")
             return result.deleted_count > 0
         except Exception:
             return False
@@ -836,25 +1250,9 @@ class Database:
             "allowed_tokens": (doc.get("allowed_tokens") if doc else None) or [],
         }
         try:
-            result = await self.dbs["tracking"]["custom_catalogs"].update_one(
-                {
-                    "_id": ObjectId(catalog_id),
-                    "items": {
-                        "$not": {
-                            "$elemMatch": {
-                                "tmdb_id": int(tmdb_id),
-                                "db_index": int(db_index),
-                                "media_type": media_type,
-                            }
-                        }
-                    },
-                },
-                {
-                    "$push": {"items": {"$each": [item], "$position": 0}},
-                    "$set": {"updated_at": datetime.utcnow()},
-                }
-            )
-            return result.modified_count > 0
+            if not await self.dbs["tracking"]["custom_catalogs"].find_one({"_id": ObjectId(catalog_id)}, {"_id": 1}):
+                return False
+            return await self.add_catalog_items(catalog_id, [item]) > 0
         except Exception:
             return False
 
@@ -863,20 +1261,18 @@ class Database:
     ) -> bool:
         media_type = self._collection_for(media_type)
         try:
-            result = await self.dbs["tracking"]["custom_catalogs"].update_one(
+            result = await self.dbs["tracking"]["catalog_items"].delete_one(
+                {"_id": self._catalog_item_id(catalog_id, media_type, tmdb_id, db_index)}
+            )
+            if not result.deleted_count:
+                return False
+            self.invalidate_catalog_items([catalog_id])
+            await self.dbs["tracking"]["custom_catalogs"].update_one(
                 {"_id": ObjectId(catalog_id)},
-                {
-                    "$pull": {
-                        "items": {
-                            "tmdb_id": int(tmdb_id),
-                            "db_index": int(db_index),
-                            "media_type": media_type,
-                        }
-                    },
-                    "$set": {"updated_at": datetime.utcnow()},
-                }
+                {"$inc": {"item_count": -1, f"counts.{media_type}": -1}, "$set": {"updated_at": datetime.utcnow()}},
             )
-            return result.modified_count > 0
+            self.catalog_pages.invalidate("custom", "manifest")
+            return True
         except Exception:
             return False
 
@@ -908,41 +1304,21 @@ class Database:
             return 0
 
         media_type = self._collection_for(media_type)
-        collection = self.dbs["tracking"]["custom_catalogs"]
-        now = datetime.utcnow()
+        collection = self.dbs["tracking"]["catalog_items"]
+        query = {"tmdb_id": tmdb_id, "media_type": media_type}
         try:
-            result = await collection.update_many(
-                {"items": {"$elemMatch": {"tmdb_id": tmdb_id, "media_type": media_type}}},
-                [
-                    {
-                        "$set": {
-                            "items": {
-                                "$filter": {
-                                    "input": "$items",
-                                    "as": "it",
-                                    "cond": {
-                                        "$not": [
-                                            {
-                                                "$and": [
-                                                    {"$eq": ["$$it.tmdb_id", tmdb_id]},
-                                                    {"$eq": ["$$it.media_type", media_type]},
-                                                ]
-                                            }
-                                        ]
-                                    },
-                                }
-                            }
-                        }
-                    },
-                    {"$set": {"item_count": {"$size": "$items"}, "updated_at": now}},
-                ],
+            affected = await collection.distinct("catalog_id", query)
+            if not affected:
+                return 0
+            await collection.delete_many(query)
+            self.invalidate_catalog_items(affected)
+            await self._refresh_catalog_counts(affected)
+            self.catalog_pages.invalidate("custom", "manifest")
+            LOGGER.info(
+                f"Purged {media_type} tmdb_id {tmdb_id} from "
+                f"{len(affected)} catalog(s)."
             )
-            if result.modified_count:
-                LOGGER.info(
-                    f"Purged {media_type} tmdb_id {tmdb_id} from "
-                    f"{result.modified_count} catalog(s)."
-                )
-            return result.modified_count
+            return len(affected)
         except Exception as e:
             LOGGER.error(f"Failed to purge tmdb_id {tmdb_id} from catalogs: {e}")
             return 0
@@ -952,20 +1328,107 @@ class Database:
     ) -> bool:
         media_type = self._collection_for(media_type)
         try:
-            catalog = await self.dbs["tracking"]["custom_catalogs"].find_one({
-                "_id": ObjectId(catalog_id),
-                "items": {
-                    "$elemMatch": {
-                        "tmdb_id": int(tmdb_id),
-                        "db_index": int(db_index),
-                        "media_type": media_type,
-                    }
-                }
-            })
-            return bool(catalog)
+            row = await self.dbs["tracking"]["catalog_items"].find_one(
+                {"_id": self._catalog_item_id(catalog_id, media_type, tmdb_id, db_index)}, {"_id": 1}
+            )
+            return bool(row)
         except Exception:
             return False
 
+    #----- Ids of every catalog holding the given title
+    async def catalogs_containing_item(self, tmdb_id: int, db_index: int, media_type: str) -> Set[str]:
+        try:
+            return set(await self.dbs["tracking"]["catalog_items"].distinct("catalog_id", {
+                "tmdb_id": int(tmdb_id), "db_index": int(db_index), "media_type": self._collection_for(media_type),
+            }))
+        except Exception:
+            return set()
+
+    #----- Media types with at least one row matching `item_filter`, per catalog. One indexed probe
+    #----- per (catalog, type) that holds anything, so the cost doesn't grow with catalog size.
+    async def catalog_item_types(self, catalogs: List[dict], item_filter: Optional[dict] = None) -> Dict[str, Set[str]]:
+        pairs = [
+            (str(c["_id"]), media_type)
+            for c in catalogs for media_type in ("movie", "tv")
+            if (c.get("counts") or {}).get(media_type)
+        ]
+
+        async def _probe(catalog_id: str, media_type: str) -> bool:
+            if not item_filter:
+                return True
+            query = {"$and": [{"catalog_id": catalog_id, "media_type": media_type}, item_filter]}
+            return await self.dbs["tracking"]["catalog_items"].find_one(query, {"_id": 1}) is not None
+
+        found = await gather(*(_probe(cid, media_type) for cid, media_type in pairs))
+        types: Dict[str, Set[str]] = {}
+        for (catalog_id, media_type), hit in zip(pairs, found):
+            if hit:
+                types.setdefault(catalog_id, set()).add(media_type)
+        return types
+
+    #----- Rows of the given catalogs changed (None = any catalog): their keyset anchors are stale
+    def invalidate_catalog_items(self, catalog_ids: Optional[List[str]] = None) -> None:
+        if catalog_ids is None:
+            self._catalog_items_epoch += 1
+            self._catalog_item_gens.clear()
+            return
+        for catalog_id in catalog_ids:
+            self._catalog_item_gens[str(catalog_id)] = self._catalog_item_gens.get(str(catalog_id), 0) + 1
+
+    #----- One page of a catalog's rows, newest first, walked by keyset on (sort_key, _id). Anchors
+    #----- reached by earlier pages are kept per (catalog, type, filter) until that catalog's rows
+    #----- change (media writes elsewhere don't count), so sequential pages are a single indexed
+    #----- range read whatever the catalog's size; a page with no anchor walks there in bounded steps.
+    async def catalog_item_page(
+        self, catalog_id: str, media_type: Optional[str] = None, page: int = 1, page_size: int = 24,
+        item_filter: Optional[dict] = None,
+    ) -> List[dict]:
+        query: dict = {"catalog_id": str(catalog_id)}
+        if media_type:
+            query["media_type"] = self._collection_for(media_type)
+        if item_filter:
+            query = {"$and": [query, item_filter]}
+
+        generation = (self._catalog_items_epoch, self._catalog_item_gens.get(str(catalog_id), 0))
+        key = json.dumps(query, sort_keys=True, default=str)
+        entry = self._catalog_item_anchors.get(key)
+        if entry is None or entry["generation"] != generation:
+            if len(self._catalog_item_anchors) >= self.CATALOG_ANCHOR_ENTRIES:
+                self._catalog_item_anchors.clear()
+            entry = {"generation": generation, "states": {0: None}}
+            self._catalog_item_anchors[key] = entry
+        states = entry["states"]
+
+        coll = self.dbs["tracking"]["catalog_items"]
+        sort_spec = [("sort_key", DESCENDING), ("_id", DESCENDING)]
+
+        async def _read(anchor: Optional[tuple], limit: int, projection: Optional[dict] = None) -> List[dict]:
+            seek = query
+            if anchor is not None:
+                seek = {"$and": [query, self._keyset_filter("sort_key", DESCENDING, anchor)]}
+            return await coll.find(seek, projection).sort(sort_spec).limit(limit).to_list(limit)
+
+        offset = (max(page, 1) - 1) * page_size
+        base = max(o for o in states if o <= offset)
+        anchor = states[base]
+        #----- Walk the gap from the nearest known anchor in bounded projected reads (sort keys only)
+        step_size = page_size * self.PAGE_GAP_STEP
+        while base < offset:
+            step = min(step_size, offset - base)
+            skipped = await _read(anchor, step, {"sort_key": 1})
+            if not skipped:
+                return []
+            base += len(skipped)
+            anchor = (skipped[-1]["sort_key"], skipped[-1]["_id"])
+            states[base] = anchor
+            if len(skipped) < step:
+                return []
+
+        rows = await _read(anchor, page_size)
+        if rows:
+            states[offset + len(rows)] = (rows[-1]["sort_key"], rows[-1]["_id"])
+        return rows
+
     async def get_custom_catalog_items(
         self, catalog_id: str, media_type: Optional[str] = None, page: int = 1, page_size: int = 24
     ) -> dict:
@@ -977,15 +1440,9 @@ class Database:
         if media_type:
             db_media_type = self._collection_for(media_type)
 
-        raw_items = catalog.get("items", []) or []
-        if db_media_type:
-            raw_items = [item for item in raw_items if item.get("media_type") == db_media_type]
-
-        total_count = len(raw_items)
-        skip = (page - 1) * page_size
-        selected_items = raw_items[skip:skip + page_size]
-
-        hydrated_items = await self.get_documents(selected_items)
+        total_count = catalog["counts"][db_media_type] if db_media_type else catalog["item_count"]
+        rows = await self.catalog_item_page(catalog_id, db_media_type, page, page_size)
+        hydrated_items = await self.get_documents(rows)
 
         total_pages = (total_count + page_size - 1) // page_size if total_count else 0
         return {
@@ -1006,61 +1463,172 @@ class Database:
             return {sort_field: DESCENDING if sort_direction.lower() == "desc" else ASCENDING}
         return {"updated_on": DESCENDING}
 
+    #----- Per-DB document counts for a filter, fetched concurrently and cached for COUNT_CACHE_TTL.
+    #----- Unfiltered counts use collection metadata (estimated_document_count).
+    async def _storage_counts(self, collection_name: str, filter_dict: dict) -> dict:
+        key = json.dumps([collection_name, filter_dict, self.current_db_index], sort_keys=True, default=str)
+        now = time.monotonic()
+        entry = self._count_cache.get(key)
+        if entry and entry["expires"] > now:
+            return entry
+
+        async def _count(i: int) -> int:
+            coll = self.dbs[f"storage_{i}"][collection_name]
+            if not filter_dict:
+                return await coll.estimated_document_count()
+            return await coll.count_documents(filter_dict)
+
+        indices = list(range(1, self.current_db_index + 1))
+        counts = await gather(*[_count(i) for i in indices])
+        if len(self._count_cache) > 512:
+            self._count_cache = {k: v for k, v in self._count_cache.items() if v["expires"] > now}
+        entry = {"counts": list(zip(indices, counts)), "states": {}, "expires": now + self.COUNT_CACHE_TTL}
+        self._count_cache[key] = entry
+        return entry
+
+    def invalidate_catalog_counts(self) -> None:
+        self._count_cache.clear()
+
+    #----- Seek condition for "strictly after (value, _id)" in a (field, _id) sort.
+    #----- Missing/null sort values order lowest, so they follow every value in a descending walk.
+    @staticmethod
+    def _keyset_filter(sort_field: str, direction: int, anchor: tuple) -> dict:
+        value, last_id = anchor
+        op = "$lt" if direction == DESCENDING else "$gt"
+        if value is None:
+            clauses = [{sort_field: None, "_id": {op: last_id}}]
+            if direction == ASCENDING:
+                clauses.append({sort_field: {"$ne": None}})
+        else:
+            clauses = [{sort_field: {op: value}}, {sort_field: value, "_id": {op: last_id}}]
+            if direction == DESCENDING:
+                clauses.append({sort_field: None})
+        return {"$or": clauses}
+
+    #----- Merge key matching MongoDB's cross-type sort order (null < numbers < strings < ... < dates)
+    @staticmethod
+    def _merge_key(sort_field: str):
+        def _rank(value) -> int:
+            if value is None:
+                return 0
+            if isinstance(value, bool):
+                return 7
+            if isinstance(value, (int, float)):
+                return 1
+            if isinstance(value, str):
+                return 2
+            if isinstance(value, ObjectId):
+                return 6
+            if isinstance(value, datetime):
+                return 8
+            return 3
+
+        def _key(doc: dict):
+            value = doc.get(sort_field)
+            rank = _rank(value)
+            return (rank, value if rank not in (0, 3) else 0, doc["_id"])
+
+        return _key
+
+    #----- One merge step: fetch up to `limit` docs after each DB's anchor (concurrently), k-way merge them
+    #----- and consume the first `limit`. Returns (docs, advanced anchors, DBs that contributed).
+    async def _merge_step(self, collection_name, filter_dict, sort_field, direction, state, limit, projection=None):
+        sort_spec = [(sort_field, direction), ("_id", direction)]
+        indices = list(range(1, self.current_db_index + 1))
+
+        async def _fetch(db_index: int) -> list:
+            anchor = state.get(db_index)
+            query = filter_dict
+            if anchor is not None:
+                seek = self._keyset_filter(sort_field, direction, anchor)
+                query = {"$and": [filter_dict, seek]} if filter_dict else seek
+            cursor = self.dbs[f"storage_{db_index}"][collection_name].find(query, projection).sort(sort_spec)
+            docs = await cursor.limit(limit).to_list(limit)
+            for doc in docs:
+                doc["_merge_db"] = db_index
+            return docs
+
+        batches = await gather(*[_fetch(i) for i in indices])
+        merged = list(islice(
+            heapq.merge(*batches, key=self._merge_key(sort_field), reverse=direction == DESCENDING),
+            limit,
+        ))
+        new_state = dict(state)
+        contributed = []
+        for doc in merged:
+            db_index = doc.pop("_merge_db")
+            new_state[db_index] = (doc.get(sort_field), doc["_id"])
+            if db_index not in contributed:
+                contributed.append(db_index)
+        return merged, new_state, contributed
+
+    @staticmethod
+    def _encode_page_cursor(sort_field: str, direction: int, offset: int, state: dict) -> str:
+        payload = {"f": sort_field, "d": direction, "o": offset,
+                   "s": [[i, value, oid] for i, (value, oid) in sorted(state.items())]}
+        return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_page_cursor(cursor: str, sort_field: str, direction: int) -> Optional[Tuple[int, dict]]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if payload.get("f") != sort_field or payload.get("d") != direction:
+                return None
+            return int(payload["o"]), {int(i): (value, oid) for i, value, oid in payload["s"]}
+        except Exception:
+            return None
+
+    #----- Globally sorted page across all storage DBs via a streaming k-way merge of per-DB keyset cursors.
+    #----- Page numbers resume from cached merge states; `cursor` (from a previous page) resumes exactly.
     async def _paginate_collection(
         self,
         collection_name: str,
         sort_dict: Dict[str, int],
         page: int,
         page_size: int,
-        filter_dict: Optional[dict] = None
+        filter_dict: Optional[dict] = None,
+        cursor: Optional[str] = None,
     ):
         filter_dict = filter_dict or {}
-        skip = (page - 1) * page_size
-        results = []
-        dbs_checked = []
-        total_count = 0
-
-        db_counts = []
-        for i in range(1, self.current_db_index + 1):
-            db_key = f"storage_{i}"
-            db = self.dbs[db_key]
-            count = await db[collection_name].count_documents(filter_dict)
-            db_counts.append((i, count))
-            total_count += count
-
-        start_db_index = None
-        for db_index, count in reversed(db_counts):
-            if skip < count:
-                start_db_index = db_index
-                break
-            skip -= count
-
-        if not start_db_index:
-            return [], [], total_count
-
-        for db_index, count in reversed(db_counts):
-            if db_index < start_db_index:
-                continue
-
-            db_key = f"storage_{db_index}"
-            db = self.dbs[db_key]
-            dbs_checked.append(db_index)
-
-            cursor = (
-                db[collection_name]
-                .find(filter_dict)
-                .sort(sort_dict)
-                .skip(skip if db_index == start_db_index else 0)
-                .limit(page_size - len(results))
-            )
+        sort_field, direction = next(iter(sort_dict.items()))
 
-            docs = await cursor.to_list(None)
-            results.extend(docs)
+        counted = await self._storage_counts(collection_name, filter_dict)
+        total_count = sum(count for _, count in counted["counts"])
+        states = counted["states"].setdefault((sort_field, direction), {0: {}})
 
-            if len(results) >= page_size:
-                break
+        decoded = self._decode_page_cursor(cursor, sort_field, direction) if cursor else None
+        if decoded:
+            offset, state = decoded
+        else:
+            offset = (page - 1) * page_size
+            if offset >= total_count:
+                return [], [], total_count, None
+            base = max(o for o in states if o <= offset)
+            state = states[base]
+            #----- Walk the gap from the nearest known state in bounded projected merges (sort keys
+            #----- only), recording each state on the way so later pages start closer
+            step_size = page_size * self.PAGE_GAP_STEP
+            while base < offset:
+                step = min(step_size, offset - base)
+                skipped, state, _ = await self._merge_step(
+                    collection_name, filter_dict, sort_field, direction, state, step,
+                    projection={sort_field: 1},
+                )
+                if not skipped:
+                    return [], [], total_count, None
+                base += len(skipped)
+                states[base] = state
 
-        return results, dbs_checked, total_count
+        results, next_state, dbs_checked = await self._merge_step(
+            collection_name, filter_dict, sort_field, direction, state, page_size
+        )
+        next_offset = offset + len(results)
+        states[next_offset] = next_state
+        next_cursor = None
+        if len(results) == page_size and next_offset < total_count:
+            next_cursor = self._encode_page_cursor(sort_field, direction, next_offset, next_state)
+        return results, dbs_checked, total_count, next_cursor
 
     async def _move_document(
         self, collection_name: str, document: dict, old_db_index: int
@@ -1071,6 +1639,7 @@ class Database:
         try:
             await self.dbs[current_db_key][collection_name].insert_one(document)
             await self.dbs[old_db_key][collection_name].delete_one({"_id": document["_id"]})
+            await self.index_media_doc(collection_name, document, self.current_db_index)
             LOGGER.info(f"✅ Moved document {document.get('tmdb_id')} from {old_db_key} to {current_db_key}")
             return True
         except Exception as e:
@@ -1092,17 +1661,97 @@ class Database:
     def _collection_for(media_type: str) -> str:
         return "tv" if str(media_type).lower() in ("tv", "series") else "movie"
 
-    #----- Load a doc by tmdb_id, apply an async mutator, and save only if it changed
-    async def _edit_media_doc(self, collection_name: str, tmdb_id: int, db_index: int, mutate) -> bool:
-        db_key = f"storage_{db_index}"
-        doc = await self.dbs[db_key][collection_name].find_one({"tmdb_id": tmdb_id})
-        if not doc:
-            return False
-        if not await mutate(doc):
-            return False
-        doc["updated_on"] = datetime.utcnow()
-        result = await self.dbs[db_key][collection_name].replace_one({"tmdb_id": tmdb_id}, doc)
-        return result.modified_count > 0
+    #----- Load a doc by tmdb_id and apply a targeted update planned from it. `plan(doc)` may
+    #----- mutate the doc in memory and returns (update, array_filters, removed_qualities) or
+    #----- None for "nothing to do"; the write is guarded by the doc's rev and replanned on conflict.
+    async def _edit_media_doc(self, collection_name: str, tmdb_id: int, db_index: int, plan) -> bool:
+        collection = self.dbs[f"storage_{db_index}"][collection_name]
+        projection = {"tmdb_id": 1, "rev": 1, "telegram" if collection_name == "movie" else "seasons": 1}
+        for _ in range(self.MEDIA_WRITE_RETRIES):
+            doc = await collection.find_one({"tmdb_id": tmdb_id}, projection)
+            if not doc:
+                return False
+            planned = await plan(doc)
+            if not planned:
+                return False
+            update, array_filters, removed = planned
+            update.setdefault("$set", {})["updated_on"] = datetime.utcnow()
+            if await self._guarded_update(collection, doc, update, array_filters):
+                for quality in removed:
+                    await self._queue_quality_deletion(quality)
+                await self._unindex_qualities(removed)
+                await self._recount_content(collection_name, tmdb_id, db_index)
+                self.catalog_pages.invalidate(collection_name, "custom")
+                return True
+        LOGGER.error(f"Gave up editing {collection_name} {tmdb_id} after {self.MEDIA_WRITE_RETRIES} conflicting writes")
+        return False
+
+    #----- Optimistic concurrency: every partial write is conditional on the rev it was planned
+    #----- from, so concurrent writers (scan, receiver, admin edits) can't lose each other's changes
+    async def _guarded_update(self, collection, doc: dict, update: dict, array_filters: Optional[list] = None) -> bool:
+        update.setdefault("$inc", {})["rev"] = 1
+        kwargs = {"array_filters": array_filters} if array_filters else {}
+        result = await collection.update_one({"_id": doc["_id"], "rev": doc.get("rev")}, update, **kwargs)
+        if result.matched_count:
+            doc["rev"] = (doc.get("rev") or 0) + 1
+            return True
+        self.write_conflicts += 1
+        return False
+
+    #----- Smallest update turning `before` into `after` at an array path: append, remove by id,
+    #----- or (for anything else, e.g. a split part merged in place) a $set of just that array
+    @staticmethod
+    def _array_update(path: str, before: List[dict], after: List[dict]) -> dict:
+        if after == before:
+            return {}
+        if len(after) > len(before) and after[:len(before)] == before:
+            return {"$push": {path: {"$each": after[len(before):]}}}
+        kept_ids = {q.get("id") for q in after}
+        removed_ids = [q.get("id") for q in before if q.get("id") not in kept_ids]
+        if removed_ids and [q for q in before if q.get("id") in kept_ids] == after:
+            return {"$pull": {path: {"id": {"$in": removed_ids}}}}
+        return {"$set": {path: after}}
+
+    #----- Combine update fragments; pushes to the same array are concatenated ($each)
+    @staticmethod
+    def _merge_updates(updates: List[dict]) -> dict:
+        merged: Dict[str, dict] = {}
+        for update in updates:
+            for operator, fields in update.items():
+                target = merged.setdefault(operator, {})
+                for path, value in fields.items():
+                    if operator == "$push" and path in target:
+                        target[path] = {"$each": target[path]["$each"] + value["$each"]}
+                    else:
+                        target[path] = value
+        return merged
+
+    #----- Mongo rejects one update touching both a path and something beneath it
+    @staticmethod
+    def _paths_conflict(update: dict) -> bool:
+        paths = [path.split(".") for fields in update.values() for path in fields]
+        return any(
+            i != j and b[:len(a)] == a
+            for i, a in enumerate(paths) for j, b in enumerate(paths)
+        )
+
+    #----- Serialise writers of one title inside this process (other titles proceed in parallel).
+    #----- Refcounted: the entry is dropped only when its last holder or waiter leaves, so two
+    #----- writers of the same title can never end up on different locks.
+    @asynccontextmanager
+    async def _title_lock(self, collection_name: str, key):
+        lock_key = (collection_name, key)
+        entry = self._title_locks.get(lock_key)
+        if entry is None:
+            entry = self._title_locks[lock_key] = [Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._title_locks[lock_key]
 
     #----- Locate an existing doc across storage DBs by imdb_id, then tmdb_id, then title+year
     async def _find_existing_media(
@@ -1121,6 +1770,278 @@ class Database:
                 return doc, f"storage_{db_index}", db_index
         return None, None, None
 
+    #-----
+    #----- Stream index: tracking.stream_index maps every stream id ("id:<hash>") and every
+    #----- Telegram message behind it ("part:<chat_id>:<msg_id>") to the doc that holds it, so
+    #----- stream/part lookups are one point read instead of a scan of every storage DB.
+    #-----
+
+    #----- Stream ids never change once written, so their decoded parts are memoised
+    def _remember_stream_parts(self, stream_id: str, parts: List[Tuple[int, int]]) -> None:
+        if len(self._stream_parts_cache) >= self.STREAM_PARTS_CACHE_SIZE:
+            self._stream_parts_cache.pop(next(iter(self._stream_parts_cache)))
+        self._stream_parts_cache[stream_id] = parts
+
+    async def _stream_parts(self, quality: dict) -> List[Tuple[int, int]]:
+        parts = quality.get("parts")
+        if parts:
+            return [
+                (int(p["chat_id"]), int(p["msg_id"]))
+                for p in parts if p.get("chat_id") is not None and p.get("msg_id") is not None
+            ]
+        stream_id = quality.get("id")
+        if not stream_id:
+            return []
+        cached = self._stream_parts_cache.get(stream_id)
+        if cached is not None:
+            return cached
+        try:
+            decoded = await decode_string(stream_id)
+            targets = decoded.get("parts") if decoded.get("parts") else [decoded]
+            cached = [(int(t["chat_id"]), int(t["msg_id"])) for t in targets]
+        except Exception:
+            cached = []
+        self._remember_stream_parts(stream_id, cached)
+        return cached
+
+    #----- Every index entry a storage doc should own
+    async def _stream_entries(self, collection_name: str, doc: dict, db_index: int) -> List[dict]:
+        base = {
+            "db_index": db_index,
+            "collection": collection_name,
+            "tmdb_id": doc.get("tmdb_id"),
+            "imdb_id": doc.get("imdb_id"),
+            "title": doc.get("title"),
+        }
+        located = []
+        if collection_name == "movie":
+            located = [(q, None, None) for q in doc.get("telegram") or []]
+        else:
+            for season in doc.get("seasons") or []:
+                for episode in season.get("episodes") or []:
+                    for q in episode.get("telegram") or []:
+                        located.append((q, season.get("season_number"), episode.get("episode_number")))
+
+        entries: Dict[str, dict] = {}
+        for quality, season_number, episode_number in located:
+            stream_id = quality.get("id")
+            if not stream_id:
+                continue
+            parts = await self._stream_parts(quality)
+            location = {
+                **base, "stream_id": stream_id, "season": season_number, "episode": episode_number,
+                "split": bool(quality.get("parts")),
+            }
+            first_chat, first_msg = parts[0] if parts else (None, None)
+            entries[f"id:{stream_id}"] = {
+                "_id": f"id:{stream_id}", "kind": "id", **location, "chat_id": first_chat, "msg_id": first_msg,
+            }
+            for chat_id, msg_id in parts:
+                key = f"part:{chat_id}:{msg_id}"
+                entries[key] = {"_id": key, "kind": "part", **location, "chat_id": chat_id, "msg_id": msg_id}
+        return list(entries.values())
+
+    #----- Sync the entries of one doc: upsert what it holds now, drop what it no longer holds
+    async def index_media_doc(self, collection_name: str, doc: Optional[dict], db_index: Optional[int] = None) -> None:
+        if not doc or doc.get("tmdb_id") is None:
+            return
+        self.search_index.add(collection_name, doc, db_index)
+        self.catalog_pages.invalidate(collection_name, "custom")
+        if self._stream_index_backlog is not None:
+            self._stream_index_backlog.append(("index", collection_name, doc, db_index))
+        else:
+            await self._sync_stream_entries(collection_name, doc, db_index)
+        await self._record_content(collection_name, doc.get("tmdb_id"), self._content_counts(collection_name, doc))
+
+    #----- Diff the doc's entries against the stored ones and write only the difference:
+    #----- new or changed entries are upserted, entries of removed qualities deleted.
+    #----- `fresh` skips the read when the title is known to have no entries yet.
+    async def _sync_stream_entries(self, collection_name: str, doc: dict, db_index: Optional[int], fresh: bool = False) -> None:
+        tracking = self.dbs.get("tracking")
+        if tracking is None:
+            return
+        try:
+            entries = await self._stream_entries(collection_name, doc, db_index or doc.get("db_index"))
+            stored = {}
+            if not fresh:
+                cursor = tracking["stream_index"].find({"collection": collection_name, "tmdb_id": doc.get("tmdb_id")})
+                stored = {e["_id"]: e async for e in cursor}
+            ops = [
+                ReplaceOne({"_id": e["_id"]}, e, upsert=True)
+                for e in entries if stored.pop(e["_id"], None) != e
+            ]
+            if stored:
+                ops.append(DeleteMany({"_id": {"$in": list(stored)}}))
+            if ops:
+                await tracking["stream_index"].bulk_write(ops, ordered=False)
+        except Exception as e:
+            LOGGER.error(f"stream_index: failed to index {collection_name} {doc.get('tmdb_id')}: {e}")
+
+    #----- Drop the entries of qualities a targeted update removed (no full doc needed)
+    async def _unindex_qualities(self, qualities: List[dict]) -> None:
+        if not qualities:
+            return
+        if self._stream_index_backlog is not None:
+            self._stream_index_backlog.append(("qualities", qualities))
+            return
+        await self._delete_quality_entries(qualities)
+
+    async def _delete_quality_entries(self, qualities: List[dict]) -> None:
+        tracking = self.dbs.get("tracking")
+        if tracking is None:
+            return
+        ids = []
+        for quality in qualities:
+            if quality.get("id"):
+                ids.append(f"id:{quality['id']}")
+            ids.extend(f"part:{chat_id}:{msg_id}" for chat_id, msg_id in await self._stream_parts(quality))
+        try:
+            await tracking["stream_index"].delete_many({"_id": {"$in": ids}})
+        except Exception as e:
+            LOGGER.error(f"stream_index: failed to unindex {len(ids)} entries: {e}")
+
+    async def unindex_media_doc(self, collection_name: str, tmdb_id) -> None:
+        if tmdb_id is None:
+            return
+        self.search_index.remove(collection_name, tmdb_id)
+        self.catalog_pages.invalidate(collection_name, "custom")
+        if self._stream_index_backlog is not None:
+            self._stream_index_backlog.append(("drop", collection_name, tmdb_id))
+        else:
+            await self._drop_stream_entries(collection_name, tmdb_id)
+        await self._record_content(collection_name, tmdb_id, None)
+
+    async def _drop_stream_entries(self, collection_name: str, tmdb_id) -> None:
+        tracking = self.dbs.get("tracking")
+        if tracking is None:
+            return
+        try:
+            await tracking["stream_index"].delete_many({"collection": collection_name, "tmdb_id": tmdb_id})
+        except Exception as e:
+            LOGGER.error(f"stream_index: failed to unindex {collection_name} {tmdb_id}: {e}")
+
+    #----- Re-read a doc after an in-place update and resync its entries
+    async def _reindex_stored_doc(self, collection_name: str, tmdb_id, db_index: int) -> None:
+        doc = await self.dbs[f"storage_{db_index}"][collection_name].find_one({"tmdb_id": tmdb_id})
+        if doc:
+            await self.index_media_doc(collection_name, doc, db_index)
+        else:
+            await self.unindex_media_doc(collection_name, tmdb_id)
+
+    @property
+    def stream_index_ready(self) -> bool:
+        return self._stream_index_ready
+
+    async def lookup_stream(self, stream_id: str) -> Optional[dict]:
+        if not self._stream_index_ready or not stream_id:
+            return None
+        try:
+            return await self.dbs["tracking"]["stream_index"].find_one({"_id": f"id:{stream_id}"})
+        except Exception as e:
+            LOGGER.error(f"stream_index: lookup failed for {stream_id}: {e}")
+            return None
+
+    async def lookup_stream_part(self, chat_id: int, msg_id: int) -> Optional[dict]:
+        if not self._stream_index_ready:
+            return None
+        try:
+            return await self.dbs["tracking"]["stream_index"].find_one({"_id": f"part:{int(chat_id)}:{int(msg_id)}"})
+        except Exception as e:
+            LOGGER.error(f"stream_index: part lookup failed for {chat_id}/{msg_id}: {e}")
+            return None
+
+    #----- Load the storage doc an index entry points at
+    async def _doc_for_entry(self, entry: dict) -> Tuple[Optional[Any], Optional[dict]]:
+        db = self.dbs.get(f"storage_{entry.get('db_index')}")
+        if db is None:
+            return None, None
+        return db, await db[entry["collection"]].find_one({"tmdb_id": entry["tmdb_id"]})
+
+    #----- `rebuilding` writes the stream entries straight into the emptied index, past the
+    #----- backlog that holds everyone else's writes back
+    async def _index_storage_db(self, db_index: int, rebuilding: bool = False) -> int:
+        docs = 0
+        db = self.dbs[f"storage_{db_index}"]
+        for collection_name in ("movie", "tv"):
+            async for doc in db[collection_name].find({}):
+                if rebuilding:
+                    await self._sync_stream_entries(collection_name, doc, db_index, fresh=True)
+                else:
+                    await self.index_media_doc(collection_name, doc, db_index)
+                docs += 1
+        return docs
+
+    #----- Full rebuild from the storage DBs; lookups fall back to scanning until it completes.
+    #----- Index writes are held back meanwhile (the scan's cursor may already be past, or not
+    #----- yet at, the doc they touch) and replayed in order once every DB has been walked.
+    async def rebuild_stream_index(self) -> dict:
+        if self._stream_index_building:
+            return {"ok": False, "message": "Stream index rebuild already running."}
+        self._stream_index_building = True
+        self._stream_index_ready = False
+        self._stream_index_backlog = []
+        tracking = self.dbs["tracking"]
+        started = time.monotonic()
+        docs = 0
+        try:
+            await tracking["stream_index"].delete_many({})
+            for db_key in [k for k in self.dbs if k.startswith("storage_")]:
+                docs += await self._index_storage_db(int(db_key.split("_")[1]), rebuilding=True)
+            await self._replay_stream_index_backlog()
+            entries = await tracking["stream_index"].estimated_document_count()
+            await tracking["state"].update_one(
+                {"_id": "stream_index"},
+                {"$set": {"version": self.STREAM_INDEX_VERSION, "built_at": datetime.utcnow(), "docs": docs, "entries": entries}},
+                upsert=True,
+            )
+            self._stream_index_ready = True
+            elapsed = round(time.monotonic() - started, 2)
+            LOGGER.info(f"stream_index rebuilt: {docs} docs, {entries} entries in {elapsed}s")
+            return {"ok": True, "docs": docs, "entries": entries, "seconds": elapsed}
+        except Exception as e:
+            LOGGER.error(f"stream_index rebuild failed: {e}")
+            return {"ok": False, "message": str(e)}
+        finally:
+            self._stream_index_backlog = None
+            self._stream_index_building = False
+
+    #----- Apply the index writes held back during a rebuild, oldest first; writes arriving
+    #----- while this awaits keep queueing and are drained before the backlog is switched off
+    async def _replay_stream_index_backlog(self) -> None:
+        while self._stream_index_backlog:
+            pending, self._stream_index_backlog = self._stream_index_backlog, []
+            for op in pending:
+                if op[0] == "index":
+                    await self._sync_stream_entries(op[1], op[2], op[3])
+                elif op[0] == "drop":
+                    await self._drop_stream_entries(op[1], op[2])
+                else:
+                    await self._delete_quality_entries(op[1])
+
+    async def _load_stream_index_state(self) -> None:
+        try:
+            state = await self.dbs["tracking"]["state"].find_one({"_id": "stream_index"})
+        except Exception as e:
+            LOGGER.error(f"stream_index: failed reading state: {e}")
+            return
+        if state and state.get("version") == self.STREAM_INDEX_VERSION:
+            self._stream_index_ready = True
+        else:
+            create_task(self.rebuild_stream_index())
+
+    async def stream_index_stats(self) -> dict:
+        stats = {"ready": self._stream_index_ready, "building": self._stream_index_building}
+        try:
+            state = await self.dbs["tracking"]["state"].find_one({"_id": "stream_index"}) or {}
+            stats.update({
+                "entries": await self.dbs["tracking"]["stream_index"].estimated_document_count(),
+                "built_at": state.get("built_at").isoformat() if state.get("built_at") else None,
+                "docs_at_build": state.get("docs"),
+            })
+        except Exception as e:
+            stats["error"] = str(e)
+        return stats
+
 
     #-----
     #----- Multi Database Method for insert/update/delete/list
@@ -1140,6 +2061,10 @@ class Database:
     async def get_media_ids_by_part(
         self, channel: int, msg_id: int
     ) -> Optional[Tuple[Optional[str], Optional[int]]]:
+        if self._stream_index_ready:
+            entry = await self.lookup_stream_part(channel, msg_id)
+            return (entry.get("imdb_id"), entry.get("tmdb_id")) if entry else None
+
         try:
             legacy_hash = await encode_string({"chat_id": channel, "msg_id": msg_id})
         except Exception:
@@ -1165,7 +2090,59 @@ class Database:
 
         return None
 
+    #----- Drop one Telegram message from the split qualities of a doc, rebuilding their ids
+    async def _remove_part_from_doc(self, db_index: int, collection_name: str, doc: dict, channel: int, msg_id: int) -> bool:
+        db = self.dbs[f"storage_{db_index}"]
+
+        async def _strip(qualities: List[dict]) -> List[dict]:
+            kept = []
+            for q in qualities:
+                parts = q.get("parts")
+                if parts and any(p.get("chat_id") == channel and p.get("msg_id") == msg_id for p in parts):
+                    remaining = [p for p in parts if not (p.get("chat_id") == channel and p.get("msg_id") == msg_id)]
+                    if not remaining:
+                        continue  #----- last part removed: drop the whole quality entry
+                    new_id, new_size = await self._build_part_id_and_size(remaining)
+                    q["parts"] = remaining
+                    q["id"] = new_id
+                    q["size"] = new_size
+                kept.append(q)
+            return kept
+
+        if collection_name == "movie":
+            doc["telegram"] = await _strip(doc.get("telegram", []))
+            empty = len(doc["telegram"]) == 0
+        else:
+            for season in doc.get("seasons", []):
+                for episode in season.get("episodes", []):
+                    episode["telegram"] = await _strip(episode.get("telegram", []))
+                season["episodes"] = [e for e in season.get("episodes", []) if e.get("telegram")]
+            doc["seasons"] = [s for s in doc.get("seasons", []) if s.get("episodes")]
+            empty = len(doc["seasons"]) == 0
+
+        if empty:
+            await db[collection_name].delete_one({"_id": doc["_id"]})
+            await self.unindex_media_doc(collection_name, doc.get("tmdb_id"))
+            await self.purge_media_from_catalogs(doc.get("tmdb_id"), collection_name)
+        else:
+            doc["updated_on"] = datetime.utcnow()
+            doc["rev"] = (doc.get("rev") or 0) + 1
+            await db[collection_name].replace_one({"_id": doc["_id"]}, doc)
+            await self.index_media_doc(collection_name, doc, db_index)
+        return True
+
     async def remove_media_part(self, channel: int, msg_id: int) -> bool:
+        if self._stream_index_ready:
+            entry = await self.lookup_stream_part(channel, msg_id)
+            if not entry:
+                return False
+            if not entry.get("split"):
+                return await self.delete_media_by_stream_id(entry["stream_id"])
+            doc = await self.dbs[f"storage_{entry['db_index']}"][entry["collection"]].find_one({"tmdb_id": entry["tmdb_id"]})
+            if not doc:
+                return False
+            return await self._remove_part_from_doc(entry["db_index"], entry["collection"], doc, channel, msg_id)
+
         try:
             legacy_hash = await encode_string({"chat_id": channel, "msg_id": msg_id})
             if await self.delete_media_by_stream_id(legacy_hash):
@@ -1173,64 +2150,17 @@ class Database:
         except Exception as e:
             LOGGER.error(f"remove_media_part: legacy lookup failed: {e}")
 
+        part_match = {"$elemMatch": {"chat_id": channel, "msg_id": msg_id}}
         for i in range(1, self.current_db_index + 1):
             db = self.dbs[f"storage_{i}"]
 
-            movie = await db["movie"].find_one(
-                {"telegram.parts": {"$elemMatch": {"chat_id": channel, "msg_id": msg_id}}}
-            )
+            movie = await db["movie"].find_one({"telegram.parts": part_match})
             if movie:
-                new_telegram = []
-                for q in movie.get("telegram", []):
-                    parts = q.get("parts")
-                    if parts and any(p.get("chat_id") == channel and p.get("msg_id") == msg_id for p in parts):
-                        remaining = [p for p in parts if not (p.get("chat_id") == channel and p.get("msg_id") == msg_id)]
-                        if not remaining:
-                            continue  #----- last part removed: drop the whole quality entry
-                        new_id, new_size = await self._build_part_id_and_size(remaining)
-                        q["parts"] = remaining
-                        q["id"] = new_id
-                        q["size"] = new_size
-                    new_telegram.append(q)
-
-                if len(new_telegram) == 0:
-                    await db["movie"].delete_one({"_id": movie["_id"]})
-                    await self.purge_media_from_catalogs(movie.get("tmdb_id"), "movie")
-                else:
-                    movie["telegram"] = new_telegram
-                    movie["updated_on"] = datetime.utcnow()
-                    await db["movie"].replace_one({"_id": movie["_id"]}, movie)
-                return True
+                return await self._remove_part_from_doc(i, "movie", movie, channel, msg_id)
 
-            tv = await db["tv"].find_one(
-                {"seasons.episodes.telegram.parts": {"$elemMatch": {"chat_id": channel, "msg_id": msg_id}}}
-            )
+            tv = await db["tv"].find_one({"seasons.episodes.telegram.parts": part_match})
             if tv:
-                for season in tv.get("seasons", []):
-                    for episode in season.get("episodes", []):
-                        new_telegram = []
-                        for q in episode.get("telegram", []):
-                            parts = q.get("parts")
-                            if parts and any(p.get("chat_id") == channel and p.get("msg_id") == msg_id for p in parts):
-                                remaining = [p for p in parts if not (p.get("chat_id") == channel and p.get("msg_id") == msg_id)]
-                                if not remaining:
-                                    continue
-                                new_id, new_size = await self._build_part_id_and_size(remaining)
-                                q["parts"] = remaining
-                                q["id"] = new_id
-                                q["size"] = new_size
-                            new_telegram.append(q)
-                        episode["telegram"] = new_telegram
-                    season["episodes"] = [e for e in season.get("episodes", []) if e.get("telegram")]
-                tv["seasons"] = [s for s in tv.get("seasons", []) if s.get("episodes")]
-
-                if len(tv["seasons"]) == 0:
-                    await db["tv"].delete_one({"_id": tv["_id"]})
-                    await self.purge_media_from_catalogs(tv.get("tmdb_id"), "tv")
-                else:
-                    tv["updated_on"] = datetime.utcnow()
-                    await db["tv"].replace_one({"_id": tv["_id"]}, tv)
-                return True
+                return await self._remove_part_from_doc(i, "tv", tv, channel, msg_id)
 
         return False
 
@@ -1239,7 +2169,15 @@ class Database:
         channel: int, msg_id: int, size: str, name: str, raw_size: int = 0,
         status: Optional[dict] = None
     ) -> Optional[ObjectId]:
+        media = await self._media_schema(metadata_info, channel, msg_id, size, name, raw_size)
+        if metadata_info['media_type'] == "movie":
+            return await self.update_movie(media, status)
+        return await self.update_tv_show(media, status)
 
+    #----- Schema for one incoming channel file: a title doc holding just this quality
+    async def _media_schema(
+        self, metadata_info: dict, channel: int, msg_id: int, size: str, name: str, raw_size: int = 0
+    ):
         group_key = metadata_info.get("group_key")
         part_number = metadata_info.get("part_number")
 
@@ -1269,7 +2207,7 @@ class Database:
             )
 
         if metadata_info['media_type'] == "movie":
-            media = MovieSchema(
+            return MovieSchema(
                 tmdb_id=metadata_info['tmdb_id'],
                 imdb_id=metadata_info['imdb_id'],
                 db_index=self.current_db_index,
@@ -1289,39 +2227,36 @@ class Database:
                 origin_country=metadata_info.get('origin_country', []) or [],
                 telegram=[quality_detail]
             )
-            return await self.update_movie(media, status)
-        else:
-            tv_show = TVShowSchema(
-                tmdb_id=metadata_info['tmdb_id'],
-                imdb_id=metadata_info['imdb_id'],
-                db_index=self.current_db_index,
-                title=metadata_info['title'],
-                genres=metadata_info['genres'],
-                description=metadata_info['description'],
-                rating=metadata_info['rate'],
-                release_year=metadata_info['year'],
-                poster=metadata_info['poster'],
-                backdrop=metadata_info['backdrop'],
-                logo=metadata_info['logo'],
-                cast=metadata_info['cast'],
-                runtime=metadata_info['runtime'],
-                media_type=metadata_info['media_type'],
-                is_anime=metadata_info.get('is_anime', False),
-                original_language=metadata_info.get('original_language'),
-                origin_country=metadata_info.get('origin_country', []) or [],
-                seasons=[Season(
-                    season_number=metadata_info['season_number'],
-                    episodes=[Episode(
-                        episode_number=metadata_info['episode_number'],
-                        title=metadata_info['episode_title'],
-                        episode_backdrop=metadata_info['episode_backdrop'],
-                        overview=metadata_info['episode_overview'],
-                        released=metadata_info['episode_released'],
-                        telegram=[quality_detail]
-                    )]
+        return TVShowSchema(
+            tmdb_id=metadata_info['tmdb_id'],
+            imdb_id=metadata_info['imdb_id'],
+            db_index=self.current_db_index,
+            title=metadata_info['title'],
+            genres=metadata_info['genres'],
+            description=metadata_info['description'],
+            rating=metadata_info['rate'],
+            release_year=metadata_info['year'],
+            poster=metadata_info['poster'],
+            backdrop=metadata_info['backdrop'],
+            logo=metadata_info['logo'],
+            cast=metadata_info['cast'],
+            runtime=metadata_info['runtime'],
+            media_type=metadata_info['media_type'],
+            is_anime=metadata_info.get('is_anime', False),
+            original_language=metadata_info.get('original_language'),
+            origin_country=metadata_info.get('origin_country', []) or [],
+            seasons=[Season(
+                season_number=metadata_info['season_number'],
+                episodes=[Episode(
+                    episode_number=metadata_info['episode_number'],
+                    title=metadata_info['episode_title'],
+                    episode_backdrop=metadata_info['episode_backdrop'],
+                    overview=metadata_info['episode_overview'],
+                    released=metadata_info['episode_released'],
+                    telegram=[quality_detail]
                 )]
-            )
-            return await self.update_tv_show(tv_show, status)
+            )]
+        )
 
     async def _delete_split_part(self, part: dict) -> None:
         try:
@@ -1331,7 +2266,7 @@ class Database:
         except Exception as e:
             LOGGER.error(f"Failed to delete split part message: {e}")
 
-    async def _merge_split_part(self, qualities: List[dict], quality_to_update: dict) -> List[dict]:
+    async def _merge_split_part(self, qualities: List[dict], quality_to_update: dict, doomed: List[dict]) -> List[dict]:
         group_key = quality_to_update.get("group_key")
         incoming_parts = quality_to_update.get("parts") or []
         if not incoming_parts:
@@ -1354,7 +2289,7 @@ class Database:
                             and old_part.get("msg_id") == new_part.get("msg_id")
                         ):
                             continue
-                        await self._delete_split_part(old_part)
+                        doomed.append({"parts": [old_part]})
 
                 existing_parts = [
                     p for p in existing_parts if p.get("part_number") != new_part.get("part_number")
@@ -1387,8 +2322,10 @@ class Database:
         except (TypeError, ValueError):
             return False
 
+    #----- Merge one incoming quality into a list. Telegram messages that the merge makes
+    #----- obsolete are appended to `doomed` and only deleted once the write has committed.
     async def _apply_quality_update(
-        self, existing_qualities: List[dict], quality_to_update: dict,
+        self, existing_qualities: List[dict], quality_to_update: dict, doomed: List[dict],
         is_personal: bool = False, status: Optional[dict] = None
     ) -> List[dict]:
         target_quality = quality_to_update.get("quality")
@@ -1403,8 +2340,7 @@ class Database:
                     if q.get("quality") == target_quality
                     and q.get("group_key") != incoming_group_key
                 ]
-                for q in stale:
-                    await self._queue_quality_deletion(q)
+                doomed.extend(stale)
                 existing_qualities = [
                     q for q in existing_qualities
                     if not (
@@ -1412,13 +2348,12 @@ class Database:
                         and q.get("group_key") != incoming_group_key
                     )
                 ]
-            return await self._merge_split_part(existing_qualities, quality_to_update)
+            return await self._merge_split_part(existing_qualities, quality_to_update, doomed)
 
         #----- Incoming is a normal (non-split) file.
         if replace_mode:
             stale = [q for q in existing_qualities if q.get("quality") == target_quality]
-            for q in stale:
-                await self._queue_quality_deletion(q)
+            doomed.extend(stale)
             existing_qualities = [
                 q for q in existing_qualities if q.get("quality") != target_quality
             ]
@@ -1454,57 +2389,85 @@ class Database:
         current_db_key = f"storage_{self.current_db_index}"
         total_storage_dbs = len(self.dbs) - 1
 
-        existing_movie, existing_db_key, existing_db_index = await self._find_existing_media(
-            "movie", imdb_id, tmdb_id, title, release_year, total_storage_dbs
-        )
+        storage_full = False
+        async with self._title_lock("movie", tmdb_id or (title, release_year)):
+            for _ in range(self.MEDIA_WRITE_RETRIES):
+                existing_movie, existing_db_key, existing_db_index = await self._find_existing_media(
+                    "movie", imdb_id, tmdb_id, title, release_year, total_storage_dbs
+                )
 
-        #----- INSERT NEW MOVIE ----------------
-        if not existing_movie:
-            try:
-                movie_dict["db_index"] = self.current_db_index
-                result = await self.dbs[current_db_key]["movie"].insert_one(movie_dict)
-                return result.inserted_id
-            except Exception as e:
-                LOGGER.error(f"Insertion failed in {current_db_key}: {e}")
-                if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
-                    return await self._handle_storage_error(self.update_movie, movie_data, total_storage_dbs=total_storage_dbs)
-                return None
+                #----- INSERT NEW MOVIE ----------------
+                if not existing_movie:
+                    try:
+                        movie_dict["db_index"] = self.current_db_index
+                        movie_dict["rev"] = 1
+                        result = await self.dbs[current_db_key]["movie"].insert_one(movie_dict)
+                        await self.index_media_doc("movie", movie_dict, self.current_db_index)
+                        return result.inserted_id
+                    except Exception as e:
+                        LOGGER.error(f"Insertion failed in {current_db_key}: {e}")
+                        if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
+                            storage_full = True
+                            break
+                        return None
 
-        #----- UPDATE MOVIE ----------------
-        movie_id = existing_movie["_id"]
+                #----- UPDATE MOVIE ----------------
+                movie_id = existing_movie["_id"]
+                set_fields = {}
 
-        if imdb_id and not existing_movie.get("imdb_id"):
-            existing_movie["imdb_id"] = imdb_id
-        if tmdb_id and not existing_movie.get("tmdb_id"):
-            existing_movie["tmdb_id"] = tmdb_id
-        if movie_dict.get("is_anime"):
-            existing_movie["is_anime"] = True
+                if imdb_id and not existing_movie.get("imdb_id"):
+                    existing_movie["imdb_id"] = set_fields["imdb_id"] = imdb_id
+                if tmdb_id and not existing_movie.get("tmdb_id"):
+                    existing_movie["tmdb_id"] = set_fields["tmdb_id"] = tmdb_id
+                if movie_dict.get("is_anime"):
+                    existing_movie["is_anime"] = set_fields["is_anime"] = True
 
-        existing_qualities = existing_movie.get("telegram", [])
+                existing_qualities = existing_movie.get("telegram", [])
+                before = copy.deepcopy(existing_qualities)
+                doomed: List[dict] = []
 
-        existing_qualities = await self._apply_quality_update(
-            existing_qualities, quality_to_update, self._is_personal_tmdb(tmdb_id), status
-        )
+                existing_qualities = await self._apply_quality_update(
+                    existing_qualities, quality_to_update, doomed, self._is_personal_tmdb(tmdb_id), status
+                )
 
-        existing_movie["telegram"] = existing_qualities
-        existing_movie["updated_on"] = datetime.utcnow()
+                existing_movie["telegram"] = existing_qualities
+                existing_movie["updated_on"] = set_fields["updated_on"] = datetime.utcnow()
 
-        if existing_db_index != self.current_db_index:
-            try:
-                if await self._move_document("movie", existing_movie, existing_db_index):
-                    return movie_id
-            except Exception as e:
-                LOGGER.error(f"Error moving movie to {current_db_key}: {e}")
-                if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
-                    return await self._handle_storage_error(self.update_movie, movie_data, total_storage_dbs=total_storage_dbs)
+                if existing_db_index != self.current_db_index:
+                    try:
+                        if await self._move_document("movie", existing_movie, existing_db_index):
+                            for quality in doomed:
+                                await self._queue_quality_deletion(quality)
+                            return movie_id
+                    except Exception as e:
+                        LOGGER.error(f"Error moving movie to {current_db_key}: {e}")
+                        if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
+                            storage_full = True
+                            break
 
-        try:
-            await self.dbs[existing_db_key]["movie"].replace_one({"_id": movie_id}, existing_movie)
-            return movie_id
-        except Exception as e:
-            LOGGER.error(f"Failed to update movie {tmdb_id} in {existing_db_key}: {e}")
-            if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
-                return await self._handle_storage_error(self.update_movie, movie_data, total_storage_dbs=total_storage_dbs)
+                update = self._merge_updates([
+                    self._array_update("telegram", before, existing_qualities),
+                    {"$set": set_fields},
+                ])
+                try:
+                    if not await self._guarded_update(self.dbs[existing_db_key]["movie"], existing_movie, update):
+                        continue
+                except Exception as e:
+                    LOGGER.error(f"Failed to update movie {tmdb_id} in {existing_db_key}: {e}")
+                    if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
+                        storage_full = True
+                        break
+                    return None
+                for quality in doomed:
+                    await self._queue_quality_deletion(quality)
+                await self.index_media_doc("movie", existing_movie, existing_db_index)
+                return movie_id
+
+        #----- Retried outside the title lock (the retry re-enters update_movie)
+        if storage_full:
+            return await self._handle_storage_error(self.update_movie, movie_data, total_storage_dbs=total_storage_dbs)
+        LOGGER.error(f"Gave up updating movie {tmdb_id} after {self.MEDIA_WRITE_RETRIES} conflicting writes")
+        return None
 
     async def update_tv_show(self, tv_show_data: TVShowSchema, status: Optional[dict] = None) -> Optional[ObjectId]:
         try:
@@ -1521,89 +2484,330 @@ class Database:
         current_db_key = f"storage_{self.current_db_index}"
         total_storage_dbs = len(self.dbs) - 1
 
-        existing_tv, existing_db_key, existing_db_index = await self._find_existing_media(
-            "tv", imdb_id, tmdb_id, title, release_year, total_storage_dbs
-        )
+        storage_full = False
+        async with self._title_lock("tv", tmdb_id or (title, release_year)):
+            for _ in range(self.MEDIA_WRITE_RETRIES):
+                existing_tv, existing_db_key, existing_db_index = await self._find_existing_media(
+                    "tv", imdb_id, tmdb_id, title, release_year, total_storage_dbs
+                )
 
-        #----- INSERT NEW TV ----------------
-        if not existing_tv:
-            try:
-                tv_show_dict["db_index"] = self.current_db_index
-                result = await self.dbs[current_db_key]["tv"].insert_one(tv_show_dict)
-                return result.inserted_id
-            except Exception as e:
-                LOGGER.error(f"Insertion failed in {current_db_key}: {e}")
-                if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
-                    return await self._handle_storage_error(self.update_tv_show, tv_show_data, total_storage_dbs=total_storage_dbs)
-                return None
+                #----- INSERT NEW TV ----------------
+                if not existing_tv:
+                    try:
+                        tv_show_dict["db_index"] = self.current_db_index
+                        tv_show_dict["rev"] = 1
+                        result = await self.dbs[current_db_key]["tv"].insert_one(tv_show_dict)
+                        await self.index_media_doc("tv", tv_show_dict, self.current_db_index)
+                        return result.inserted_id
+                    except Exception as e:
+                        LOGGER.error(f"Insertion failed in {current_db_key}: {e}")
+                        if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
+                            storage_full = True
+                            break
+                        return None
+
+                #----- UPDATE TV ----------------
+                tv_id = existing_tv["_id"]
+                set_fields = {}
+
+                if imdb_id and not existing_tv.get("imdb_id"):
+                    existing_tv["imdb_id"] = set_fields["imdb_id"] = imdb_id
+                if tmdb_id and not existing_tv.get("tmdb_id"):
+                    existing_tv["tmdb_id"] = set_fields["tmdb_id"] = tmdb_id
+                if tv_show_dict.get("is_anime"):
+                    existing_tv["is_anime"] = set_fields["is_anime"] = True
+
+                #----- Each touched season/episode becomes one targeted op (arrayFilters pick the element)
+                doomed: List[dict] = []
+                ops: List[dict] = []
+                array_filters: List[dict] = []
+                for s_idx, season in enumerate(tv_show_dict["seasons"]):
+                    existing_season = next(
+                        (s for s in existing_tv["seasons"]
+                        if s["season_number"] == season["season_number"]),
+                        None
+                    )
 
-        #----- UPDATE TV ----------------
-        tv_id = existing_tv["_id"]
-
-        if imdb_id and not existing_tv.get("imdb_id"):
-            existing_tv["imdb_id"] = imdb_id
-        if tmdb_id and not existing_tv.get("tmdb_id"):
-            existing_tv["tmdb_id"] = tmdb_id
-        if tv_show_dict.get("is_anime"):
-            existing_tv["is_anime"] = True
-
-        for season in tv_show_dict["seasons"]:
-            existing_season = next(
-                (s for s in existing_tv["seasons"]
-                if s["season_number"] == season["season_number"]),
-                None
-            )
+                    if not existing_season:
+                        existing_tv["seasons"].append(season)
+                        ops.append({"$push": {"seasons": {"$each": [season]}}})
+                        continue
+
+                    s_ref = f"s{s_idx}"
+                    s_used = False
+                    for e_idx, episode in enumerate(season["episodes"]):
+                        existing_episode = next(
+                            (e for e in existing_season["episodes"]
+                            if e["episode_number"] == episode["episode_number"]),
+                            None
+                        )
+
+                        if not existing_episode:
+                            existing_season["episodes"].append(episode)
+                            ops.append({"$push": {f"seasons.$[{s_ref}].episodes": {"$each": [episode]}}})
+                            s_used = True
+                            continue
+
+                        existing_episode.setdefault("telegram", [])
+                        before = copy.deepcopy(existing_episode["telegram"])
+
+                        for quality in episode["telegram"]:
+                            existing_episode["telegram"] = await self._apply_quality_update(
+                                existing_episode["telegram"], quality, doomed, self._is_personal_tmdb(tmdb_id), status
+                            )
+
+                        e_ref = f"e{s_idx}n{e_idx}"
+                        op = self._array_update(
+                            f"seasons.$[{s_ref}].episodes.$[{e_ref}].telegram", before, existing_episode["telegram"]
+                        )
+                        if op:
+                            ops.append(op)
+                            array_filters.append({f"{e_ref}.episode_number": episode["episode_number"]})
+                            s_used = True
+
+                    if s_used:
+                        array_filters.append({f"{s_ref}.season_number": season["season_number"]})
+
+                existing_tv["updated_on"] = set_fields["updated_on"] = datetime.utcnow()
+
+                #----- MOVE DB IF NEEDED ----------------
+                if existing_db_index != self.current_db_index:
+                    try:
+                        if await self._move_document("tv", existing_tv, existing_db_index):
+                            for quality in doomed:
+                                await self._queue_quality_deletion(quality)
+                            return tv_id
+                    except Exception as e:
+                        LOGGER.error(f"Error moving TV show to {current_db_key}: {e}")
+                        if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
+                            storage_full = True
+                            break
+                    return tv_id
+
+                update = self._merge_updates(ops)
+                if self._paths_conflict(update):
+                    #----- e.g. a new episode plus a new quality in the same season: set the seasons array
+                    update, array_filters = {"$set": {"seasons": existing_tv["seasons"]}}, []
+                update = self._merge_updates([update, {"$set": set_fields}])
+                try:
+                    if not await self._guarded_update(self.dbs[existing_db_key]["tv"], existing_tv, update, array_filters):
+                        continue
+                except Exception as e:
+                    LOGGER.error(f"Failed to update TV show {tmdb_id} in {existing_db_key}: {e}")
+                    if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
+                        storage_full = True
+                        break
+                    return None
+                for quality in doomed:
+                    await self._queue_quality_deletion(quality)
+                await self.index_media_doc("tv", existing_tv, existing_db_index)
+                return tv_id
 
+        if storage_full:
+            return await self._handle_storage_error(self.update_tv_show, tv_show_data, total_storage_dbs=total_storage_dbs)
+        LOGGER.error(f"Gave up updating TV show {tmdb_id} after {self.MEDIA_WRITE_RETRIES} conflicting writes")
+        return None
+    
+    #-----
+    #----- Bulk upsert for channel scans: files are grouped by title, each title's new qualities
+    #----- and episodes are merged in memory, and every storage collection gets one bulk_write.
+    #-----
+
+    #----- Merge incoming seasons/episodes into a TV doc's seasons list in memory
+    async def _merge_tv_seasons(
+        self, seasons: List[dict], incoming: List[dict], doomed: List[dict], is_personal: bool, status: dict
+    ) -> None:
+        for season in incoming:
+            existing_season = next((s for s in seasons if s["season_number"] == season["season_number"]), None)
             if not existing_season:
-                existing_tv["seasons"].append(season)
+                seasons.append(season)
                 continue
-
             for episode in season["episodes"]:
                 existing_episode = next(
-                    (e for e in existing_season["episodes"]
-                    if e["episode_number"] == episode["episode_number"]),
+                    (e for e in existing_season["episodes"] if e["episode_number"] == episode["episode_number"]),
                     None
                 )
-
                 if not existing_episode:
                     existing_season["episodes"].append(episode)
                     continue
-
-                existing_episode.setdefault("telegram", [])
-
+                existing_episode["telegram"] = existing_episode.get("telegram") or []
                 for quality in episode["telegram"]:
                     existing_episode["telegram"] = await self._apply_quality_update(
-                        existing_episode["telegram"], quality, self._is_personal_tmdb(tmdb_id), status
+                        existing_episode["telegram"], quality, doomed, is_personal, status
                     )
 
-        existing_tv["updated_on"] = datetime.utcnow()
-
-        #----- MOVE DB IF NEEDED ----------------
-        if existing_db_index != self.current_db_index:
-            try:
-                if await self._move_document("tv", existing_tv, existing_db_index):
-                    return tv_id
-            except Exception as e:
-                LOGGER.error(f"Error moving TV show to {current_db_key}: {e}")
-                if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
-                    return await self._handle_storage_error(self.update_tv_show, tv_show_data, total_storage_dbs=total_storage_dbs)
-            return tv_id
+    @staticmethod
+    def _quality_ids(collection_name: str, doc: dict) -> set:
+        if collection_name == "movie":
+            return {q.get("id") for q in doc.get("telegram") or []}
+        return {
+            q.get("id")
+            for season in doc.get("seasons") or []
+            for episode in season.get("episodes") or []
+            for q in episode.get("telegram") or []
+        }
 
+    #----- Existing docs for every title of a batch: one $in query per storage collection, with
+    #----- the per-title title+year lookup only for titles that matched neither id
+    async def _prefetch_media(self, groups: Dict[tuple, list], total_storage_dbs: int) -> Dict[tuple, Tuple[dict, int]]:
+        found: Dict[tuple, Tuple[dict, int]] = {}
+        for collection_name in ("movie", "tv"):
+            members = [(key, group[0][1]) for (c, key), group in groups.items() if c == collection_name]
+            if not members:
+                continue
+            tmdb_ids = [media["tmdb_id"] for _, media in members if media.get("tmdb_id")]
+            imdb_ids = [media["imdb_id"] for _, media in members if media.get("imdb_id")]
+            by_imdb: Dict[Any, Tuple[dict, int]] = {}
+            by_tmdb: Dict[Any, Tuple[dict, int]] = {}
+            for db_index in range(1, total_storage_dbs + 1):
+                query = {"$or": [{"tmdb_id": {"$in": tmdb_ids}}, {"imdb_id": {"$in": imdb_ids}}]}
+                async for doc in self.dbs[f"storage_{db_index}"][collection_name].find(query):
+                    if doc.get("imdb_id"):
+                        by_imdb.setdefault(doc["imdb_id"], (doc, db_index))
+                    if doc.get("tmdb_id"):
+                        by_tmdb.setdefault(doc["tmdb_id"], (doc, db_index))
+
+            for key, media in members:
+                hit = by_imdb.get(media["imdb_id"]) if media.get("imdb_id") else None
+                if hit is None and media.get("tmdb_id"):
+                    hit = by_tmdb.get(media["tmdb_id"])
+                if hit is None and media.get("title") and media.get("release_year"):
+                    doc, _, db_index = await self._find_existing_media(
+                        collection_name, None, None, media["title"], media["release_year"], total_storage_dbs
+                    )
+                    hit = (doc, db_index) if doc else None
+                if hit is not None:
+                    found[(collection_name, key)] = hit
+        return found
+
+    #----- Stream-index check for a whole batch of one channel's messages in a single $in query.
+    #----- Returns the msg_ids already indexed, or None while the index is still being built.
+    async def indexed_msg_ids(self, channel: int, msg_ids: List[int]) -> Optional[set]:
+        if not self._stream_index_ready:
+            return None
         try:
-            await self.dbs[existing_db_key]["tv"].replace_one({"_id": tv_id}, existing_tv)
-            return tv_id
+            cursor = self.dbs["tracking"]["stream_index"].find(
+                {"_id": {"$in": [f"part:{int(channel)}:{int(m)}" for m in msg_ids]}}, {"msg_id": 1}
+            )
+            return {int(entry["msg_id"]) async for entry in cursor}
         except Exception as e:
-            LOGGER.error(f"Failed to update TV show {tmdb_id} in {existing_db_key}: {e}")
-            if any(keyword in str(e).lower() for keyword in ["storage", "quota"]):
-                return await self._handle_storage_error(self.update_tv_show, tv_show_data, total_storage_dbs=total_storage_dbs)
-    
-    async def sort_movies(self, sort_params, page, page_size, genre_filter=None, extra_filter=None):
+            LOGGER.error(f"stream_index: batch lookup failed for channel {channel}: {e}")
+            return None
+
+    #----- `items` are insert_media keyword sets (metadata_info, channel, msg_id, size, name,
+    #----- raw_size). Returns (updated_id, status) per item, in order. Titles that can't take the
+    #----- bulk path (doc in another storage DB, write conflict, storage error) are replayed
+    #----- through insert_media once the batch's title locks are released.
+    async def insert_media_batch(self, items: List[dict]) -> List[Tuple[Optional[ObjectId], dict]]:
+        results: List[Tuple[Optional[ObjectId], dict]] = [(None, {}) for _ in items]
+        groups: Dict[tuple, List[Tuple[int, dict]]] = {}
+        for i, item in enumerate(items):
+            try:
+                media = (await self._media_schema(**item)).dict()
+            except (ValidationError, KeyError) as e:
+                LOGGER.error(f"Validation error: {e}")
+                continue
+            key = media.get("tmdb_id") or (media["title"], media["release_year"])
+            groups.setdefault((self._collection_for(media["media_type"]), key), []).append((i, media))
+
+        total_storage_dbs = len(self.dbs) - 1
+        replay: List[int] = []
+        async with AsyncExitStack() as stack:
+            for collection_name, key in sorted(groups, key=repr):
+                await stack.enter_async_context(self._title_lock(collection_name, key))
+            existing = await self._prefetch_media(groups, total_storage_dbs)
+
+            planned = []
+            buckets: Dict[Tuple[int, str], list] = {}
+            claimed = set()
+            for (collection_name, key), members in groups.items():
+                array_field = "telegram" if collection_name == "movie" else "seasons"
+                hit = existing.get((collection_name, key))
+                if hit is None:
+                    doc = members[0][1]
+                    doc.update({"_id": ObjectId(), "db_index": self.current_db_index, "rev": 1})
+                    db_index, incoming, before = self.current_db_index, members[1:], None
+                else:
+                    doc, db_index = hit
+                    if db_index != self.current_db_index or doc["_id"] in claimed:
+                        replay.extend(i for i, _ in members)
+                        continue
+                    incoming, before = members, copy.deepcopy(doc.get(array_field) or [])
+                claimed.add(doc["_id"])
+
+                is_personal = self._is_personal_tmdb(doc.get("tmdb_id"))
+                doomed: List[dict] = []
+                set_fields = {}
+                for i, media in incoming:
+                    status = results[i][1]
+                    if collection_name == "movie":
+                        for quality in media["telegram"]:
+                            doc["telegram"] = await self._apply_quality_update(
+                                doc.get("telegram") or [], quality, doomed, is_personal, status
+                            )
+                    else:
+                        await self._merge_tv_seasons(
+                            doc.setdefault("seasons", []), media["seasons"], doomed, is_personal, status
+                        )
+                    for field in ("imdb_id", "tmdb_id"):
+                        if media.get(field) and not doc.get(field):
+                            doc[field] = set_fields[field] = media[field]
+                    if media.get("is_anime") and not doc.get("is_anime"):
+                        doc["is_anime"] = set_fields["is_anime"] = True
+
+                if before is None:
+                    op = InsertOne(doc)
+                    new_ids = self._quality_ids(collection_name, doc)
+                else:
+                    doc["updated_on"] = set_fields["updated_on"] = datetime.utcnow()
+                    update = self._merge_updates([
+                        self._array_update(array_field, before, doc.get(array_field) or []),
+                        {"$set": set_fields, "$inc": {"rev": 1}},
+                    ])
+                    op = UpdateOne({"_id": doc["_id"], "rev": doc.get("rev")}, update)
+                    new_ids = self._quality_ids(collection_name, doc) - self._quality_ids(collection_name, {array_field: before})
+                    doc["rev"] = (doc.get("rev") or 0) + 1
+                buckets.setdefault((db_index, collection_name), []).append(op)
+                planned.append((collection_name, db_index, doc, members, doomed, new_ids))
+
+            clean_buckets = set()
+            for (db_index, collection_name), ops in buckets.items():
+                try:
+                    result = await self.dbs[f"storage_{db_index}"][collection_name].bulk_write(ops, ordered=False)
+                    if result.inserted_count + result.matched_count == len(ops):
+                        clean_buckets.add((db_index, collection_name))
+                except Exception as e:
+                    LOGGER.error(f"Bulk upsert of {len(ops)} {collection_name} docs in storage_{db_index} failed: {e}")
+
+            for collection_name, db_index, doc, members, doomed, new_ids in planned:
+                if (db_index, collection_name) not in clean_buckets:
+                    #----- Partial bulk failure: a title counts as written only if its new streams landed
+                    stored = await self.dbs[f"storage_{db_index}"][collection_name].find_one({"_id": doc["_id"]})
+                    if stored is None or not new_ids <= self._quality_ids(collection_name, stored):
+                        self.write_conflicts += 1
+                        for i, _ in members:
+                            results[i] = (None, {})
+                            replay.append(i)
+                        continue
+                    doc = stored
+                for quality in doomed:
+                    await self._queue_quality_deletion(quality)
+                await self.index_media_doc(collection_name, doc, db_index)
+                for i, _ in members:
+                    results[i] = (doc["_id"], results[i][1])
+
+        for i in sorted(replay):
+            status: dict = {}
+            results[i] = (await self.insert_media(**items[i], status=status), status)
+        return results
+
+    async def sort_movies(self, sort_params, page, page_size, genre_filter=None, extra_filter=None, cursor=None):
         sort_dict = self._get_sort_dict(sort_params)
         filter_dict = {"genres": {"$in": [genre_filter]}} if genre_filter else {}
         if extra_filter:
             filter_dict.update(extra_filter)
-        results, dbs_checked, total_count = await self._paginate_collection(
-            "movie", sort_dict, page, page_size, filter_dict=filter_dict
+        results, dbs_checked, total_count, next_cursor = await self._paginate_collection(
+            "movie", sort_dict, page, page_size, filter_dict=filter_dict, cursor=cursor
         )
         total_pages = (total_count + page_size - 1) // page_size
         return {
@@ -1611,16 +2815,17 @@ class Database:
             "total_pages": total_pages,
             "databases_checked": dbs_checked,
             "current_page": page,
+            "next_cursor": next_cursor,
             "movies": [convert_objectid_to_str(result) for result in results],
         }
 
-    async def sort_tv_shows(self, sort_params, page, page_size, genre_filter=None, extra_filter=None):
+    async def sort_tv_shows(self, sort_params, page, page_size, genre_filter=None, extra_filter=None, cursor=None):
         sort_dict = self._get_sort_dict(sort_params)
         filter_dict = {"genres": {"$in": [genre_filter]}} if genre_filter else {}
         if extra_filter:
             filter_dict.update(extra_filter)
-        results, dbs_checked, total_count = await self._paginate_collection(
-            "tv", sort_dict, page, page_size, filter_dict=filter_dict
+        results, dbs_checked, total_count, next_cursor = await self._paginate_collection(
+            "tv", sort_dict, page, page_size, filter_dict=filter_dict, cursor=cursor
         )
         total_pages = (total_count + page_size - 1) // page_size
         return {
@@ -1628,15 +2833,179 @@ class Database:
             "total_pages": total_pages,
             "databases_checked": dbs_checked,
             "current_page": page,
+            "next_cursor": next_cursor,
             "tv_shows": [convert_objectid_to_str(result) for result in results],
         }
 
+    _SEARCH_PROJECTION = {
+        "_id": 1, "tmdb_id": 1, "title": 1, "genres": 1, "rating": 1, "imdb_id": 1,
+        "release_year": 1, "poster": 1, "backdrop": 1, "description": 1, "logo": 1,
+        "media_type": 1, "db_index": 1,
+    }
+    #----- Ranked hits checked against extra_filter per round trip (at least)
+    SEARCH_FILTER_CHUNK = 100
+
+    @staticmethod
+    def _encode_search_cursor(query: str, media_type: Optional[str], year: Optional[int], rank: tuple) -> str:
+        payload = {"q": normalize(query), "t": media_type, "y": year, "r": list(rank)}
+        return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_search_cursor(cursor: str, query: str, media_type: Optional[str], year: Optional[int]) -> Optional[tuple]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if (payload.get("q"), payload.get("t"), payload.get("y")) != (normalize(query), media_type, year):
+                return None
+            score, collection_name, tmdb_id = payload["r"]
+            return float(score), str(collection_name), tmdb_id
+        except Exception:
+            return None
+
+    #----- Ranked search over the in-process title index, merged across every storage DB. Pages
+    #----- come from a bounded top-K selection after the previous page's rank (`cursor`), or after
+    #----- skipping (page - 1) * page_size hits; the regex scan only serves while the index builds.
+    #----- total_count counts index matches; with extra_filter it is an upper bound.
     async def search_documents(
-            self, 
-            query: str, 
-            page: int, 
+            self,
+            query: str,
+            page: int,
             page_size: int,
-            extra_filter: Optional[dict] = None
+            extra_filter: Optional[dict] = None,
+            media_type: Optional[str] = None,
+            year: Optional[int] = None,
+            cursor: Optional[str] = None,
+            custom: bool = False,
+        ) -> dict:
+            if not self.search_index.ready:
+                #----- Custom (manually added) titles carry a negative synthetic tmdb_id
+                if custom:
+                    extra_filter = {"$and": [extra_filter, {"tmdb_id": {"$lt": 0}}]} if extra_filter else {"tmdb_id": {"$lt": 0}}
+                return await self._scan_search(query, page, page_size, extra_filter, media_type)
+
+            index = self.search_index
+            after = self._decode_search_cursor(cursor, query, media_type, year) if cursor else None
+            skip = 0 if after else (page - 1) * page_size
+            docs: List[dict] = []
+            last_rank = None
+            has_more = False
+
+            if not extra_filter:
+                hits, total_count = index.search(query, media_type=media_type, year=year,
+                                                 limit=skip + page_size + 1, after=after, custom=custom)
+                has_more = len(hits) > skip + page_size
+                hits = hits[skip:skip + page_size]
+                docs = await self._load_search_hits([key for _, key in hits])
+                if hits:
+                    last_rank = index.rank(*hits[-1])
+            else:
+                #----- Visibility/exclusivity live in the storage docs: walk the ranking in chunks,
+                #----- each one a bounded search() resuming after the last hit seen, keeping the hits
+                #----- the filter lets through until the page is full. total_count is then an upper
+                #----- bound (titles matching before the filter).
+                chunk = max(page_size * 4, self.SEARCH_FILTER_CHUNK)
+                position = after
+                total_count = 0
+                while len(docs) < page_size:
+                    hits, total_count = index.search(query, media_type=media_type, year=year,
+                                                     limit=chunk, after=position, custom=custom)
+                    if not hits:
+                        break
+                    position = index.rank(*hits[-1])
+                    passing = await self._load_search_hits([key for _, key in hits], extra_filter)
+                    by_key = {(doc["_collection"], doc["tmdb_id"]): doc for doc in passing}
+                    for score, key in hits:
+                        doc = by_key.get(key)
+                        if doc is None:
+                            continue
+                        if skip:
+                            skip -= 1
+                            continue
+                        docs.append(doc)
+                        last_rank = index.rank(score, key)
+                        if len(docs) == page_size:
+                            break
+                    if len(hits) < chunk:
+                        break
+                has_more = len(docs) == page_size
+
+            for doc in docs:
+                doc.pop("_collection", None)
+            next_cursor = None
+            if has_more and last_rank is not None:
+                next_cursor = self._encode_search_cursor(query, media_type, year, last_rank)
+            return {
+                "total_count": total_count,
+                "next_cursor": next_cursor,
+                "results": [convert_objectid_to_str(doc) for doc in docs],
+            }
+
+    #----- Fetch the storage docs behind index keys, one $in per (db, collection), in key order
+    async def _load_search_hits(
+        self, keys: List[tuple], extra_filter: Optional[dict] = None, projection: Optional[dict] = None
+    ) -> List[dict]:
+        groups: Dict[Tuple[int, str], List[int]] = {}
+        for key in keys:
+            entry = self.search_index.entry(key)
+            if entry is not None:
+                groups.setdefault((entry.db_index, key[0]), []).append(key[1])
+
+        async def _fetch(db_index: int, collection_name: str, ids: List[int]) -> List[dict]:
+            db = self.dbs.get(f"storage_{db_index}")
+            if db is None:
+                return []
+            match = {"tmdb_id": {"$in": ids}}
+            if extra_filter:
+                match = {"$and": [match, extra_filter]}
+            docs = await db[collection_name].find(match, projection or self._SEARCH_PROJECTION).to_list(None)
+            for doc in docs:
+                doc["_collection"] = collection_name
+            return docs
+
+        fetched = await gather(*(_fetch(db_index, name, ids) for (db_index, name), ids in groups.items()))
+        by_key = {(doc["_collection"], doc["tmdb_id"]): doc for docs in fetched for doc in docs}
+        return [by_key[key] for key in keys if key in by_key]
+
+    #----- Build (or rebuild) the title index from every storage DB; writes made meanwhile
+    #----- are applied through index_media_doc as usual
+    async def rebuild_search_index(self) -> dict:
+        index = self.search_index
+        if index.building:
+            return {"ok": False, "message": "Search index rebuild already running."}
+        index.building = True
+        index.ready = False
+        started = time.monotonic()
+        projection = {
+            "tmdb_id": 1, "title": 1, "release_year": 1, "rating": 1, "db_index": 1,
+            "telegram.name": 1, "seasons.episodes.telegram.name": 1,
+        }
+        try:
+            index.clear()
+            for db_key in [k for k in self.dbs if k.startswith("storage_")]:
+                db_index = int(db_key.split("_")[1])
+                for collection_name in ("movie", "tv"):
+                    async for doc in self.dbs[db_key][collection_name].find({}, projection):
+                        index.add(collection_name, doc, db_index)
+            index.ready = True
+            elapsed = round(time.monotonic() - started, 2)
+            LOGGER.info(f"search index built: {len(index)} titles in {elapsed}s")
+            return {"ok": True, "titles": len(index), "seconds": elapsed}
+        except Exception as e:
+            LOGGER.error(f"search index rebuild failed: {e}")
+            return {"ok": False, "message": str(e)}
+        finally:
+            index.building = False
+
+    def search_index_stats(self) -> dict:
+        return self.search_index.stats()
+
+    async def _scan_search(
+            self,
+            query: str,
+            page: int,
+            page_size: int,
+            extra_filter: Optional[dict] = None,
+            media_type: Optional[str] = None,
         ) -> dict:
 
             skip = (page - 1) * page_size
@@ -1646,6 +3015,8 @@ class Database:
                 '$regex': '.*' + '.*'.join(words) + '.*', 
                 '$options': 'i'
             }
+            if media_type:
+                extra_filter = {"$and": [extra_filter, {"media_type": media_type}]} if extra_filter else {"media_type": media_type}
 
             tv_match = {"$or": [
                 {"title": regex_query},
@@ -1830,12 +3201,18 @@ class Database:
         self, media_type: str, tmdb_id: int, db_index: int, update_data: Dict[str, Any]
     ):
         update_data.pop('_id', None)
+        update_data.pop('rev', None)
         db_key = f"storage_{db_index}"
         collection_name = self._collection_for(media_type)
         collection = self.dbs[db_key][collection_name]
 
         try:
-            result = await collection.update_one({"tmdb_id": int(tmdb_id)}, {"$set": update_data})
+            result = await collection.update_one({"tmdb_id": int(tmdb_id)}, {"$set": update_data, "$inc": {"rev": 1}})
+            if result.modified_count > 0:
+                new_tmdb_id = int(update_data.get("tmdb_id") or tmdb_id)
+                if new_tmdb_id != int(tmdb_id):
+                    await self.unindex_media_doc(collection_name, int(tmdb_id))
+                await self._reindex_stored_doc(collection_name, new_tmdb_id, int(db_index))
 
             return result.modified_count > 0
 
@@ -1866,6 +3243,8 @@ class Database:
                     LOGGER.info(f"Inserted document {insert_result.inserted_id} into {new_db_key}")
                     await self.dbs[db_key][collection_name].delete_one({"tmdb_id": int(tmdb_id)})
                     LOGGER.info(f"Deleted document tmdb_id {tmdb_id} from {db_key}")
+                    await self.unindex_media_doc(collection_name, int(tmdb_id))
+                    await self.index_media_doc(collection_name, old_doc, next_db_index)
                     self.current_db_index = next_db_index
                     await self.update_current_db_index()
                     LOGGER.info(f"Switched to {new_db_key} and document migrated successfully.")
@@ -1916,13 +3295,80 @@ class Database:
 
         result = await self.dbs[db_key][collection_name].delete_one({"tmdb_id": tmdb_id})
         if result.deleted_count > 0:
+            await self.unindex_media_doc(collection_name, tmdb_id)
             await self.purge_media_from_catalogs(tmdb_id, collection_name)
             LOGGER.info(f"{media_type} with tmdb_id {tmdb_id} deleted successfully.")
             return True
         LOGGER.info(f"No document found with tmdb_id {tmdb_id}.")
         return False
 
+    #----- Only the fields the stream-level writers plan from (not the title metadata)
+    _STREAM_DOC_PROJECTION = {
+        "movie": {"tmdb_id": 1, "rev": 1, "telegram": 1},
+        "tv": {"tmdb_id": 1, "rev": 1, "seasons": 1},
+    }
+
+    #----- Locate the storage doc holding a stream id: one point read on the stream index,
+    #----- or a scan of the storage DBs while the index is still being built
+    async def _find_doc_by_stream_id(self, stream_id_hash: str) -> Tuple[Optional[int], Optional[str], Optional[dict]]:
+        if self._stream_index_ready:
+            entry = await self.lookup_stream(stream_id_hash)
+            if not entry or f"storage_{entry.get('db_index')}" not in self.dbs:
+                return None, None, None
+            collection_name = entry["collection"]
+            doc = await self.dbs[f"storage_{entry['db_index']}"][collection_name].find_one(
+                {"tmdb_id": entry["tmdb_id"]}, self._STREAM_DOC_PROJECTION[collection_name]
+            )
+            return entry["db_index"], collection_name, doc
+
+        for i in range(1, self.current_db_index + 1):
+            db = self.dbs[f"storage_{i}"]
+            movie = await db["movie"].find_one({"telegram.id": stream_id_hash}, self._STREAM_DOC_PROJECTION["movie"])
+            if movie:
+                return i, "movie", movie
+            tv = await db["tv"].find_one({"seasons.episodes.telegram.id": stream_id_hash}, self._STREAM_DOC_PROJECTION["tv"])
+            if tv:
+                return i, "tv", tv
+        return None, None, None
+
+    #----- Targeted removal of one stream id: (removed qualities, update, array_filters, doc_emptied).
+    #----- An emptied episode/season is pulled with it, and an emptied title is deleted outright.
+    @staticmethod
+    def _plan_stream_removal(collection_name: str, doc: dict, stream_id_hash: str):
+        if collection_name == "movie":
+            removed = [q for q in doc.get("telegram", []) if q.get("id") == stream_id_hash]
+            remaining = len(doc.get("telegram", [])) - len(removed)
+            return removed, {"$pull": {"telegram": {"id": stream_id_hash}}}, None, remaining == 0
+
+        seasons = doc.get("seasons", [])
+        for season in seasons:
+            for episode in season.get("episodes", []):
+                removed = [q for q in episode.get("telegram", []) if q.get("id") == stream_id_hash]
+                if not removed:
+                    continue
+                s_num = season.get("season_number")
+                e_num = episode.get("episode_number")
+                if len(episode.get("telegram", [])) > len(removed):
+                    update = {"$pull": {"seasons.$[s].episodes.$[e].telegram": {"id": stream_id_hash}}}
+                    return removed, update, [{"s.season_number": s_num}, {"e.episode_number": e_num}], False
+                if len(season.get("episodes", [])) > 1:
+                    update = {"$pull": {"seasons.$[s].episodes": {"episode_number": e_num}}}
+                    return removed, update, [{"s.season_number": s_num}], False
+                if len(seasons) > 1:
+                    return removed, {"$pull": {"seasons": {"season_number": s_num}}}, None, False
+                return removed, None, None, True
+        return [], None, None, False
+
     async def get_title_by_stream_id(self, stream_id_hash: str) -> Optional[str]:
+        if self._stream_index_ready:
+            entry = await self.lookup_stream(stream_id_hash)
+            if not entry:
+                return None
+            if entry.get("collection") == "movie":
+                return entry.get("title")
+            title = entry.get("title") or "Unknown Series"
+            return f"{title} S{entry.get('season') or 0:02d}E{entry.get('episode') or 0:02d}"
+
         for i in range(1, self.current_db_index + 1):
             db = self.dbs[f"storage_{i}"]
             
@@ -1948,108 +3394,87 @@ class Database:
         return None
 
     async def delete_media_by_stream_id(self, stream_id_hash: str, delete_file: bool = False) -> bool:
-        for i in range(1, self.current_db_index + 1):
-            db = self.dbs[f"storage_{i}"]
-            
-            #----- Check Movies
-            movie = await db["movie"].find_one({"telegram.id": stream_id_hash})
-            if movie:
-                if delete_file:
-                    for q in movie.get("telegram", []):
-                        if q.get("id") == stream_id_hash:
-                            await self._queue_quality_deletion(q)
-                            break
-                movie["telegram"] = [q for q in movie.get("telegram", []) if q.get("id") != stream_id_hash]
-                if len(movie["telegram"]) == 0:
-                    await db["movie"].delete_one({"_id": movie["_id"]})
-                    await self.purge_media_from_catalogs(movie.get("tmdb_id"), "movie")
-                else:
-                    movie['updated_on'] = datetime.utcnow()
-                    await db["movie"].replace_one({"_id": movie["_id"]}, movie)
-                return True
+        for _ in range(self.MEDIA_WRITE_RETRIES):
+            db_index, collection_name, doc = await self._find_doc_by_stream_id(stream_id_hash)
+            if not doc:
+                return False
+            collection = self.dbs[f"storage_{db_index}"][collection_name]
+            removed, update, array_filters, emptied = self._plan_stream_removal(collection_name, doc, stream_id_hash)
+            if not removed:
+                return False
 
-            #----- Check TV Shows
-            tv = await db["tv"].find_one({"seasons.episodes.telegram.id": stream_id_hash})
-            if tv:
-                for season in tv.get("seasons", []):
-                    for episode in season.get("episodes", []):
-                        for q in episode.get("telegram", []):
-                            if q.get("id") == stream_id_hash:
-                                if delete_file:
-                                    await self._queue_quality_deletion(q)
-                                episode["telegram"] = [t for t in episode.get("telegram", []) if t.get("id") != stream_id_hash]
-                                if len(episode["telegram"]) == 0:
-                                    season["episodes"] = [e for e in season.get("episodes", []) if e.get("episode_number") != episode.get("episode_number")]
-                                    if len(season["episodes"]) == 0:
-                                        tv["seasons"] = [s for s in tv.get("seasons", []) if s.get("season_number") != season.get("season_number")]
-                                        if len(tv["seasons"]) == 0:
-                                            await db["tv"].delete_one({"_id": tv["_id"]})
-                                            await self.purge_media_from_catalogs(tv.get("tmdb_id"), "tv")
-                                            return True
-                                tv['updated_on'] = datetime.utcnow()
-                                await db["tv"].replace_one({"_id": tv["_id"]}, tv)
-                                return True
+            if emptied:
+                result = await collection.delete_one({"_id": doc["_id"], "rev": doc.get("rev")})
+                if not result.deleted_count:
+                    self.write_conflicts += 1
+                    continue
+                await self.unindex_media_doc(collection_name, doc.get("tmdb_id"))
+                await self.purge_media_from_catalogs(doc.get("tmdb_id"), collection_name)
+            else:
+                update.setdefault("$set", {})["updated_on"] = datetime.utcnow()
+                if not await self._guarded_update(collection, doc, update, array_filters):
+                    continue
+                await self._unindex_qualities(removed)
+                await self._recount_content(collection_name, doc.get("tmdb_id"), db_index)
+
+            if delete_file:
+                await self._queue_quality_deletion(removed[0])
+            return True
+
+        LOGGER.error(f"Gave up deleting stream {stream_id_hash} after {self.MEDIA_WRITE_RETRIES} conflicting writes")
         return False
 
     async def delete_movie_quality(self, tmdb_id: int, db_index: int, id: str) -> bool:
-        async def mutate(movie):
-            qualities = movie.get("telegram") or []
-            for q in qualities:
-                if q.get("id") == id:
-                    await self._queue_quality_deletion(q)
-                    break
-            original_len = len(qualities)
-            movie["telegram"] = [q for q in qualities if q.get("id") != id]
-            return len(movie["telegram"]) != original_len
-        return await self._edit_media_doc("movie", tmdb_id, db_index, mutate)
+        async def plan(movie):
+            removed = [q for q in movie.get("telegram") or [] if q.get("id") == id]
+            if not removed:
+                return None
+            return {"$pull": {"telegram": {"id": id}}}, None, removed[:1]
+        return await self._edit_media_doc("movie", tmdb_id, db_index, plan)
 
     async def delete_tv_quality(self, tmdb_id: int, db_index: int, season_number: int, episode_number: int, id: str) -> bool:
-        async def mutate(tv):
+        async def plan(tv):
             for season in tv.get("seasons", []):
                 if season.get("season_number") != season_number:
                     continue
                 for episode in season.get("episodes", []):
                     if episode.get("episode_number") == episode_number and "telegram" in episode:
-                        for q in episode["telegram"]:
-                            if q.get("id") == id:
-                                await self._queue_quality_deletion(q)
-                                break
-                        original_len = len(episode["telegram"])
-                        episode["telegram"] = [q for q in episode["telegram"] if q.get("id") != id]
-                        return original_len > len(episode["telegram"])
-            return False
-        return await self._edit_media_doc("tv", tmdb_id, db_index, mutate)
+                        removed = [q for q in episode["telegram"] if q.get("id") == id]
+                        if not removed:
+                            return None
+                        return (
+                            {"$pull": {"seasons.$[s].episodes.$[e].telegram": {"id": id}}},
+                            [{"s.season_number": season_number}, {"e.episode_number": episode_number}],
+                            removed[:1],
+                        )
+            return None
+        return await self._edit_media_doc("tv", tmdb_id, db_index, plan)
 
     async def delete_tv_episode(self, tmdb_id: int, db_index: int, season_number: int, episode_number: int) -> bool:
-        async def mutate(tv):
+        async def plan(tv):
             for season in tv.get("seasons", []):
                 if season.get("season_number") != season_number:
                     continue
-                episodes = season.get("episodes", [])
-                for ep in episodes:
-                    if ep.get("episode_number") == episode_number:
-                        for quality in ep.get("telegram", []):
-                            await self._queue_quality_deletion(quality)
-                        break
-                original_len = len(episodes)
-                season["episodes"] = [ep for ep in episodes if ep.get("episode_number") != episode_number]
-                return original_len > len(season["episodes"])
-            return False
-        return await self._edit_media_doc("tv", tmdb_id, db_index, mutate)
+                episodes = [ep for ep in season.get("episodes", []) if ep.get("episode_number") == episode_number]
+                if not episodes:
+                    return None
+                removed = [q for ep in episodes for q in ep.get("telegram", [])]
+                return (
+                    {"$pull": {"seasons.$[s].episodes": {"episode_number": episode_number}}},
+                    [{"s.season_number": season_number}],
+                    removed,
+                )
+            return None
+        return await self._edit_media_doc("tv", tmdb_id, db_index, plan)
 
     async def delete_tv_season(self, tmdb_id: int, db_index: int, season_number: int) -> bool:
-        async def mutate(tv):
-            seasons = tv.get("seasons", [])
-            for season in seasons:
-                if season.get("season_number") == season_number:
-                    for episode in season.get("episodes", []):
-                        for quality in episode.get("telegram", []):
-                            await self._queue_quality_deletion(quality)
-                    break
-            original_len = len(seasons)
-            tv["seasons"] = [s for s in seasons if s.get("season_number") != season_number]
-            return len(tv["seasons"]) != original_len
-        return await self._edit_media_doc("tv", tmdb_id, db_index, mutate)
+        async def plan(tv):
+            seasons = [s for s in tv.get("seasons", []) if s.get("season_number") == season_number]
+            if not seasons:
+                return None
+            removed = [q for s in seasons for ep in s.get("episodes", []) for q in ep.get("telegram", [])]
+            return {"$pull": {"seasons": {"season_number": season_number}}}, None, removed
+        return await self._edit_media_doc("tv", tmdb_id, db_index, plan)
 
 
     #----- Get per-DB statistics (movies, tv shows, used size, etc.)
@@ -2106,6 +3531,7 @@ class Database:
         }
 
         await self.dbs["tracking"]["api_tokens"].insert_one(token_doc)
+        self.auth_cache.invalidate_token(token)
         return convert_objectid_to_str(token_doc)
 
     #----- Return the user's token, creating one if none exists
@@ -2126,12 +3552,14 @@ class Database:
                 {"_id": doc["_id"]},
                 {"$set": {"subscription_exempt": False, "expires_at": None}},
             )
+            self.auth_cache.invalidate_token(doc.get("token"))
 
     #----- Toggle a token's lifetime (subscription-exempt) flag
     async def set_token_lifetime(self, token: str, exempt: bool) -> bool:
         result = await self.dbs["tracking"]["api_tokens"].update_one(
             {"token": token}, {"$set": {"subscription_exempt": bool(exempt)}}
         )
+        self.auth_cache.invalidate_token(token)
         return result.modified_count > 0
 
     #----- Set/extend/reduce a token's own expiry (used when subscription mode is off).
@@ -2158,6 +3586,7 @@ class Database:
             {"token": token},
             {"$set": {"expires_at": new_expiry, "subscription_exempt": new_expiry is None}},
         )
+        self.auth_cache.invalidate_token(token)
         return await self.get_api_token(token)
 
     #----- Mark every token that isn't linked to a user as lifetime
@@ -2166,6 +3595,7 @@ class Database:
             {"$or": [{"user_id": None}, {"user_id": {"$exists": False}}]},
             {"$set": {"subscription_exempt": True}},
         )
+        self.auth_cache.clear_tokens()
         return result.modified_count
 
     #----- Count tokens that would stop working if subscription mode is enabled
@@ -2189,8 +3619,35 @@ class Database:
 
     async def get_api_token(self, token: str) -> Optional[dict]:
         doc = await self.dbs["tracking"]["api_tokens"].find_one({"token": token})
+        if doc:
+            self._overlay_pending_usage(doc)
         return convert_objectid_to_str(doc) if doc else None
 
+    #----- Hot-path read for verify_token; token writes invalidate it, flushed usage is
+    #----- applied to it in place, and pending (unflushed) usage is overlaid on every read
+    async def get_api_token_cached(self, token: str) -> Optional[dict]:
+        hit, doc = self.auth_cache.get_token(token)
+        if not hit:
+            doc = await self.dbs["tracking"]["api_tokens"].find_one({"token": token})
+            doc = convert_objectid_to_str(doc) if doc else None
+            self.auth_cache.put_token(token, doc)
+        if doc:
+            self._overlay_pending_usage(doc)
+        return doc
+
+    #----- Count bytes still sitting in usage_buffer so limit checks don't lag the flush
+    def _overlay_pending_usage(self, doc: dict) -> None:
+        pending = self.usage_buffer.pending(doc.get("token"))
+        if pending <= 0:
+            return
+        usage = doc.setdefault("usage", {}) or {}
+        doc["usage"] = usage
+        usage["total_bytes"] = usage.get("total_bytes", 0) + pending
+        for period in ("daily", "monthly"):
+            bucket = usage.setdefault(period, {}) or {}
+            usage[period] = bucket
+            bucket["bytes"] = bucket.get("bytes", 0) + pending
+
     #----- The (single) token linked to a given user_id, if any
     async def get_api_token_by_user(self, user_id: int) -> Optional[dict]:
         doc = await self.dbs["tracking"]["api_tokens"].find_one({"user_id": user_id})
@@ -2203,12 +3660,14 @@ class Database:
 
     async def revoke_api_token(self, token: str) -> bool:
         result = await self.dbs["tracking"]["api_tokens"].delete_one({"token": token})
+        self.auth_cache.invalidate_token(token)
         return result.deleted_count > 0
 
     async def set_token_config(self, token: str, config: dict) -> bool:
         result = await self.dbs["tracking"]["api_tokens"].update_one(
             {"token": token}, {"$set": {"config": config}}
         )
+        self.auth_cache.invalidate_token(token)
         return result.modified_count > 0 or result.matched_count > 0
 
     async def link_token_user(self, token: str, user_id: int, name: str = None) -> bool:
@@ -2220,6 +3679,7 @@ class Database:
         result = await self.dbs["tracking"]["api_tokens"].update_one(
             {"token": token}, {"$set": update}
         )
+        self.auth_cache.invalidate_token(token)
         return result.modified_count > 0
 
     @staticmethod
@@ -2229,38 +3689,70 @@ class Database:
         except (TypeError, ValueError):
             return False
 
+    #----- Buffered: deltas from every stream of a token are merged and written by usage_buffer
     async def update_token_usage(self, token: str, bytes_delta: int):
-        today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        month_str = datetime.now(timezone.utc).strftime("%Y-%m")
-        
-        token_doc = await self.dbs["tracking"]["api_tokens"].find_one({"token": token})
-        if not token_doc:
-             return
-
-        current_daily = token_doc.get("usage", {}).get("daily", {})
-        if current_daily.get("date") != today_str:
-            await self.dbs["tracking"]["api_tokens"].update_one(
-                {"token": token},
-                {"$set": {"usage.daily": {"date": today_str, "bytes": 0}}}
-            )
-
-        current_monthly = token_doc.get("usage", {}).get("monthly", {})
-        if current_monthly.get("month") != month_str:
-            await self.dbs["tracking"]["api_tokens"].update_one(
-                {"token": token},
-                {"$set": {"usage.monthly": {"month": month_str, "bytes": 0}}}
-            )
+        self.usage_buffer.add(token, bytes_delta)
+
+    #----- One pipeline update per token: total += delta, and the daily/monthly counters
+    #----- either grow or restart at delta when the stored period is not the current one
+    async def _write_token_usage(self, deltas: Dict[str, int]) -> int:
+        now = datetime.now(timezone.utc)
+        today_str = now.strftime("%Y-%m-%d")
+        month_str = now.strftime("%Y-%m")
+
+        def _period(path: str, key: str, value: str, delta: int) -> dict:
+            return {"$cond": [
+                {"$eq": [f"${path}.{key}", value]},
+                {key: value, "bytes": {"$add": [{"$ifNull": [f"${path}.bytes", 0]}, delta]}},
+                {key: value, "bytes": delta},
+            ]}
 
-        await self.dbs["tracking"]["api_tokens"].update_one(
-            {"token": token},
-            {
-                "$inc": {
-                    "usage.total_bytes": bytes_delta,
-                    "usage.daily.bytes": bytes_delta,
-                    "usage.monthly.bytes": bytes_delta
-                }
-            }
-        )
+        ops = [
+            UpdateOne({"token": token}, [{"$set": {
+                "usage.total_bytes": {"$add": [{"$ifNull": ["$usage.total_bytes", 0]}, delta]},
+                "usage.daily": _period("usage.daily", "date", today_str, delta),
+                "usage.monthly": _period("usage.monthly", "month", month_str, delta),
+            }}])
+            for token, delta in deltas.items()
+        ]
+        if not ops:
+            return 0
+        try:
+            await self.dbs["tracking"]["api_tokens"].bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            #----- Mirror the ops that did land; the buffer re-queues the failed ones
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            for i, (token, delta) in enumerate(deltas.items()):
+                if i not in failed:
+                    self._apply_flushed_usage(token, delta, today_str, month_str)
+            raise
+        for token, delta in deltas.items():
+            self._apply_flushed_usage(token, delta, today_str, month_str)
+        return len(ops)
+
+    #----- Mirror a flushed delta into the cached token doc; crossing a limit drops the entry
+    #----- so the next verify_token re-reads the authoritative doc
+    def _apply_flushed_usage(self, token: str, delta: int, today_str: str, month_str: str) -> None:
+        doc = self.auth_cache.cached_token(token)
+        if not doc:
+            return
+        usage = doc.get("usage") or {}
+        doc["usage"] = usage
+        limits = doc.get("limits") or {}
+        usage["total_bytes"] = usage.get("total_bytes", 0) + delta
+        crossed = False
+        for period, key, value, limit_key in (
+            ("daily", "date", today_str, "daily_limit_gb"),
+            ("monthly", "month", month_str, "monthly_limit_gb"),
+        ):
+            bucket = usage.get(period) or {}
+            before = bucket.get("bytes", 0) if bucket.get(key) == value else 0
+            usage[period] = {key: value, "bytes": before + delta}
+            limit = (limits.get(limit_key) or 0) * (1024 ** 3)
+            if limit > 0 and before < limit <= before + delta:
+                crossed = True
+        if crossed:
+            self.auth_cache.invalidate_token(token)
 
     async def update_api_token_limits(self, token: str, daily_limit_gb: float, monthly_limit_gb: float) -> bool:
         result = await self.dbs["tracking"]["api_tokens"].update_one(
@@ -2272,6 +3764,7 @@ class Database:
                 }
             }}
         )
+        self.auth_cache.invalidate_token(token)
         return result.modified_count > 0
 
     #-----
@@ -2285,32 +3778,24 @@ class Database:
             #----- Direct update in the telegram array for movies
             result = await self.dbs[db_key]["movie"].update_one(
                 {"tmdb_id": tmdb_id, "telegram.id": quality_id},
-                {"$set": {"telegram.$.is_dead": True, "updated_on": datetime.utcnow()}}
+                {"$set": {"telegram.$.is_dead": True, "updated_on": datetime.utcnow()}, "$inc": {"rev": 1}}
             )
             return result.modified_count > 0
             
         elif media_type == "tv":
-            #----- Nested update for TV (arrayFilters needed since we don't know the exact indices)
-            #----- Find the TV show docs
-            tv = await self.dbs[db_key]["tv"].find_one({"tmdb_id": tmdb_id})
-            if not tv or "seasons" not in tv:
-                return False
-                
-            found = False
-            for s_idx, season in enumerate(tv["seasons"]):
-                for e_idx, episode in enumerate(season.get("episodes", [])):
-                    for q_idx, quality in enumerate(episode.get("telegram", [])):
-                        if quality.get("id") == quality_id:
-                            tv["seasons"][s_idx]["episodes"][e_idx]["telegram"][q_idx]["is_dead"] = True
-                            found = True
-                            break
-                    if found: break
-                if found: break
-                
-            if found:
-                tv["updated_on"] = datetime.utcnow()
-                result = await self.dbs[db_key]["tv"].replace_one({"tmdb_id": tmdb_id}, tv)
-                return result.modified_count > 0
+            #----- Nested update for TV: arrayFilters find the quality in whichever episode holds it
+            result = await self.dbs[db_key]["tv"].update_one(
+                {"tmdb_id": tmdb_id, "seasons.episodes.telegram.id": quality_id},
+                {
+                    "$set": {
+                        "seasons.$[].episodes.$[].telegram.$[q].is_dead": True,
+                        "updated_on": datetime.utcnow(),
+                    },
+                    "$inc": {"rev": 1},
+                },
+                array_filters=[{"q.id": quality_id}],
+            )
+            return result.modified_count > 0
                 
         return False
 
@@ -2371,6 +3856,44 @@ class Database:
                                 
         return dead_links
 
+    #-----
+    #----- Persistent FileId / location cache (per bot client)
+    #-----
+    @staticmethod
+    def _file_location_key(client_key, chat_id: int, msg_id: int) -> str:
+        return f"{client_key}:{int(chat_id)}:{int(msg_id)}"
+
+    async def get_file_location(self, client_key, chat_id: int, msg_id: int) -> Optional[dict]:
+        try:
+            return await self.dbs["tracking"]["file_locations"].find_one(
+                {"_id": self._file_location_key(client_key, chat_id, msg_id)}
+            )
+        except Exception as e:
+            LOGGER.debug(f"get_file_location failed: {e}")
+            return None
+
+    async def save_file_location(self, client_key, chat_id: int, msg_id: int, record: dict) -> None:
+        try:
+            await self.dbs["tracking"]["file_locations"].update_one(
+                {"_id": self._file_location_key(client_key, chat_id, msg_id)},
+                {"$set": {**record, "chat_id": int(chat_id), "msg_id": int(msg_id), "cached_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as e:
+            LOGGER.debug(f"save_file_location failed: {e}")
+
+    async def drop_file_location(self, client_key, chat_id: int, msg_id: int) -> None:
+        try:
+            await self.dbs["tracking"]["file_locations"].delete_one(
+                {"_id": self._file_location_key(client_key, chat_id, msg_id)}
+            )
+        except Exception as e:
+            LOGGER.debug(f"drop_file_location failed: {e}")
+
+    async def clear_file_locations(self) -> int:
+        result = await self.dbs["tracking"]["file_locations"].delete_many({})
+        return result.deleted_count
+
     #-----
     #----- Stream Analytics
     #-----
@@ -2397,6 +3920,7 @@ class Database:
                 "logged_at":   datetime.utcnow(),
             }
             await self.dbs["tracking"]["stream_analytics"].insert_one(record)
+            await self._roll_up_stream(record)
             token = stats.get("meta", {}).get("token")
             if token:
                 upd = {"last_active": datetime.utcnow()}
@@ -2414,38 +3938,10 @@ class Database:
         #----- Return summary stats + recent stream records from the tracking DB
         try:
             col = self.dbs["tracking"]["stream_analytics"]
-
-            #----- Aggregate totals
-            pipeline = [
-                {"$group": {
-                    "_id": None,
-                    "total_streams":     {"$sum": 1},
-                    "total_bytes":       {"$sum": "$total_bytes"},
-                    "avg_speed":         {"$avg": "$avg_mbps"},
-                    "peak_speed":        {"$max": "$peak_mbps"},
-                    "avg_duration":      {"$avg": "$duration_sec"},
-                }},
-            ]
-            agg = await col.aggregate(pipeline).to_list(1)
-            summary = agg[0] if agg else {}
-            summary.pop("_id", None)
-
-            #----- Per-client breakdown
-            per_client_pipeline = [
-                {"$group": {
-                    "_id":          "$client_index",
-                    "streams":      {"$sum": 1},
-                    "avg_mbps":     {"$avg": "$avg_mbps"},
-                    "peak_mbps":    {"$max": "$peak_mbps"},
-                    "total_bytes":  {"$sum": "$total_bytes"},
-                }},
-                {"$sort": {"_id": 1}},
-            ]
-            per_client = await col.aggregate(per_client_pipeline).to_list(None)
-            for row in per_client:
-                row["client_index"] = row.pop("_id")
-                row["avg_mbps"]     = round(row.get("avg_mbps", 0), 3)
-                row["peak_mbps"]    = round(row.get("peak_mbps", 0), 3)
+            if self._rollups_ready:
+                data = await self._analytics_from_rollups()
+            else:
+                data = await self._analytics_from_scan(col)
 
             #----- Recent records (newest first)
             recent_cursor = col.find(
@@ -2459,55 +3955,393 @@ class Database:
                 if "logged_at" in r:
                     r["logged_at"] = r["logged_at"].isoformat()
 
-            #----- Most-streamed titles
-            top_titles = await col.aggregate([
-                {"$match": {"title": {"$nin": [None, ""]}}},
-                {"$group": {"_id": "$title", "streams": {"$sum": 1}, "total_bytes": {"$sum": "$total_bytes"}}},
-                {"$sort": {"streams": -1}},
-                {"$limit": 8},
-            ]).to_list(None)
-            for r in top_titles:
-                r["title"] = r.pop("_id")
-
-            #----- Heaviest viewers (by data transferred)
-            top_users = await col.aggregate([
-                {"$match": {"user_name": {"$nin": [None, ""]}}},
-                {"$group": {"_id": "$user_name", "streams": {"$sum": 1}, "total_bytes": {"$sum": "$total_bytes"}}},
-                {"$sort": {"total_bytes": -1}},
-                {"$limit": 8},
-            ]).to_list(None)
-            for r in top_users:
-                r["user"] = r.pop("_id")
-
-            #----- Streams & data per day (last 14 days, chronological)
-            per_day = await col.aggregate([
-                {"$group": {
-                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$logged_at"}},
-                    "streams": {"$sum": 1},
-                    "total_bytes": {"$sum": "$total_bytes"},
-                }},
-                {"$sort": {"_id": -1}},
-                {"$limit": 14},
-            ]).to_list(None)
-            for r in per_day:
-                r["date"] = r.pop("_id")
-            per_day.reverse()
-
-            distinct_users = await col.distinct("user_name")
-            summary["active_users"] = len([u for u in distinct_users if u and u != "Unknown"])
-
-            return {
-                "summary":    summary,
-                "per_client": per_client,
-                "top_titles": top_titles,
-                "top_users":  top_users,
-                "per_day":    per_day,
-                "recent":     recent,
-            }
+            return {**data, "recent": recent}
         except Exception as e:
             LOGGER.error(f"get_stream_analytics error: {e}")
             return {"summary": {}, "per_client": [], "top_titles": [], "top_users": [], "per_day": [], "recent": []}
 
+    #----- Dashboard figures from stream_rollups: a handful of small indexed reads
+    async def _analytics_from_rollups(self) -> dict:
+        col = self.dbs["tracking"]["stream_rollups"]
+        total = await col.find_one({"_id": "total"}) or {}
+        streams = total.get("streams", 0)
+        summary = {}
+        if streams:
+            summary = {
+                "total_streams": streams,
+                "total_bytes":   total.get("total_bytes", 0),
+                "avg_speed":     total.get("mbps_sum", 0) / streams,
+                "peak_speed":    total.get("peak_mbps", 0),
+                "avg_duration":  total.get("duration_sum", 0) / streams,
+            }
+        summary["active_users"] = total.get("users", 0)
+
+        per_client = []
+        async for row in col.find({"kind": "client"}).sort("key", ASCENDING):
+            per_client.append({
+                "client_index": row.get("key"),
+                "streams":      row.get("streams", 0),
+                "avg_mbps":     round(row.get("mbps_sum", 0) / row["streams"], 3) if row.get("streams") else 0,
+                "peak_mbps":    round(row.get("peak_mbps", 0), 3),
+                "total_bytes":  row.get("total_bytes", 0),
+            })
+
+        top_titles = [
+            {"title": row["key"], "streams": row.get("streams", 0), "total_bytes": row.get("total_bytes", 0)}
+            async for row in col.find({"kind": "title"}).sort("streams", DESCENDING).limit(8)
+        ]
+        top_users = [
+            {"user": row["key"], "streams": row.get("streams", 0), "total_bytes": row.get("total_bytes", 0)}
+            async for row in col.find({"kind": "user"}).sort("total_bytes", DESCENDING).limit(8)
+        ]
+        per_day = [
+            {"date": row["key"], "streams": row.get("streams", 0), "total_bytes": row.get("total_bytes", 0)}
+            async for row in col.find({"kind": "day"}).sort("key", DESCENDING).limit(14)
+        ]
+        per_day.reverse()
+
+        return {
+            "summary":    summary,
+            "per_client": per_client,
+            "top_titles": top_titles,
+            "top_users":  top_users,
+            "per_day":    per_day,
+        }
+
+    #----- Same figures aggregated from the raw stream_analytics history (used until the rollups exist)
+    async def _analytics_from_scan(self, col) -> dict:
+        #----- Aggregate totals
+        pipeline = [
+            {"$group": {
+                "_id": None,
+                "total_streams":     {"$sum": 1},
+                "total_bytes":       {"$sum": "$total_bytes"},
+                "avg_speed":         {"$avg": "$avg_mbps"},
+                "peak_speed":        {"$max": "$peak_mbps"},
+                "avg_duration":      {"$avg": "$duration_sec"},
+            }},
+        ]
+        agg = await col.aggregate(pipeline).to_list(1)
+        summary = agg[0] if agg else {}
+        summary.pop("_id", None)
+
+        #----- Per-client breakdown
+        per_client_pipeline = [
+            {"$group": {
+                "_id":          "$client_index",
+                "streams":      {"$sum": 1},
+                "avg_mbps":     {"$avg": "$avg_mbps"},
+                "peak_mbps":    {"$max": "$peak_mbps"},
+                "total_bytes":  {"$sum": "$total_bytes"},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        per_client = await col.aggregate(per_client_pipeline).to_list(None)
+        for row in per_client:
+            row["client_index"] = row.pop("_id")
+            row["avg_mbps"]     = round(row.get("avg_mbps", 0), 3)
+            row["peak_mbps"]    = round(row.get("peak_mbps", 0), 3)
+
+        #----- Most-streamed titles
+        top_titles = await col.aggregate([
+            {"$match": {"title": {"$nin": [None, ""]}}},
+            {"$group": {"_id": "$title", "streams": {"$sum": 1}, "total_bytes": {"$sum": "$total_bytes"}}},
+            {"$sort": {"streams": -1}},
+            {"$limit": 8},
+        ]).to_list(None)
+        for r in top_titles:
+            r["title"] = r.pop("_id")
+
+        #----- Heaviest viewers (by data transferred)
+        top_users = await col.aggregate([
+            {"$match": {"user_name": {"$nin": [None, ""]}}},
+            {"$group": {"_id": "$user_name", "streams": {"$sum": 1}, "total_bytes": {"$sum": "$total_bytes"}}},
+            {"$sort": {"total_bytes": -1}},
+            {"$limit": 8},
+        ]).to_list(None)
+        for r in top_users:
+            r["user"] = r.pop("_id")
+
+        #----- Streams & data per day (last 14 days, chronological)
+        per_day = await col.aggregate([
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$logged_at"}},
+                "streams": {"$sum": 1},
+                "total_bytes": {"$sum": "$total_bytes"},
+            }},
+            {"$sort": {"_id": -1}},
+            {"$limit": 14},
+        ]).to_list(None)
+        for r in per_day:
+            r["date"] = r.pop("_id")
+        per_day.reverse()
+
+        distinct_users = await col.distinct("user_name")
+        summary["active_users"] = len([u for u in distinct_users if u and u != "Unknown"])
+
+        return {
+            "summary":    summary,
+            "per_client": per_client,
+            "top_titles": top_titles,
+            "top_users":  top_users,
+            "per_day":    per_day,
+        }
+
+    #-----
+    #----- Analytics rollups: tracking.stream_rollups holds per-day/client/title/user counters
+    #----- ("<kind>:<key>" plus one "total" row) bumped by every logged stream, and
+    #----- tracking.content_rollups holds per-title stream/episode counts ("<collection>:<tmdb_id>")
+    #----- plus a "totals" row kept in step by the same hooks that maintain stream_index.
+    #-----
+
+    _ROLLUP_SUMS = {
+        "streams": {"$sum": 1},
+        "total_bytes": {"$sum": "$total_bytes"},
+        "duration_sum": {"$sum": "$duration_sec"},
+        "mbps_sum": {"$sum": "$avg_mbps"},
+        "peak_mbps": {"$max": "$peak_mbps"},
+    }
+
+    @staticmethod
+    def _rollup_id(kind: str, key) -> str:
+        return "total" if kind == "total" else f"{kind}:{key}"
+
+    async def _roll_up_stream(self, record: dict) -> None:
+        if self._rollup_backlog is not None:
+            self._rollup_backlog["streams"].append(record)
+            return
+        await self._apply_stream_rollup(record)
+
+    async def _apply_stream_rollup(self, record: dict) -> None:
+        rows = [("total", None), ("day", record["logged_at"].strftime("%Y-%m-%d")), ("client", record.get("client_index"))]
+        if record.get("title"):
+            rows.append(("title", record["title"]))
+        if record.get("user_name"):
+            rows.append(("user", record["user_name"]))
+        inc = {
+            "streams": 1,
+            "total_bytes": record.get("total_bytes") or 0,
+            "duration_sum": record.get("duration_sec") or 0,
+            "mbps_sum": record.get("avg_mbps") or 0,
+        }
+        ops = [
+            UpdateOne(
+                {"_id": self._rollup_id(kind, key)},
+                {"$inc": inc, "$max": {"peak_mbps": record.get("peak_mbps") or 0}, "$setOnInsert": {"kind": kind, "key": key}},
+                upsert=True,
+            )
+            for kind, key in rows
+        ]
+        col = self.dbs["tracking"]["stream_rollups"]
+        result = await col.bulk_write(ops, ordered=False)
+        #----- A first stream from a named user adds one to the active-user count
+        if rows[-1][0] == "user" and rows[-1][1] != "Unknown" and (len(ops) - 1) in (result.upserted_ids or {}):
+            await col.update_one({"_id": "total"}, {"$inc": {"users": 1}})
+
+    @staticmethod
+    def _content_counts(collection_name: str, doc: dict) -> Tuple[int, int]:
+        if collection_name == "movie":
+            return len(doc.get("telegram") or []), 0
+        episodes = [e for s in doc.get("seasons") or [] for e in s.get("episodes") or []]
+        return sum(len(e.get("telegram") or []) for e in episodes), len(episodes)
+
+    #----- Server-side equivalent of _content_counts, for recounts and rebuilds
+    @staticmethod
+    def _content_count_projection(collection_name: str) -> dict:
+        if collection_name == "movie":
+            return {"tmdb_id": 1, "streams": {"$size": {"$ifNull": ["$telegram", []]}}, "episodes": {"$literal": 0}}
+        seasons = {"$ifNull": ["$seasons", []]}
+        episodes = {"$ifNull": ["$$s.episodes", []]}
+        return {
+            "tmdb_id": 1,
+            "episodes": {"$sum": {"$map": {"input": seasons, "as": "s", "in": {"$size": episodes}}}},
+            "streams": {"$sum": {"$map": {"input": seasons, "as": "s", "in": {"$sum": {"$map": {
+                "input": episodes, "as": "e", "in": {"$size": {"$ifNull": ["$$e.telegram", []]}},
+            }}}}}},
+        }
+
+    #----- Swap in a title's new counts (None = title gone) and fold the difference into "totals"
+    async def _record_content(self, collection_name: str, tmdb_id, counts: Optional[Tuple[int, int]]) -> None:
+        tracking = self.dbs.get("tracking")
+        if tracking is None or tmdb_id is None:
+            return
+        if self._rollup_backlog is not None:
+            self._rollup_backlog["content"][(collection_name, tmdb_id)] = counts
+            return
+        await self._apply_content_rollup(tracking["content_rollups"], collection_name, tmdb_id, counts)
+
+    async def _apply_content_rollup(self, col, collection_name: str, tmdb_id, counts: Optional[Tuple[int, int]]) -> None:
+        key = f"{collection_name}:{tmdb_id}"
+        try:
+            if counts is None:
+                prev = await col.find_one_and_delete({"_id": key})
+                if prev is None:
+                    return
+                titles, streams, episodes = -1, -prev.get("streams", 0), -prev.get("episodes", 0)
+            else:
+                prev = await col.find_one_and_update(
+                    {"_id": key}, {"$set": {"streams": counts[0], "episodes": counts[1]}}, upsert=True
+                )
+                titles = 0 if prev else 1
+                streams = counts[0] - (prev or {}).get("streams", 0)
+                episodes = counts[1] - (prev or {}).get("episodes", 0)
+            if titles or streams or episodes:
+                title_field = "movies" if collection_name == "movie" else "tv_shows"
+                await col.update_one(
+                    {"_id": "totals"},
+                    {"$inc": {title_field: titles, "streams": streams, "episodes": episodes}},
+                    upsert=True,
+                )
+        except Exception as e:
+            LOGGER.error(f"content_rollups: failed recording {key}: {e}")
+
+    #----- Recount one title in place after a targeted update (no full doc in hand)
+    async def _recount_content(self, collection_name: str, tmdb_id, db_index: int) -> None:
+        try:
+            rows = await self.dbs[f"storage_{db_index}"][collection_name].aggregate([
+                {"$match": {"tmdb_id": tmdb_id}},
+                {"$project": self._content_count_projection(collection_name)},
+                {"$limit": 1},
+            ]).to_list(1)
+        except Exception as e:
+            LOGGER.error(f"content_rollups: recount failed for {collection_name} {tmdb_id}: {e}")
+            return
+        await self._record_content(collection_name, tmdb_id, (rows[0]["streams"], rows[0]["episodes"]) if rows else None)
+
+    async def _rebuild_content_rollups(self) -> int:
+        col = self.dbs["tracking"]["content_rollups"]
+        await col.delete_many({})
+        titles = 0
+        for db_key in [k for k in self.dbs if k.startswith("storage_")]:
+            for collection_name in ("movie", "tv"):
+                ops = []
+                cursor = self.dbs[db_key][collection_name].aggregate([
+                    {"$match": {"tmdb_id": {"$ne": None}}},
+                    {"$project": self._content_count_projection(collection_name)},
+                ])
+                async for row in cursor:
+                    ops.append(ReplaceOne(
+                        {"_id": f"{collection_name}:{row['tmdb_id']}"},
+                        {"streams": row["streams"], "episodes": row["episodes"]},
+                        upsert=True,
+                    ))
+                    if len(ops) >= 1000:
+                        await col.bulk_write(ops, ordered=False)
+                        titles += len(ops)
+                        ops = []
+                if ops:
+                    await col.bulk_write(ops, ordered=False)
+                    titles += len(ops)
+
+        totals = {"movies": 0, "tv_shows": 0, "streams": 0, "episodes": 0}
+        async for row in col.find({"_id": {"$ne": "totals"}}):
+            totals["movies" if row["_id"].startswith("movie:") else "tv_shows"] += 1
+            totals["streams"] += row.get("streams", 0)
+            totals["episodes"] += row.get("episodes", 0)
+        await col.replace_one({"_id": "totals"}, totals, upsert=True)
+        return titles
+
+    async def _rebuild_stream_rollups(self, cutoff: datetime) -> int:
+        tracking = self.dbs["tracking"]
+        col = tracking["stream_rollups"]
+        await col.delete_many({})
+        keys = {
+            "total": None,
+            "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$logged_at"}},
+            "client": "$client_index",
+            "title": "$title",
+            "user": "$user_name",
+        }
+        ops = []
+        users = 0
+        for kind, key_expr in keys.items():
+            pipeline = [{"$match": {"logged_at": {"$lt": cutoff}}}]
+            if kind in ("title", "user"):
+                pipeline.append({"$match": {key_expr[1:]: {"$nin": [None, ""]}}})
+            pipeline.append({"$group": {"_id": key_expr, **self._ROLLUP_SUMS}})
+            async for row in tracking["stream_analytics"].aggregate(pipeline, allowDiskUse=True):
+                key = row.pop("_id")
+                ops.append(ReplaceOne({"_id": self._rollup_id(kind, key)}, {**row, "kind": kind, "key": key}, upsert=True))
+                if kind == "user" and key != "Unknown":
+                    users += 1
+        for start in range(0, len(ops), 1000):
+            await col.bulk_write(ops[start:start + 1000], ordered=False)
+        await col.update_one({"_id": "total"}, {"$set": {"users": users, "kind": "total"}}, upsert=True)
+        return len(ops)
+
+    #----- Full recompute of both rollups; readers fall back to scanning until it completes.
+    #----- Incremental writes are held back meanwhile (a $inc racing the rebuild would be lost
+    #----- or counted twice) and replayed on top of the rebuilt rows: streams logged at or after
+    #----- the cutoff, and the latest counts of every title touched.
+    async def rebuild_rollups(self) -> dict:
+        if self._rollups_building:
+            return {"ok": False, "message": "Analytics rollup rebuild already running."}
+        self._rollups_building = True
+        self._rollups_ready = False
+        self._rollup_backlog = {"streams": [], "content": {}}
+        cutoff = datetime.utcnow()
+        started = time.monotonic()
+        try:
+            titles = await self._rebuild_content_rollups()
+            rows = await self._rebuild_stream_rollups(cutoff)
+            await self._replay_rollup_backlog(cutoff)
+            await self.dbs["tracking"]["state"].update_one(
+                {"_id": "analytics_rollups"},
+                {"$set": {"version": self.ROLLUP_VERSION, "built_at": datetime.utcnow()}},
+                upsert=True,
+            )
+            self._rollups_ready = True
+            elapsed = round(time.monotonic() - started, 2)
+            LOGGER.info(f"Analytics rollups rebuilt: {titles} titles, {rows} stream rows in {elapsed}s")
+            return {"ok": True, "titles": titles, "stream_rows": rows, "seconds": elapsed}
+        except Exception as e:
+            LOGGER.error(f"Analytics rollup rebuild failed: {e}")
+            return {"ok": False, "message": str(e)}
+        finally:
+            self._rollup_backlog = None
+            self._rollups_building = False
+
+    #----- Apply the writes held back during a rebuild. New writes keep queueing while this
+    #----- awaits, and are drained in order before the backlog is switched off.
+    async def _replay_rollup_backlog(self, cutoff: datetime) -> None:
+        backlog = self._rollup_backlog
+        content_col = self.dbs["tracking"]["content_rollups"]
+        while backlog["streams"] or backlog["content"]:
+            streams, backlog["streams"] = backlog["streams"], []
+            content, backlog["content"] = backlog["content"], {}
+            for record in streams:
+                if record["logged_at"] >= cutoff:
+                    await self._apply_stream_rollup(record)
+            for (collection_name, tmdb_id), counts in content.items():
+                await self._apply_content_rollup(content_col, collection_name, tmdb_id, counts)
+
+    async def _load_rollup_state(self) -> None:
+        try:
+            state = await self.dbs["tracking"]["state"].find_one({"_id": "analytics_rollups"})
+        except Exception as e:
+            LOGGER.error(f"Analytics rollups: failed reading state: {e}")
+            return
+        if state and state.get("version") == self.ROLLUP_VERSION:
+            self._rollups_ready = True
+        else:
+            create_task(self.rebuild_rollups())
+
+    #----- Library totals from content_rollups, or None while the rollups are being built
+    async def get_content_totals(self) -> Optional[dict]:
+        if not self._rollups_ready:
+            return None
+        try:
+            totals = await self.dbs["tracking"]["content_rollups"].find_one({"_id": "totals"}) or {}
+        except Exception as e:
+            LOGGER.error(f"content_rollups: failed reading totals: {e}")
+            return None
+        return {field: totals.get(field, 0) for field in ("movies", "tv_shows", "episodes", "streams")}
+
+    async def clear_stream_analytics(self) -> int:
+        result = await self.dbs["tracking"]["stream_analytics"].delete_many({})
+        await self.dbs["tracking"]["stream_rollups"].delete_many({})
+        return result.deleted_count
+
 
 
     @staticmethod
@@ -2643,13 +4477,20 @@ class Database:
                 if field in current_doc:
                     existing_other[field] = current_doc[field]
             existing_other["updated_on"] = datetime.utcnow()
+            existing_other["rev"] = (existing_other.get("rev") or 0) + 1
 
             await collection.delete_one({"_id": source_id})
             await collection.replace_one({"_id": existing_other["_id"]}, existing_other)
+            await self.unindex_media_doc(collection_name, int(tmdb_id))
+            await self.index_media_doc(collection_name, existing_other, int(db_index))
 
             updated_doc = await collection.find_one({"_id": existing_other["_id"]})
             return convert_objectid_to_str(updated_doc) if updated_doc else None
+        current_doc["rev"] = (current_doc.get("rev") or 0) + 1
         await collection.replace_one({"_id": source_id}, current_doc)
+        if new_tmdb_id != int(tmdb_id):
+            await self.unindex_media_doc(collection_name, int(tmdb_id))
+        await self.index_media_doc(collection_name, current_doc, int(db_index))
 
         updated_doc = await collection.find_one({"_id": source_id})
         return convert_objectid_to_str(updated_doc) if updated_doc else None
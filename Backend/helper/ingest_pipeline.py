@@ -0,0 +1,271 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from Backend import db
+from Backend.helper.announcer import announce_new_media
+from Backend.helper.auto_catalog import start_single_media_catalog_sync
+from Backend.helper.metadata import metadata
+from Backend.helper.pyro import clean_filename, finalize_media_name, get_log_msg
+from Backend.helper.requests_manager import auto_fulfill
+from Backend.helper.task_manager import delete_message
+from Backend.logger import LOGGER
+
+PARSE_WORKERS = 2
+METADATA_WORKERS = 8
+UPSERT_SHARDS = 8
+SIDE_EFFECT_WORKERS = 4
+
+PARSE_QUEUE_SIZE = 500
+METADATA_QUEUE_SIZE = 200
+SHARD_QUEUE_SIZE = 50
+SIDE_EFFECT_QUEUE_SIZE = 500
+
+THROUGHPUT_WINDOW = 60
+
+#----- Job outcomes handed back to whoever submitted the file
+RESULT_PARSED = "parsed"
+RESULT_INDEXED = "indexed"
+RESULT_DUPLICATE = "duplicate"
+RESULT_NO_METADATA = "no_metadata"
+RESULT_SKIPPED_480P = "skipped_480p"
+RESULT_REJECTED = "rejected"
+RESULT_ERROR = "error"
+
+
+#----- One channel file travelling through the pipeline
+class IngestJob:
+    __slots__ = ("title", "channel", "msg_id", "size", "raw_size", "override_id", "season_hint",
+                 "live", "upsert", "on_metadata", "on_skip", "clean_title", "metadata_info", "name",
+                 "updated_id", "status", "done")
+
+    def __init__(
+        self,
+        title: str,
+        channel: int,
+        msg_id: int,
+        size: str,
+        raw_size: int,
+        override_id: Optional[str] = None,
+        season_hint: Optional[int] = None,
+        live: bool = True,
+        upsert: bool = True,
+        on_metadata: Optional[Callable[["IngestJob"], Awaitable[None]]] = None,
+        on_skip: Optional[Callable[["IngestJob"], Awaitable[None]]] = None,
+    ):
+        self.title = title
+        self.channel = channel
+        self.msg_id = msg_id
+        self.size = size
+        self.raw_size = raw_size
+        self.override_id = override_id
+        self.season_hint = season_hint
+        self.live = live
+        self.upsert = upsert
+        self.on_metadata = on_metadata
+        self.on_skip = on_skip
+        self.clean_title = ""
+        self.metadata_info: Optional[dict] = None
+        self.name = title
+        self.updated_id = None
+        self.status: Dict[str, Any] = {}
+        self.done: Optional[asyncio.Future] = None
+
+    @property
+    def shard_key(self) -> tuple:
+        info = self.metadata_info or {}
+        return info.get("media_type"), str(info.get("tmdb_id"))
+
+    def finish(self, result: str) -> None:
+        if self.done is not None and not self.done.done():
+            self.done.set_result(result)
+
+
+#----- A pool of workers behind bounded queues, with throughput counters for the admin UI
+class _Stage:
+    __slots__ = ("name", "handler", "queues", "processed", "failed", "busy", "busy_seconds", "_completed")
+
+    def __init__(self, name: str, handler: Callable[[IngestJob], Awaitable[None]], queues: int, maxsize: int):
+        self.name = name
+        self.handler = handler
+        self.queues: List[asyncio.Queue] = [asyncio.Queue(maxsize) for _ in range(queues)]
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self._completed: Deque[float] = deque()
+
+    async def run(self, queue: asyncio.Queue) -> None:
+        while True:
+            job = await queue.get()
+            self.busy += 1
+            started = time.monotonic()
+            try:
+                await self.handler(job)
+                self.processed += 1
+            except asyncio.CancelledError:
+                job.finish(RESULT_ERROR)
+                raise
+            except Exception as e:
+                self.failed += 1
+                LOGGER.error(f"[Ingest] {self.name} failed for message {job.msg_id}: {e}")
+                job.finish(RESULT_ERROR)
+            finally:
+                now = time.monotonic()
+                self.busy -= 1
+                self.busy_seconds += now - started
+                self._completed.append(now)
+                queue.task_done()
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self.queues)
+
+    def stats(self, workers: int) -> dict:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        while self._completed and self._completed[0] < cutoff:
+            self._completed.popleft()
+        done = self.processed + self.failed
+        return {
+            "name": self.name,
+            "workers": workers,
+            "busy": self.busy,
+            "queued": self.depth(),
+            "capacity": sum(q.maxsize for q in self.queues),
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_minute": round(len(self._completed) * 60 / THROUGHPUT_WINDOW, 1),
+            "avg_ms": round(self.busy_seconds / done * 1000, 1) if done else None,
+        }
+
+
+#----- parse → metadata → upsert → side effects. Upserts are sharded by (media_type, tmdb_id):
+#----- each shard has a single writer, so different titles insert in parallel while the
+#----- writes for one title are applied in the order they reached the upsert stage.
+class IngestPipeline:
+    def __init__(self):
+        self.parse = _Stage("parse", self._parse, 1, PARSE_QUEUE_SIZE)
+        self.metadata = _Stage("metadata", self._metadata, 1, METADATA_QUEUE_SIZE)
+        self.upsert = _Stage("upsert", self._upsert, UPSERT_SHARDS, SHARD_QUEUE_SIZE)
+        self.side_effects = _Stage("side_effects", self._side_effects, 1, SIDE_EFFECT_QUEUE_SIZE)
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.results: Dict[str, int] = {}
+
+    def _ensure_started(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        for stage, workers in ((self.parse, PARSE_WORKERS), (self.metadata, METADATA_WORKERS),
+                               (self.side_effects, SIDE_EFFECT_WORKERS)):
+            self._tasks.extend(loop.create_task(stage.run(stage.queues[0])) for _ in range(workers))
+        self._tasks.extend(loop.create_task(self.upsert.run(q)) for q in self.upsert.queues)
+
+    #----- Queue a file; waits while the parse queue is full. The job's `done` future
+    #----- resolves with one of the RESULT_* values once the file has been written (or dropped).
+    async def submit(self, job: IngestJob) -> asyncio.Future:
+        self._ensure_started()
+        job.done = asyncio.get_running_loop().create_future()
+        job.done.add_done_callback(self._count_result)
+        self.submitted += 1
+        await self.parse.queues[0].put(job)
+        return job.done
+
+    def _count_result(self, future: asyncio.Future) -> None:
+        if not future.cancelled():
+            result = future.result()
+            self.results[result] = self.results.get(result, 0) + 1
+
+    async def _parse(self, job: IngestJob) -> None:
+        job.clean_title = clean_filename(job.title)
+        await self.metadata.queues[0].put(job)
+
+    async def _metadata(self, job: IngestJob) -> None:
+        job.metadata_info = await metadata(
+            job.clean_title, job.channel, job.msg_id,
+            override_id=job.override_id, season_hint=job.season_hint,
+        )
+        if job.metadata_info is None:
+            LOGGER.warning(f"Metadata failed for file: {job.title} (ID: {job.msg_id})")
+            await self._callback(job.on_skip, job)
+            job.finish(RESULT_NO_METADATA)
+            return
+
+        job.name = finalize_media_name(job.title, bool(job.metadata_info.get('group_key')))
+        await self._callback(job.on_metadata, job)
+        if not job.upsert:
+            #----- The submitter writes parsed jobs itself (channel scans bulk-upsert per batch)
+            job.finish(RESULT_PARSED)
+            return
+        shard = hash(job.shard_key) % UPSERT_SHARDS
+        await self.upsert.queues[shard].put(job)
+
+    async def _upsert(self, job: IngestJob) -> None:
+        info = job.metadata_info
+        if info.get('quality') == '480p':
+            await delete_message(int(f"-100{job.channel}"), job.msg_id)
+            LOGGER.info(f"Skipping 480p file & Deleted for: {get_log_msg(info)}")
+            job.finish(RESULT_SKIPPED_480P)
+            return
+
+        job.updated_id = await db.insert_media(
+            info, channel=job.channel, msg_id=job.msg_id, size=job.size,
+            raw_size=job.raw_size, name=job.name, status=job.status,
+        )
+        if not job.updated_id:
+            if job.live:
+                LOGGER.info("Update failed due to validation errors.")
+            job.finish(RESULT_REJECTED)
+            return
+        if job.live:
+            LOGGER.info(f"{info['media_type']} updated with ID: {job.updated_id}")
+
+        if job.status.get("duplicate_skipped"):
+            job.finish(RESULT_DUPLICATE)
+        else:
+            job.finish(RESULT_INDEXED)
+        if job.live:
+            await self.side_effects.queues[0].put(job)
+
+    #----- Live files only: scans index in bulk and leave catalog sync/announcements alone
+    async def _side_effects(self, job: IngestJob) -> None:
+        info = job.metadata_info
+        if job.status.get("duplicate_skipped"):
+            LOGGER.info(f"Duplicate protection: deleting duplicate message {job.msg_id} from channel {job.channel}.")
+            await delete_message(int(f"-100{job.channel}"), job.msg_id)
+            return
+
+        start_single_media_catalog_sync(db, tmdb_id=info.get("tmdb_id"), media_type=info.get("media_type"))
+        announce_new_media(info)
+        await auto_fulfill(
+            tmdb_id=info.get("tmdb_id"),
+            imdb_id=info.get("imdb_id"),
+            media_type=info.get("media_type"),
+        )
+
+    @staticmethod
+    async def _callback(callback, job: IngestJob) -> None:
+        if callback is None:
+            return
+        try:
+            await callback(job)
+        except Exception as e:
+            LOGGER.warning(f"[Ingest] Callback failed for message {job.msg_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "running": bool(self._tasks),
+            "submitted": self.submitted,
+            "in_flight": self.submitted - sum(self.results.values()),
+            "results": dict(self.results),
+            "stages": [
+                self.parse.stats(PARSE_WORKERS),
+                self.metadata.stats(METADATA_WORKERS),
+                self.upsert.stats(UPSERT_SHARDS),
+                self.side_effects.stats(SIDE_EFFECT_WORKERS),
+            ],
+            "shard_depths": [q.qsize() for q in self.upsert.queues],
+        }
+
+
+INGEST_PIPELINE = IngestPipeline()
@@ -74,6 +74,8 @@ async def get_file_ids(client: Client, chat_id: int, message_id: int) -> Optiona
             setattr(file_id_obj, 'file_size', getattr(media, 'file_size', 0))
             setattr(file_id_obj, 'mime_type', getattr(media, 'mime_type', ''))
             setattr(file_id_obj, 'unique_id', file_unique_id)
+            sent = getattr(message, 'date', None)
+            setattr(file_id_obj, 'date', int(sent.timestamp()) if sent else 0)
 
             return file_id_obj
         else:
@@ -83,6 +85,33 @@ async def get_file_ids(client: Client, chat_id: int, message_id: int) -> Optiona
         raise
 
 
+#----- Serialisable snapshot of a resolved FileId (for the persistent location cache)
+def file_id_to_record(file_id: FileId) -> dict:
+    return {
+        "file_id": file_id.encode(),
+        "dc_id": file_id.dc_id,
+        "file_name": getattr(file_id, "file_name", ""),
+        "file_size": getattr(file_id, "file_size", 0),
+        "mime_type": getattr(file_id, "mime_type", ""),
+        "unique_id": getattr(file_id, "unique_id", ""),
+        "date": getattr(file_id, "date", 0),
+    }
+
+
+#----- Rebuild a FileId (with the extra attributes get_file_ids sets) from a cached record
+def file_id_from_record(record: dict) -> Optional[FileId]:
+    try:
+        file_id_obj = FileId.decode(record["file_id"])
+    except Exception:
+        return None
+    setattr(file_id_obj, 'file_name', record.get('file_name', ''))
+    setattr(file_id_obj, 'file_size', record.get('file_size', 0))
+    setattr(file_id_obj, 'mime_type', record.get('mime_type', ''))
+    setattr(file_id_obj, 'unique_id', record.get('unique_id', ''))
+    setattr(file_id_obj, 'date', record.get('date', 0))
+    return file_id_obj
+
+
 def get_readable_file_size(size_in_bytes):
     size_in_bytes = int(size_in_bytes) if str(size_in_bytes).isdigit() else 0
     if not size_in_bytes:
@@ -0,0 +1,99 @@
+import time
+from typing import Callable, Dict, Hashable, Optional, Set
+
+#----- Bytes ahead of the newest request that still count as "the same playback position"
+READAHEAD_BYTES = 16 * 1024 * 1024
+#----- How long a session outlives its last Range request (players reconnect on every seek)
+SESSION_TTL = 120
+
+READAHEAD_COUNTERS: Dict[str, int] = {
+    "seeks": 0, "trimmed_streams": 0, "resumed_streams": 0, "cancelled_fetches": 0,
+}
+
+
+#----- One Range request attached to a session: where it started, where it has read up to,
+#----- and a callback that cancels its speculative prefetch
+class StreamHandle:
+    __slots__ = ("start", "position", "trim", "trimmed")
+
+    def __init__(self, start: int, trim: Callable[[], int]):
+        self.start = start
+        self.position = start
+        self.trim = trim
+        self.trimmed = False
+
+
+#----- Per-(token, file) playback session that survives across Range requests
+class ReadaheadSession:
+    __slots__ = ("key", "streams", "position", "last_used", "seeks")
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.streams: Set[StreamHandle] = set()
+        self.position = 0
+        self.last_used = time.monotonic()
+        self.seeks = 0
+
+    def _in_window(self, pos: int, offset: int, chunk_size: int) -> bool:
+        return offset - chunk_size <= pos <= offset + READAHEAD_BYTES
+
+    #----- Register a new Range request; older streams reading outside its window are
+    #----- throttled and their in-flight fetches beyond what the player consumed are cancelled
+    def attach(self, start: int, chunk_size: int, trim: Callable[[], int]) -> StreamHandle:
+        self.last_used = time.monotonic()
+        if self.streams and not self._in_window(self.position, start, chunk_size):
+            self.seeks += 1
+            READAHEAD_COUNTERS["seeks"] += 1
+        for other in list(self.streams):
+            if other.trimmed or self._in_window(other.position, start, chunk_size):
+                continue
+            other.trimmed = True
+            READAHEAD_COUNTERS["trimmed_streams"] += 1
+            READAHEAD_COUNTERS["cancelled_fetches"] += other.trim()
+        handle = StreamHandle(start, trim)
+        self.streams.add(handle)
+        self.position = start
+        return handle
+
+    def advance(self, handle: StreamHandle, position: int) -> None:
+        handle.position = position
+        if not handle.trimmed:
+            self.position = position
+        self.last_used = time.monotonic()
+
+    #----- A trimmed stream the player kept reading (e.g. past a tail/moov probe) is live again
+    def resume(self, handle: StreamHandle) -> None:
+        if not handle.trimmed:
+            return
+        handle.trimmed = False
+        READAHEAD_COUNTERS["resumed_streams"] += 1
+        self.advance(handle, handle.position)
+
+    def detach(self, handle: StreamHandle) -> None:
+        self.streams.discard(handle)
+        self.last_used = time.monotonic()
+
+
+READAHEAD_SESSIONS: Dict[Hashable, ReadaheadSession] = {}
+
+
+#----- Fetch (or open) the session for a key, pruning idle ones on the way
+def get_readahead_session(key: Optional[Hashable]) -> Optional[ReadaheadSession]:
+    if key is None:
+        return None
+    now = time.monotonic()
+    for k, session in list(READAHEAD_SESSIONS.items()):
+        if not session.streams and now - session.last_used > SESSION_TTL:
+            del READAHEAD_SESSIONS[k]
+    session = READAHEAD_SESSIONS.get(key)
+    if session is None:
+        session = READAHEAD_SESSIONS[key] = ReadaheadSession(key)
+    return session
+
+
+def readahead_stats() -> dict:
+    return {
+        **READAHEAD_COUNTERS,
+        "sessions": len(READAHEAD_SESSIONS),
+        "attached_streams": sum(len(s.streams) for s in READAHEAD_SESSIONS.values()),
+    }
@@ -215,9 +215,9 @@ async def media_exists(media_type: str, tmdb_id, imdb_id, title: str, year=None)
             return True
         #----- 3) requested name + year vs library title + release_year
         if title:
-            found = await db.search_documents(query=title, page=1, page_size=8)
-            target = _norm_title(title)
             want_year = _year_int(year)
+            found = await db.search_documents(query=title, page=1, page_size=8, media_type=media_type, year=want_year)
+            target = _norm_title(title)
             for item in (found.get("results") or []):
                 if item.get("media_type") != media_type:
                     continue
@@ -8,8 +8,18 @@ from pyrogram.errors import FloodWait, ChannelPrivate, ChatAdminRequired
 
 from Backend.logger import LOGGER
 from Backend.helper.encrypt import encode_string, decode_string
-from Backend.helper.metadata import metadata, extract_default_id
-from Backend.helper.pyro import clean_filename, finalize_media_name, get_readable_file_size, get_log_msg
+from Backend.helper.ingest_pipeline import (
+    INGEST_PIPELINE,
+    RESULT_DUPLICATE,
+    RESULT_ERROR,
+    RESULT_INDEXED,
+    RESULT_NO_METADATA,
+    RESULT_PARSED,
+    RESULT_REJECTED,
+    IngestJob,
+)
+from Backend.helper.metadata import extract_default_id
+from Backend.helper.pyro import get_readable_file_size, get_log_msg
 from Backend.helper.skip_channel import is_skip_channel, route_to_skip_channel
 from Backend.helper.split_files import parse_split_info
 from Backend.helper.subtitles import ingest_subtitle, is_subtitle_file
@@ -52,7 +62,6 @@ class ScanManager:
         self._task: Optional[asyncio.Task] = None
         self._cancel = False
         self._lock = asyncio.Lock()
-        self._db_lock = asyncio.Lock()
         self.state: Dict[str, Any] = self._blank_state()
 
     #----- ── State helpers ────────────────────────────────────────────────────────
@@ -169,6 +178,8 @@ class ScanManager:
 
     async def _stream_id_exists(self, channel: int, msg_id: int) -> bool:
         db = self._db
+        if db.stream_index_ready:
+            return await db.lookup_stream_part(channel, msg_id) is not None
         try:
             stream_hash = await encode_string({"chat_id": channel, "msg_id": msg_id})
         except Exception:
@@ -371,16 +382,7 @@ class ScanManager:
 
             if to_process:
                 s["counters"]["total_found"] += len(to_process)
-                sem = asyncio.Semaphore(SCAN_PROCESS_CONCURRENCY)
-
-                async def _worker(msg):
-                    async with sem:
-                        if self._cancel:
-                            return
-                        await self._process_message(client, msg, chat_id)
-                        s["counters"]["processed"] += 1
-
-                await asyncio.gather(*(_worker(m) for m in to_process))
+                await self._process_batch(client, to_process, chat_id)
 
             if self._cancel:
                 s["cursors"][str(ch_key)] = current
@@ -429,13 +431,87 @@ class ScanManager:
             )
         return last_id
 
-    async def _process_message(self, client, message, chat_id: int) -> None:
+    #----- Batch mode: filter the messages, drop the ones the stream index already holds with a
+    #----- single $in probe, resolve metadata through the ingestion pipeline, then write every
+    #----- parsed file with one grouped bulk upsert
+    async def _process_batch(self, client, messages: list, chat_id: int) -> None:
         s = self.state
         db = self._db
+        channel_int = int(str(chat_id).replace("-100", ""))
+        sem = asyncio.Semaphore(SCAN_PROCESS_CONCURRENCY)
+
+        async def _filter(msg):
+            async with sem:
+                return msg if await self._filter_message(msg, chat_id) else None
+
+        candidates = [m for m in await asyncio.gather(*(_filter(m) for m in messages)) if m is not None]
+        s["counters"]["processed"] += len(messages) - len(candidates)
+        if not candidates or self._cancel:
+            return
+
+        indexed = await db.indexed_msg_ids(channel_int, [m.id for m in candidates])
+        if indexed is None:
+            async def _probe(msg):
+                async with sem:
+                    try:
+                        return msg.id if await self._stream_id_exists(channel_int, msg.id) else None
+                    except Exception as e:
+                        LOGGER.warning(f"[ScanManager] Dup-check error msg {msg.id}: {e}")
+                        return None
+            indexed = set(await asyncio.gather(*(_probe(m) for m in candidates))) - {None}
+        fresh = [m for m in candidates if m.id not in indexed]
+        s["counters"]["skipped_dup"] += len(candidates) - len(fresh)
+        s["counters"]["processed"] += len(candidates) - len(fresh)
+
+        jobs = []
+        for message in fresh:
+            job = self._metadata_job(client, message, chat_id, channel_int)
+            await INGEST_PIPELINE.submit(job)
+            jobs.append(job)
+
+        items = []
+        for job in jobs:
+            result = await job.done
+            if result != RESULT_PARSED:
+                self._record_result(result)
+                s["counters"]["processed"] += 1
+                continue
+            if job.metadata_info.get('quality') == '480p':
+                await delete_message(chat_id, job.msg_id)
+                LOGGER.info(f"Skipping 480p file & Deleted for: {get_log_msg(job.metadata_info)}")
+                s["counters"]["processed"] += 1
+                continue
+            items.append({
+                "metadata_info": job.metadata_info, "channel": channel_int, "msg_id": job.msg_id,
+                "size": job.size, "name": job.name, "raw_size": job.raw_size,
+            })
+
+        if not items:
+            return
+        try:
+            written = await db.insert_media_batch(items)
+        except Exception as e:
+            LOGGER.error(f"[ScanManager] Bulk upsert error for {len(items)} files in {chat_id}: {e}")
+            s["counters"]["errors"] += len(items)
+            s["counters"]["processed"] += len(items)
+            return
+        for updated_id, status in written:
+            if not updated_id:
+                self._record_result(RESULT_REJECTED)
+            elif status.get("duplicate_skipped"):
+                self._record_result(RESULT_DUPLICATE)
+            else:
+                self._record_result(RESULT_INDEXED)
+        s["counters"]["processed"] += len(items)
+
+    #----- True when the message is a media file to index; subtitles, skip-channel and
+    #----- non-video messages are handled and counted here
+    async def _filter_message(self, message, chat_id: int) -> bool:
+        s = self.state
 
         if is_skip_channel(message):
             s["counters"]["skipped_meta"] += 1
-            return
+            return False
 
         #----- Subtitle files: match to a title and store, don't treat as media
         sub_name = message.document.file_name if message.document else ""
@@ -445,7 +521,7 @@ class ScanManager:
                 s["counters"]["subtitles_added"] += 1
             else:
                 s["counters"]["subtitles_skipped"] += 1
-            return
+            return False
 
         is_video = bool(message.video)
         is_supported = is_video
@@ -460,71 +536,46 @@ class ScanManager:
 
         if not is_supported:
             s["counters"]["skipped_nonvid"] += 1
-            return
+            return False
+        return True
 
+    #----- Metadata-only pipeline job for one scanned file (the write happens in the batch upsert)
+    def _metadata_job(self, client, message, chat_id: int, channel_int: int) -> IngestJob:
         file = message.video or message.document
         title = message.caption or file.file_name
         msg_id = message.id
-        raw_size = file.file_size
-        size = get_readable_file_size(file.file_size)
-        channel_int = int(str(chat_id).replace("-100", ""))
 
-        try:
-            if await self._stream_id_exists(channel_int, msg_id):
-                s["counters"]["skipped_dup"] += 1
-                return
-        except Exception as e:
-            LOGGER.warning(f"[ScanManager] Dup-check error msg {msg_id}: {e}")
-
-        try:
-            metadata_info = await metadata(
-                clean_filename(title), channel_int, msg_id,
-                override_id=extract_default_id(message.caption or ""),
-            )
-        except Exception as e:
-            LOGGER.warning(f"[ScanManager] Metadata exception for msg {msg_id}: {e}")
-            metadata_info = None
+        async def _on_metadata(job: IngestJob) -> None:
+            if not job.name == message.caption and not job.metadata_info.get('group_key'):
+                LOGGER.info(f"Editing Caption for Message ID {message.id}: {get_log_msg(job.metadata_info)}")
+                asyncio.create_task(edit_message(chat_id=chat_id, msg_id=message.id, new_caption=job.name))
 
-        if metadata_info is None:
-            s["counters"]["skipped_meta"] += 1
+        async def _on_skip(job: IngestJob) -> None:
             try:
                 await route_to_skip_channel(client, message)
             except Exception as e:
                 LOGGER.warning(f"[ScanManager] Skip-channel route failed for msg {msg_id}: {e}")
-            return
-
-        title_clean = finalize_media_name(title, bool(metadata_info.get('group_key')))
-        if not title_clean == message.caption and not metadata_info.get('group_key'):
-            LOGGER.info(f"Editing Caption for Message ID {message.id}: {get_log_msg(metadata_info)}")
-            asyncio.create_task(edit_message(chat_id=chat_id, msg_id=message.id, new_caption=title_clean))
 
-        if metadata_info.get('quality') == '480p':
-            await delete_message(chat_id, msg_id)
-            LOGGER.info(f"Skipping 480p file & Deleted for: {get_log_msg(metadata_info)}")
-            return
+        return IngestJob(
+            title, channel_int, msg_id, get_readable_file_size(file.file_size), file.file_size,
+            override_id=extract_default_id(message.caption or ""),
+            live=False,
+            upsert=False,
+            on_metadata=_on_metadata,
+            on_skip=_on_skip,
+        )
 
-        insert_status: dict = {}
-        try:
-            async with self._db_lock:
-                updated_id = await db.insert_media(
-                    metadata_info,
-                    channel=channel_int,
-                    msg_id=msg_id,
-                    size=size,
-                    name=title_clean,
-                    raw_size=raw_size,
-                    status=insert_status,
-                )
-            if updated_id:
-                if insert_status.get("duplicate_skipped"):
-                    s["counters"]["skipped_dup"] += 1
-                else:
-                    s["counters"]["indexed"] += 1
-            else:
-                s["counters"]["skipped_meta"] += 1
-        except Exception as e:
-            LOGGER.error(f"[ScanManager] DB insert error msg {msg_id}: {e}")
-            s["counters"]["errors"] += 1
+    #----- Fold a pipeline outcome into the scan counters
+    def _record_result(self, result: str) -> None:
+        counters = self.state["counters"]
+        if result == RESULT_INDEXED:
+            counters["indexed"] += 1
+        elif result == RESULT_DUPLICATE:
+            counters["skipped_dup"] += 1
+        elif result in (RESULT_NO_METADATA, RESULT_REJECTED):
+            counters["skipped_meta"] += 1
+        elif result == RESULT_ERROR:
+            counters["errors"] += 1
 
     #----- ── Purge (rescan helper) ────────────────────────────────────────────────
     async def _purge_channel_entries(self, channel_int: int) -> int:
@@ -556,8 +607,10 @@ class ScanManager:
                     if remaining:
                         movie["telegram"] = remaining
                         await storage["movie"].replace_one({"_id": movie["_id"]}, movie)
+                        await db.index_media_doc("movie", movie, i)
                     else:
                         await storage["movie"].delete_one({"_id": movie["_id"]})
+                        await db.unindex_media_doc("movie", movie.get("tmdb_id"))
 
             async for tv in storage["tv"].find({}):
                 tv_changed = False
@@ -580,8 +633,10 @@ class ScanManager:
                 if tv_changed:
                     if tv["seasons"]:
                         await storage["tv"].replace_one({"_id": tv["_id"]}, tv)
+                        await db.index_media_doc("tv", tv, i)
                     else:
                         await storage["tv"].delete_one({"_id": tv["_id"]})
+                        await db.unindex_media_doc("tv", tv.get("tmdb_id"))
         return purged
 
 
@@ -0,0 +1,368 @@
+import heapq
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+#----- Apostrophes join words ("schindler's" -> "schindlers"); any other non-word char splits
+_APOSTROPHES = re.compile(r"['’`]")
+_SEPARATORS = re.compile(r"[\W_]+")
+_YEAR = re.compile(r"^(19|20)\d\d$")
+
+#----- Match weights per query token: exact beats prefix beats trigram (typo) matches, whose
+#----- similarity is the Dice coefficient of the two tokens' trigram sets
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+#----- Tokens only seen in file names (release names) count for less than title tokens
+NAME_FACTOR = 0.5
+FUZZY_MIN_LENGTH = 4
+FUZZY_MIN_SIMILARITY = 0.5
+PREFIX_MIN_LENGTH = 2
+
+#----- Ranking bonuses on top of the mean token match: the query is the whole title, or
+#----- starts it; share of the title's words the query covers; a year in the query agrees;
+#----- and popularity (TMDB rating, number of files held) to order otherwise equal hits
+EXACT_TITLE_BONUS = 1.0
+TITLE_PREFIX_BONUS = 0.5
+TITLE_COVERAGE_BONUS = 0.5
+YEAR_BONUS = 0.3
+RATING_BONUS = 0.2
+STREAMS_BONUS = 0.1
+STREAMS_SATURATION = 100
+
+Key = Tuple[str, int]
+#----- Position in the ranking: (-score, collection, tmdb_id); ascending = best first
+Rank = Tuple[float, str, int]
+
+
+def normalize(text) -> str:
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _SEPARATORS.sub(" ", _APOSTROPHES.sub("", text)).strip()
+
+
+def tokenize(text) -> List[str]:
+    return normalize(text).split()
+
+
+def is_year(token: str) -> bool:
+    return bool(_YEAR.match(token))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+#----- What the index keeps per title: enough to rank and to locate the storage doc
+class _Entry:
+    __slots__ = ("key", "db_index", "title", "norm_title", "year", "rating", "streams",
+                 "title_tokens", "title_set", "name_tokens")
+
+    def __init__(self, key: Key, db_index: int, title: str, year: Optional[int], rating: float, streams: int,
+                 title_tokens: Tuple[str, ...], name_tokens: frozenset):
+        self.key = key
+        self.db_index = db_index
+        self.title = title
+        self.norm_title = " ".join(title_tokens)
+        self.year = year
+        self.rating = rating
+        self.streams = streams
+        self.title_tokens = title_tokens
+        self.title_set = frozenset(title_tokens)
+        self.name_tokens = name_tokens
+
+    def tokens(self) -> Set[str]:
+        tokens = self.title_set | self.name_tokens
+        if self.year:
+            tokens = tokens | {str(self.year)}
+        return set(tokens)
+
+    #----- Weight of this title's best match for one expanded query token (0 = no match)
+    def match(self, expansion: Dict[str, float]) -> float:
+        best = 0.0
+        for token, weight in expansion.items():
+            if token in self.title_set or (self.year and token == str(self.year)):
+                score = weight
+            elif token in self.name_tokens:
+                score = weight * NAME_FACTOR
+            else:
+                continue
+            if score > best:
+                best = score
+        return best
+
+
+#----- In-process inverted index over every stored title. Postings map normalised tokens
+#----- (title words, release year, file-name words) to (collection, tmdb_id) keys; a trigram
+#----- map over the vocabulary resolves typos and a two-char bucket map resolves prefixes.
+#----- Database keeps it in sync from index_media_doc / unindex_media_doc.
+class SearchIndex:
+    def __init__(self):
+        self._entries: Dict[Key, _Entry] = {}
+        self._postings: Dict[str, Set[Key]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+        self._by_type: Dict[str, Set[Key]] = {}
+        self._by_year: Dict[int, Set[Key]] = {}
+        #----- Manually added titles (negative synthetic tmdb_id), for the admin "custom" filter
+        self._custom: Set[Key] = set()
+        self.ready = False
+        self.building = False
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _file_names(collection_name: str, doc: dict) -> Iterable[str]:
+        if collection_name == "movie":
+            for quality in doc.get("telegram") or []:
+                yield quality.get("name") or ""
+            return
+        for season in doc.get("seasons") or []:
+            for episode in season.get("episodes") or []:
+                for quality in episode.get("telegram") or []:
+                    yield quality.get("name") or ""
+
+    def add(self, collection_name: str, doc: dict, db_index: Optional[int] = None) -> None:
+        tmdb_id = doc.get("tmdb_id")
+        if tmdb_id is None:
+            return
+        key = (collection_name, tmdb_id)
+        self.remove(collection_name, tmdb_id)
+
+        title_tokens = tuple(tokenize(doc.get("title")))
+        name_tokens: Set[str] = set()
+        streams = 0
+        for name in self._file_names(collection_name, doc):
+            name_tokens.update(tokenize(name))
+            streams += 1
+        try:
+            year = int(doc.get("release_year") or 0) or None
+        except (TypeError, ValueError):
+            year = None
+        try:
+            rating = float(doc.get("rating") or 0)
+        except (TypeError, ValueError):
+            rating = 0.0
+
+        name_tokens.difference_update(title_tokens)
+        if year:
+            name_tokens.discard(str(year))
+        entry = _Entry(key, db_index or doc.get("db_index"), doc.get("title") or "", year, rating, streams,
+                       title_tokens, frozenset(name_tokens))
+        self._entries[key] = entry
+        for token in entry.tokens():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+                self._prefixes.setdefault(token[:PREFIX_MIN_LENGTH], set()).add(token)
+            postings.add(key)
+        self._by_type.setdefault(collection_name, set()).add(key)
+        if year:
+            self._by_year.setdefault(year, set()).add(key)
+        if self._is_custom(tmdb_id):
+            self._custom.add(key)
+
+    @staticmethod
+    def _is_custom(tmdb_id) -> bool:
+        try:
+            return int(tmdb_id) < 0
+        except (TypeError, ValueError):
+            return False
+
+    def remove(self, collection_name: str, tmdb_id) -> None:
+        key = (collection_name, tmdb_id)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for token in entry.tokens():
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(key)
+            if postings:
+                continue
+            del self._postings[token]
+            for gram in trigrams(token):
+                vocab = self._trigrams.get(gram)
+                if vocab is not None:
+                    vocab.discard(token)
+                    if not vocab:
+                        del self._trigrams[gram]
+            bucket = self._prefixes.get(token[:PREFIX_MIN_LENGTH])
+            if bucket is not None:
+                bucket.discard(token)
+                if not bucket:
+                    del self._prefixes[token[:PREFIX_MIN_LENGTH]]
+        self._by_type.get(collection_name, set()).discard(key)
+        if entry.year:
+            self._by_year.get(entry.year, set()).discard(key)
+        self._custom.discard(key)
+
+    #----- Entries held in one storage DB (it is being detached)
+    def drop_db(self, db_index: int) -> int:
+        doomed = [entry.key for entry in self._entries.values() if entry.db_index == db_index]
+        for collection_name, tmdb_id in doomed:
+            self.remove(collection_name, tmdb_id)
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._postings.clear()
+        self._trigrams.clear()
+        self._prefixes.clear()
+        self._by_type.clear()
+        self._by_year.clear()
+        self._custom.clear()
+
+    def entry(self, key: Key) -> Optional[_Entry]:
+        return self._entries.get(key)
+
+    #----- Vocabulary tokens a query token can stand for, with their match weight
+    def _expand(self, token: str) -> Dict[str, float]:
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT_WEIGHT
+        if len(token) >= PREFIX_MIN_LENGTH:
+            for candidate in self._prefixes.get(token[:PREFIX_MIN_LENGTH], ()):
+                if candidate != token and candidate.startswith(token):
+                    matches[candidate] = PREFIX_WEIGHT
+        if matches or len(token) < FUZZY_MIN_LENGTH:
+            return matches
+
+        grams = trigrams(token)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        for candidate, common in shared.items():
+            if abs(len(candidate) - len(token)) > 2:
+                continue
+            similarity = 2 * common / (len(grams) + len(candidate))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                matches[candidate] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def _facet(self, media_type: Optional[str], year: Optional[int], custom: bool = False) -> Optional[Set[Key]]:
+        allowed = self._custom if custom else None
+        if media_type:
+            by_type = self._by_type.get(media_type, set())
+            allowed = by_type if allowed is None else allowed & by_type
+        if year:
+            by_year = self._by_year.get(year, set())
+            allowed = by_year if allowed is None else allowed & by_year
+        return allowed
+
+    @staticmethod
+    def rank(score: float, key: Key) -> Rank:
+        return (-score, key[0], key[1])
+
+    def _score(self, entry: _Entry, expansions: List[Dict[str, float]], norm_query: str,
+               query_years: Set[int]) -> float:
+        total = 0.0
+        for expansion in expansions:
+            weight = entry.match(expansion)
+            if not weight:
+                return 0.0
+            total += weight
+        score = total / len(expansions)
+        if entry.norm_title == norm_query:
+            score += EXACT_TITLE_BONUS
+        elif entry.norm_title.startswith(norm_query):
+            score += TITLE_PREFIX_BONUS
+        if entry.title_tokens:
+            covered = sum(1 for token in entry.title_set if any(token in e for e in expansions))
+            score += TITLE_COVERAGE_BONUS * covered / len(entry.title_set)
+        if entry.year and entry.year in query_years:
+            score += YEAR_BONUS
+        score += RATING_BONUS * min(max(entry.rating, 0.0), 10.0) / 10
+        score += STREAMS_BONUS * min(1.0, math.log1p(entry.streams) / math.log1p(STREAMS_SATURATION))
+        return round(score, 6)
+
+    #----- Every matching title once, as (score, key). Candidates come from the most selective
+    #----- query token (or the facet set when that is smaller); a title reachable through several
+    #----- of that token's expansions is only yielded for the first one it holds, so no
+    #----- per-query "seen" set is needed.
+    def _matches(self, tokens: List[str], expansions: List[Dict[str, float]], media_type: Optional[str],
+                 year: Optional[int], custom: bool = False) -> Iterator[Tuple[float, Key]]:
+        norm_query = " ".join(tokens)
+        query_years = {int(token) for token in tokens if is_year(token)}
+        allowed = self._facet(media_type, year, custom)
+
+        driver = min(expansions, key=lambda e: sum(len(self._postings.get(t, ())) for t in e))
+        driver_size = sum(len(self._postings.get(t, ())) for t in driver)
+        if allowed is not None and len(allowed) <= driver_size:
+            for key in allowed:
+                score = self._score(self._entries[key], expansions, norm_query, query_years)
+                if score:
+                    yield score, key
+            return
+
+        order = {token: i for i, token in enumerate(driver)}
+        for i, token in enumerate(driver):
+            for key in self._postings.get(token, ()):
+                if allowed is not None and key not in allowed:
+                    continue
+                entry = self._entries[key]
+                if i and min(order[t] for t in entry.tokens() if t in order) != i:
+                    continue
+                score = self._score(entry, expansions, norm_query, query_years)
+                if score:
+                    yield score, key
+
+    #----- Distinct query tokens and their expansions, or None when some token matches nothing
+    def _prepare(self, query: str) -> Optional[Tuple[List[str], List[Dict[str, float]]]]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return None
+        expansions = [self._expand(token) for token in tokens]
+        if not all(expansions):
+            return None
+        return tokens, expansions
+
+    #----- Top `limit` hits ranked after `after` (a Rank from a previous page), plus the number
+    #----- of titles matching overall. Only a `limit`-sized heap is held, however many match.
+    def search(
+        self,
+        query: str,
+        media_type: Optional[str] = None,
+        year: Optional[int] = None,
+        limit: int = 20,
+        after: Optional[Rank] = None,
+        custom: bool = False,
+    ) -> Tuple[List[Tuple[float, Key]], int]:
+        self.searches += 1
+        prepared = self._prepare(query)
+        if prepared is None or limit <= 0:
+            return [], 0
+        tokens, expansions = prepared
+
+        matched = 0
+
+        def _window() -> Iterator[Tuple[float, Key]]:
+            nonlocal matched
+            for score, key in self._matches(tokens, expansions, media_type, year, custom):
+                matched += 1
+                if after is None or self.rank(score, key) > after:
+                    yield score, key
+
+        top = heapq.nsmallest(limit, _window(), key=lambda hit: self.rank(*hit))
+        return top, matched
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "building": self.building,
+            "titles": len(self._entries),
+            "movies": len(self._by_type.get("movie", ())),
+            "tv_shows": len(self._by_type.get("tv", ())),
+            "custom": len(self._custom),
+            "tokens": len(self._postings),
+            "trigrams": len(self._trigrams),
+            "searches": self.searches,
+        }
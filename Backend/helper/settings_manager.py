@@ -330,6 +330,8 @@ class SettingsManager:
         #----- Phase 2: persist and flip the in-memory snapshot
         await db.save_settings(merged)
         cls._current = Settings(merged)
+        #----- Poster/fanart/subscription settings shape the materialised catalog pages
+        db.catalog_pages.clear()
 
         #----- Phase 3: reinit everything that reads current()
         results.update(await cls._reinit_dependent(old, merged))
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo.errors import BulkWriteError
+
+from Backend.logger import LOGGER
+
+
+#----- Write-behind accumulator for per-token bandwidth usage. Every stream adds its byte
+#----- deltas here; one periodic flush writes a single update per token, so tracking-DB
+#----- writes scale with active tokens rather than with active streams.
+class TokenUsageBuffer:
+    FLUSH_INTERVAL = 5
+
+    def __init__(self, writer: Callable[[Dict[str, int]], Awaitable[int]]):
+        self._writer = writer
+        self._pending: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.counters: Dict[str, int] = {
+            "deltas": 0,
+            "flushes": 0,
+            "writes": 0,
+            "failed_flushes": 0,
+        }
+        self._last_flush: Optional[float] = None
+
+    def add(self, token: str, nbytes: int) -> None:
+        if not token or nbytes <= 0:
+            return
+        self._pending[token] = self._pending.get(token, 0) + nbytes
+        self.counters["deltas"] += 1
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                pass
+
+    #----- Bytes accepted for a token but not yet written
+    def pending(self, token: str) -> int:
+        return self._pending.get(token, 0)
+
+    #----- Fold an unwritten batch back so the next flush retries it
+    def _restore(self, batch: Dict[str, int]) -> None:
+        for token, nbytes in batch.items():
+            self._pending[token] = self._pending.get(token, 0) + nbytes
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                written = await self._writer(batch)
+            except asyncio.CancelledError:
+                self._restore(batch)
+                raise
+            except BulkWriteError as e:
+                #----- Unordered bulk write (one op per token, in batch order): every op not
+                #----- named in writeErrors was applied, so only the failed tokens are retried
+                tokens = list(batch)
+                failed = {}
+                for error in e.details.get("writeErrors", []):
+                    token = tokens[error["index"]]
+                    failed[token] = batch[token]
+                self._restore(failed)
+                self.counters["failed_flushes"] += 1
+                written = len(batch) - len(failed)
+                self.counters["writes"] += written
+                LOGGER.error(f"Token usage flush partially failed ({len(failed)} of {len(batch)} tokens): {e}")
+                return written
+            except Exception as e:
+                self._restore(batch)
+                self.counters["failed_flushes"] += 1
+                LOGGER.error(f"Token usage flush failed ({len(batch)} tokens): {e}")
+                return 0
+            self.counters["flushes"] += 1
+            self.counters["writes"] += written
+            self._last_flush = time.time()
+            return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            await self.flush()
+            if not self._pending:
+                return
+
+    #----- Stop the periodic flusher and write whatever is still buffered (shutdown path)
+    async def drain(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "pending_tokens": len(self._pending),
+            "pending_bytes": sum(self._pending.values()),
+            "last_flush": self._last_flush,
+        }
@@ -1,4 +1,4 @@
-from asyncio import Lock, Queue, create_task
+from asyncio import Lock, create_task
 from asyncio import sleep as asleep
 
 from pyrogram import Client, filters
@@ -8,22 +8,18 @@ from pyrogram.types import Message
 
 import Backend
 from Backend import db
-from Backend.helper.announcer import announce_new_media
-from Backend.helper.auto_catalog import start_single_media_catalog_sync
 from Backend.helper.encrypt import encode_string
+from Backend.helper.ingest_pipeline import INGEST_PIPELINE, IngestJob
 from Backend.helper.manual_add import resolve_telegram_message, stamp_caption_with_id
-from Backend.helper.requests_manager import auto_fulfill
-from Backend.helper.metadata import extract_default_id, metadata
-from Backend.helper.pyro import clean_filename, finalize_media_name, get_readable_file_size, get_log_msg
+from Backend.helper.metadata import extract_default_id
+from Backend.helper.pyro import get_readable_file_size, get_log_msg
 from Backend.helper.settings_manager import SettingsManager
 from Backend.helper.skip_channel import is_skip_channel, route_to_skip_channel
 from Backend.helper.split_files import parse_split_info
 from Backend.helper.subtitles import ingest_subtitle, is_subtitle_file, remove_subtitle
-from Backend.helper.task_manager import edit_message, delete_message
+from Backend.helper.task_manager import edit_message
 from Backend.logger import LOGGER
 
-file_queue = Queue()
-db_lock = Lock()
 manual_session_lock = Lock()
 
 
@@ -55,52 +51,6 @@ def _extract_fields(message: Message):
     return file, title, message.id, file.file_size, get_readable_file_size(file.file_size), channel
 
 
-#----- Strip URLs/part suffix from a title and ensure a video extension
-def _finalize_title(title: str, metadata_info: dict) -> str:
-    return finalize_media_name(title, bool(metadata_info.get('group_key')))
-
-
-#----- Serialize DB inserts from the queue and trigger catalog sync
-async def process_file():
-    while True:
-        metadata_info, channel, msg_id, size, raw_size, title = await file_queue.get()
-        if metadata_info.get('quality') == '480p':
-            await delete_message(int(f"-100{channel}"), msg_id)
-            LOGGER.info(f"Skipping 480p file & Deleted for: {get_log_msg(metadata_info)}")
-            file_queue.task_done()
-            continue
-        insert_status: dict = {}
-        async with db_lock:
-            updated_id = await db.insert_media(metadata_info, channel=channel, msg_id=msg_id, size=size, raw_size=raw_size, name=title, status=insert_status)
-            if updated_id:
-                LOGGER.info(f"{metadata_info['media_type']} updated with ID: {updated_id}")
-            else:
-                LOGGER.info("Update failed due to validation errors.")
-
-        if updated_id and insert_status.get("duplicate_skipped"):
-            LOGGER.info(f"Duplicate protection: deleting duplicate message {msg_id} from channel {channel}.")
-            create_task(delete_message(int(f"-100{channel}"), msg_id))
-            file_queue.task_done()
-            continue
-
-        if updated_id:
-            start_single_media_catalog_sync(
-                db,
-                tmdb_id=metadata_info.get("tmdb_id"),
-                media_type=metadata_info.get("media_type"),
-            )
-            announce_new_media(metadata_info)
-            create_task(auto_fulfill(
-                tmdb_id=metadata_info.get("tmdb_id"),
-                imdb_id=metadata_info.get("imdb_id"),
-                media_type=metadata_info.get("media_type"),
-            ))
-        file_queue.task_done()
-
-
-create_task(process_file())
-
-
 #----- Build a title-level metadata base from an existing media document
 def _base_from_doc(doc: dict) -> dict:
     return {
@@ -184,11 +134,10 @@ async def _handle_personal_session(client: Client, message: Message) -> None:
                 "episode_released": "",
             })
 
-        async with db_lock:
-            updated_id = await db.insert_media(
-                metadata_info, channel=p_channel, msg_id=p_msg,
-                size=resolved["size"], name=name, raw_size=int(resolved.get("raw_size") or 0),
-            )
+        updated_id = await db.insert_media(
+            metadata_info, channel=p_channel, msg_id=p_msg,
+            size=resolved["size"], name=name, raw_size=int(resolved.get("raw_size") or 0),
+        )
 
         if updated_id:
             where = (f"S{metadata_info['season_number']:02d}E{metadata_info['episode_number']:02d} "
@@ -199,7 +148,7 @@ async def _handle_personal_session(client: Client, message: Message) -> None:
             LOGGER.warning(f"[Manual Session] Insert failed for message {message.id}.")
 
 
-#----- Ingest new channel media into the queue after building metadata
+#----- Hand new channel media to the ingestion pipeline (metadata, upsert and side effects run there)
 @Client.on_message(filters.channel & (filters.document | filters.video))
 async def file_receive_handler(client: Client, message: Message):
     if is_skip_channel(message):
@@ -238,21 +187,23 @@ async def file_receive_handler(client: Client, message: Message):
 
         _, title, msg_id, raw_size, size, channel = _extract_fields(message)
 
-        metadata_info = await metadata(clean_filename(title), int(channel), msg_id, override_id=override_id or extract_default_id(message.caption or ""), season_hint=season_hint)
-        if metadata_info is None:
-            LOGGER.warning(f"Metadata failed for file: {title} (ID: {msg_id})")
-            await route_to_skip_channel(client, message)
-            return
+        async def _on_metadata(job: IngestJob) -> None:
+            if not job.name == message.caption and not job.metadata_info.get('group_key'):
+                LOGGER.info(f"Editing Caption for Message ID {message.id}: {get_log_msg(job.metadata_info)}")
+                create_task(edit_message(chat_id=message.chat.id, msg_id=message.id, new_caption=job.name))
+            if is_real_session:
+                create_task(stamp_caption_with_id(message, job.metadata_info))
 
-        title = _finalize_title(title, metadata_info)
-        if not title == message.caption and not metadata_info.get('group_key'):
-            LOGGER.info(f"Editing Caption for Message ID {message.id}: {get_log_msg(metadata_info)}")
-            create_task(edit_message(chat_id=message.chat.id, msg_id=message.id, new_caption=title))
-
-        await file_queue.put((metadata_info, int(channel), msg_id, size, raw_size, title))
+        async def _on_skip(job: IngestJob) -> None:
+            await route_to_skip_channel(client, message)
 
-        if is_real_session:
-            create_task(stamp_caption_with_id(message, metadata_info))
+        await INGEST_PIPELINE.submit(IngestJob(
+            title, int(channel), msg_id, size, raw_size,
+            override_id=override_id or extract_default_id(message.caption or ""),
+            season_hint=season_hint,
+            on_metadata=_on_metadata,
+            on_skip=_on_skip,
+        ))
     except FloodWait as e:
         LOGGER.info(f"Sleeping for {str(e.value)}s")
         await asleep(e.value)
@@ -293,13 +244,7 @@ async def file_edited_handler(client: Client, message: Message):
         LOGGER.info(f"Detected override ID '{override_id}' in edited message {msg_id}")
         await db.remove_media_part(int(channel), msg_id)
 
-        metadata_info = await metadata(clean_filename(title), int(channel), msg_id, override_id=override_id)
-        if metadata_info is None:
-            LOGGER.warning(f"Metadata failed for edited file: {title} (ID: {msg_id})")
-            return
-
-        title = _finalize_title(title, metadata_info)
-        await file_queue.put((metadata_info, int(channel), msg_id, size, raw_size, title))
+        await INGEST_PIPELINE.submit(IngestJob(title, int(channel), msg_id, size, raw_size, override_id=override_id))
     except Exception as e:
         LOGGER.error(f"Error handling edited generic file {message.id}: {e}")
 